@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from recognizers.DetectionResult import DetectionResult
+
+
+class VehicleContext:
+    def __init__(self, vehicle: DetectionResult, crop: np.ndarray, stream=None, track=None):
+        self.vehicle = vehicle
+        self.crop = crop
+        # стан потоку (трекер, кеш номерів), до якого належить кадр
+        self.stream = stream
+        self.track = track
+        self.analyzed = False
+        # повторне читання номера трека: решта атрибутів береться з кешу трека
+        self.plate_retry = False
+        self.plate_detection: Optional[DetectionResult] = None
+        self.plate_number = None
+        self.plate_confidence = None
+        self.damage_detections = None
+        self.car_color = None
+        self.car_brand = None
+
+    def has(self, name: str) -> bool:
+        return getattr(self, name, None) is not None
+
+
+class Stage:
+    def __init__(self,
+                 name: str,
+                 run: Callable[[List[VehicleContext]], None],
+                 inputs: Iterable[str] = ("crop",),
+                 outputs: Iterable[str] = (),
+                 models: Iterable[str] = (),
+                 condition: Optional[Callable[[VehicleContext], bool]] = None,
+                 enabled: bool = True):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.models = tuple(models)
+        self.condition = condition
+        self.enabled = enabled
+
+    def select(self, contexts: List[VehicleContext]) -> List[VehicleContext]:
+        return [c for c in contexts
+                if all(c.has(name) for name in self.inputs)
+                and (self.condition is None or self.condition(c))]
+
+
+# Умови для гейтування стадій
+def min_box_area(pixels: int) -> Callable[[VehicleContext], bool]:
+    def condition(ctx: VehicleContext) -> bool:
+        x1, y1, x2, y2 = ctx.vehicle.box
+        return (x2 - x1) * (y2 - y1) >= pixels
+    return condition
+
+
+def vehicle_class_in(classes: Iterable[str]) -> Callable[[VehicleContext], bool]:
+    classes = set(classes)
+    return lambda ctx: ctx.vehicle.class_name in classes
+
+
+def min_plate_confidence(threshold: float) -> Callable[[VehicleContext], bool]:
+    return lambda ctx: ctx.plate_detection is not None and ctx.plate_detection.confidence >= threshold
+
+
+def all_of(*conditions: Optional[Callable[[VehicleContext], bool]]) -> Optional[Callable[[VehicleContext], bool]]:
+    conditions = [c for c in conditions if c is not None]
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda ctx: all(c(ctx) for c in conditions)
+
+
+class AnalysisPipeline:
+    PROFILES = {
+        "full": ["plate", "ocr", "damage", "colour", "brand"],
+        "plates_only": ["plate", "ocr"],
+        "damage_audit": ["plate", "ocr", "damage"],
+    }
+
+    BASE_INPUTS = ("vehicle", "crop")
+
+    def __init__(self, stages: List[Stage], parallel: bool = True, max_workers: Optional[int] = None):
+        self.stages: Dict[str, Stage] = {stage.name: stage for stage in stages}
+        self.parallel = parallel
+        self.max_workers = max_workers
+        # умова на саме авто — відсікає його від усіх стадій одразу
+        self.vehicle_condition: Optional[Callable[[VehicleContext], bool]] = None
+        self._levels = self._build_levels(stages)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def apply_profile(self, profile: str):
+        if profile not in self.PROFILES:
+            raise ValueError(f"Невідомий профіль: {profile}. Доступні: {', '.join(self.PROFILES)}")
+        self.enable_only(self.PROFILES[profile])
+
+    def enable_only(self, names: Iterable[str]):
+        names = set(names)
+        unknown = names - self.stages.keys()
+        if unknown:
+            raise ValueError(f"Невідомі стадії: {', '.join(sorted(unknown))}")
+        for stage in self.stages.values():
+            stage.enabled = stage.name in names
+
+    def set_enabled(self, name: str, enabled: bool):
+        self.stages[name].enabled = enabled
+
+    def set_condition(self, name: str, condition: Optional[Callable[[VehicleContext], bool]]):
+        self.stages[name].condition = condition
+
+    def active_stages(self) -> List[Stage]:
+        # стадія без джерела якогось зі своїх входів ніколи не спрацює
+        available = set(self.BASE_INPUTS)
+        active = []
+        for level in self._levels:
+            for stage in level:
+                if stage.enabled and all(name in available for name in stage.inputs):
+                    active.append(stage)
+            available.update(o for stage in active for o in stage.outputs)
+        return active
+
+    def required_models(self) -> List[str]:
+        models = []
+        for stage in self.active_stages():
+            models.extend(m for m in stage.models if m not in models)
+        return models
+
+    def run(self, contexts: List[VehicleContext], parallel: Optional[bool] = None, only: Optional[Iterable[str]] = None):
+        if self.vehicle_condition is not None:
+            contexts = [c for c in contexts if self.vehicle_condition(c)]
+        if not contexts:
+            return
+
+        parallel = self.parallel if parallel is None else parallel
+        for level in self._levels:
+            runnable = []
+            for stage in level:
+                if not stage.enabled or (only is not None and stage.name not in only):
+                    continue
+                selected = stage.select(contexts)
+                if selected:
+                    runnable.append((stage, selected))
+
+            if parallel and len(runnable) > 1:
+                futures = [self._pool().submit(stage.run, selected) for stage, selected in runnable]
+                for future in futures:
+                    future.result()
+            else:
+                for stage, selected in runnable:
+                    stage.run(selected)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers or len(self.stages))
+        return self._executor
+
+    @classmethod
+    def _build_levels(cls, stages: List[Stage]) -> List[List[Stage]]:
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        depth: Dict[str, int] = {}
+
+        def stage_depth(stage: Stage, visiting: frozenset) -> int:
+            if stage.name in depth:
+                return depth[stage.name]
+            if stage.name in visiting:
+                raise ValueError(f"Цикл у графі стадій через '{stage.name}'")
+            parents = [by_name[producers[i]] for i in stage.inputs if i in producers]
+            for name in stage.inputs:
+                if name not in producers and name not in cls.BASE_INPUTS:
+                    raise ValueError(f"Стадія '{stage.name}' очікує вхід '{name}', який ніхто не видає")
+            depth[stage.name] = 1 + max((stage_depth(p, visiting | {stage.name}) for p in parents), default=-1)
+            return depth[stage.name]
+
+        by_name = {stage.name: stage for stage in stages}
+        levels: List[List[Stage]] = []
+        for stage in stages:
+            d = stage_depth(stage, frozenset())
+            while len(levels) <= d:
+                levels.append([])
+        for stage in stages:
+            levels[depth[stage.name]].append(stage)
+        return levels
@@ -0,0 +1,206 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from VehicleAnalysisSystem import VehicleAnalysisSystem
+from ReportVisualizer import ReportVisualizer
+from ReportSink import open_report_sink
+from ImageUtils import ImageUtils, IMAGE_EXTENSIONS
+
+MANIFEST_EXTENSIONS = (".txt", ".lst", ".csv")
+
+
+class BatchImageProcessor:
+    def __init__(self, system: VehicleAnalysisSystem, batch_images: int = 8, decode_workers: int = 4,
+                 prefetch: int = 32, max_side: Optional[int] = None, save_annotated: bool = True):
+        self.system = system
+        self.batch_images = batch_images
+        self.decode_workers = decode_workers
+        self.prefetch = max(prefetch, batch_images)
+        self.max_side = max_side
+        self.save_annotated = save_annotated
+
+    @staticmethod
+    def collect_images(specs: List[str]) -> List[str]:
+        # теки (рекурсивно), glob-шаблони, окремі файли та маніфести (шлях у першій колонці рядка)
+        paths = []
+        for spec in specs:
+            extension = os.path.splitext(spec)[1].lower()
+            if os.path.isfile(spec) and extension in MANIFEST_EXTENSIONS:
+                base = os.path.dirname(os.path.abspath(spec))
+                with open(spec, encoding="utf-8") as f:
+                    for line in f:
+                        path = line.split(",")[0].strip()
+                        if path and not path.startswith("#"):
+                            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+            elif os.path.isfile(spec) and extension in IMAGE_EXTENSIONS:
+                paths.append(spec)
+            else:
+                paths.extend(ImageUtils.list_images(spec, recursive=True))
+
+        seen = set()
+        return [p for p in paths if not (p in seen or seen.add(p))]
+
+    def process(self, sources: List[str], output_dir: str, reports_path: Optional[str] = None,
+                resume: bool = True) -> dict:
+        os.makedirs(output_dir, exist_ok=True)
+        annotated_dir = os.path.join(output_dir, "annotated")
+        if self.save_annotated:
+            os.makedirs(annotated_dir, exist_ok=True)
+        reports_path = reports_path or os.path.join(output_dir, "reports.jsonl")
+        progress_path = os.path.join(output_dir, "progress.txt")
+
+        done = self._load_progress(progress_path, reports_path) if resume else set()
+        if not resume and os.path.exists(progress_path):
+            os.remove(progress_path)
+        pending = [(i, p) for i, p in enumerate(sources) if p not in done]
+        root = self._common_root(sources)
+        if done:
+            print(f"↩️ Продовжуємо: {len(sources) - len(pending)} зобр. уже оброблено")
+
+        self.system.reset_state()
+        processed = failed = 0
+        decode_time = 0.0
+        start = time.perf_counter()
+
+        sink = open_report_sink(reports_path, append=bool(done))
+        progress = open(progress_path, "a" if done else "w", encoding="utf-8")
+        with ThreadPoolExecutor(self.decode_workers) as decoders, ThreadPoolExecutor(self.decode_workers) as encoders:
+            # вікно попереднього декодування: наступні кадри читаються, поки модель працює над поточним батчем
+            window = deque()
+            queued = iter(pending)
+            previous = None
+            try:
+                while True:
+                    while len(window) < self.prefetch:
+                        item = next(queued, None)
+                        if item is None:
+                            break
+                        window.append((item, decoders.submit(self._load, item[1])))
+                    if not window:
+                        break
+
+                    batch = []
+                    while window and len(batch) < self.batch_images:
+                        (index, path), future = window.popleft()
+                        image, elapsed = future.result()
+                        decode_time += elapsed
+                        if image is None:
+                            failed += 1
+                            print(f"\n❌ Не вдалося прочитати зображення: {path}")
+                            continue
+                        batch.append((index, path, image))
+                    if not batch:
+                        continue
+
+                    reports = self.system.analyze_images([image for _, _, image in batch])
+                    writes = []
+                    for (index, path, image), image_reports in zip(batch, reports):
+                        sink.write_frame(index, image_reports, stream_id=path)
+                        if self.save_annotated:
+                            target = os.path.join(annotated_dir, self._output_name(path, root))
+                            writes.append(encoders.submit(self._save, image, image_reports, target))
+
+                    # запис анотованих зображень батча перекривається з аналізом наступного
+                    if previous is not None:
+                        processed += self._commit(*previous, sink, progress)
+                        self._print_progress(processed, len(pending), time.perf_counter() - start)
+                    previous = (writes, [path for _, path, _ in batch])
+
+                if previous is not None:
+                    processed += self._commit(*previous, sink, progress)
+                    self._print_progress(processed, len(pending), time.perf_counter() - start)
+            finally:
+                sink.close()
+                progress.close()
+
+        elapsed = time.perf_counter() - start
+        self.system.write_average_times(os.path.join(output_dir, "recognition_times_avg.log"))
+        summary = {
+            "total": len(sources),
+            "resumed": len(sources) - len(pending),
+            "processed": processed,
+            "failed": failed,
+            "elapsed": elapsed,
+            "images_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+            "decode_time": decode_time,
+            "reports_path": reports_path,
+        }
+        print(f"\n✅ Завершено. Оброблено {processed} зобр. за {elapsed:.2f} sec "
+              f"({summary['images_per_sec']:.2f} зобр./сек), помилок читання: {failed}")
+        return summary
+
+    @staticmethod
+    def _commit(writes: list, paths: List[str], sink, progress) -> int:
+        # прогрес фіксується лише після того, як звіти й зображення батча на диску
+        for future in writes:
+            future.result()
+        sink.flush()
+        progress.write("".join(path + "\n" for path in paths))
+        progress.flush()
+        return len(paths)
+
+    def _load(self, path: str) -> Tuple[Optional[np.ndarray], float]:
+        start = time.perf_counter()
+        image = cv2.imread(path)
+        if image is not None and self.max_side:
+            h, w = image.shape[:2]
+            scale = self.max_side / max(h, w)
+            if scale < 1:
+                image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return image, time.perf_counter() - start
+
+    @staticmethod
+    def _save(image: np.ndarray, reports, target: str):
+        # draw_report малює на місці, а вихідний кадр більше не потрібен
+        for report in reports:
+            image = ReportVisualizer.draw_report(image, report)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        cv2.imwrite(target, image)
+
+    @staticmethod
+    def _common_root(paths: List[str]) -> str:
+        # анотовані зображення повторюють структуру тек відносно спільного кореня вхідних файлів
+        if not paths:
+            return ""
+        return os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+
+    @staticmethod
+    def _output_name(path: str, root: str) -> str:
+        relative = os.path.relpath(os.path.abspath(path), root) if root else os.path.basename(path)
+        if relative.startswith(".."):
+            relative = os.path.basename(path)
+        return os.path.splitext(relative)[0] + ".jpg"
+
+    @staticmethod
+    def _load_progress(progress_path: str, reports_path: str) -> set:
+        if not os.path.exists(progress_path):
+            return set()
+        with open(progress_path, encoding="utf-8") as f:
+            done = {line.rstrip("\n") for line in f if line.strip()}
+
+        # звіти батча, який не встиг позначитися як готовий, відкидаємо — він буде оброблений знову
+        if os.path.exists(reports_path):
+            if os.path.splitext(reports_path)[1].lower() not in (".jsonl", ".ndjson"):
+                raise ValueError("Продовження перерваного запуску підтримується лише для звітів у JSONL")
+            tmp_path = reports_path + ".tmp"
+            with open(reports_path, encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+                for line in src:
+                    try:
+                        keep = json.loads(line).get("stream_id") in done
+                    except json.JSONDecodeError:
+                        keep = False  # обірваний останній рядок
+                    if keep:
+                        dst.write(line)
+            os.replace(tmp_path, reports_path)
+        return done
+
+    @staticmethod
+    def _print_progress(processed: int, total: int, elapsed: float):
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        eta = (total - processed) / rate if rate > 0 else 0.0
+        print(f"🖼️ Оброблено: {processed}/{total} зобр. | {rate:.1f} зобр./сек | залишилось ≈ {eta:.0f} sec", end='\r')
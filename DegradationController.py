@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Iterable, List
+from AnalysisPipeline import AnalysisPipeline
+
+
+class DegradationController:
+    # вимикає стадії по черзі, коли кадр не вкладається в бюджет, і повертає їх, коли навантаження спадає
+    def __init__(self, pipeline: AnalysisPipeline, budget: float, order: Iterable[str] = ("brand", "damage", "colour"),
+                 degrade_after: int = 3, recover_after: int = 30, recover_ratio: float = 0.6, smoothing: float = 0.3):
+        self.pipeline = pipeline
+        self.budget = budget
+        order = list(order)
+        unknown = [name for name in order if name not in pipeline.stages]
+        if unknown:
+            raise ValueError(f"Невідомі стадії: {', '.join(unknown)}. Доступні: {', '.join(pipeline.stages)}")
+        # деградуємо лише стадії, які взагалі були ввімкнені
+        self.order: List[str] = [name for name in order if pipeline.stages[name].enabled]
+        self.degrade_after = degrade_after
+        self.recover_after = recover_after
+        self.recover_ratio = recover_ratio
+        self.smoothing = smoothing
+
+        self.level = 0
+        self.average = None
+        self._over = 0
+        self._under = 0
+        self._recover_wait = recover_after
+        self._last_recovery_frame = None
+
+        self.degradations = 0
+        self.recoveries = 0
+        self.frames_at_level = defaultdict(int)
+        self.stage_skips = defaultdict(int)
+        self.events = []
+
+    @property
+    def degraded_stages(self) -> List[str]:
+        return self.order[:self.level]
+
+    def observe(self, frame_index: int, processing_time: float):
+        self.frames_at_level[self.level] += 1
+        for name in self.degraded_stages:
+            self.stage_skips[name] += 1
+
+        if self.average is None:
+            self.average = processing_time
+        else:
+            self.average = self.smoothing * processing_time + (1 - self.smoothing) * self.average
+
+        if self.average > self.budget:
+            self._over += 1
+            self._under = 0
+        elif self.average < self.budget * self.recover_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_after and self.level < len(self.order):
+            self._degrade(frame_index)
+        elif self._under >= self._recover_wait and self.level > 0:
+            self._recover(frame_index)
+
+    def _degrade(self, frame_index: int):
+        name = self.order[self.level]
+        self.pipeline.set_enabled(name, False)
+        self.level += 1
+        self.degradations += 1
+        # стадію щойно повернули, а кадр знову не встигає — наступного разу чекаємо довше
+        if self._last_recovery_frame is not None and frame_index - self._last_recovery_frame < 2 * self._recover_wait:
+            self._recover_wait *= 2
+        self._over = 0
+        self.events.append((frame_index, "degrade", name, self.average))
+
+    def _recover(self, frame_index: int):
+        self.level -= 1
+        name = self.order[self.level]
+        self.pipeline.set_enabled(name, True)
+        self.recoveries += 1
+        self._last_recovery_frame = frame_index
+        self._under = 0
+        self.events.append((frame_index, "recover", name, self.average))
+
+    def restore(self):
+        for name in self.degraded_stages:
+            self.pipeline.set_enabled(name, True)
+        self.level = 0
+
+    def summary(self) -> dict:
+        return {
+            "budget": self.budget,
+            "order": self.order,
+            "degradations": self.degradations,
+            "recoveries": self.recoveries,
+            "frames_at_level": {
+                "".join(f"-{name}" for name in self.order[:level]) or "full": count for level, count in sorted(self.frames_at_level.items())
+            },
+            "stage_skips": dict(self.stage_skips),
+            "events": [
+                {"frame_index": i, "action": action, "stage": name, "avg_processing_time": avg}
+                for i, action, name, avg in self.events
+            ],
+        }
@@ -0,0 +1,98 @@
+import time
+import cv2
+import numpy as np
+from typing import Iterator, Optional, Tuple
+
+
+class FrameSampler:
+    def __init__(self, every_n_frames: int = 1, every_seconds: Optional[float] = None,
+                 start: Optional[float] = None, end: Optional[float] = None, max_frames: int = -1,
+                 seek_threshold: int = 250):
+        if every_n_frames < 1:
+            raise ValueError("every_n_frames має бути >= 1")
+        if every_seconds is not None and every_seconds <= 0:
+            raise ValueError("every_seconds має бути > 0")
+        self.every_n_frames = every_n_frames
+        self.every_seconds = every_seconds
+        self.start = start
+        self.end = end
+        self.max_frames = max_frames
+        # на великих проміжках seek до ключового кадру дешевший за послідовні grab()
+        self.seek_threshold = seek_threshold
+
+        self.grabbed = 0
+        self.retrieved = 0
+        self.seeks = 0
+        self.grab_time = 0.0
+        self.retrieve_time = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.every_n_frames > 1 or self.every_seconds is not None or bool(self.start) or self.end is not None
+
+    def output_fps(self, fps: float) -> float:
+        if self.every_seconds is not None:
+            return 1.0 / self.every_seconds
+        return fps / self.every_n_frames
+
+    def frames(self, cap: cv2.VideoCapture) -> Iterator[Tuple[int, float, np.ndarray]]:
+        # (індекс кадру у вихідному відео, час у секундах, кадр); пропущені кадри лише grab(), без retrieve()
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        first = int(round(self.start * fps)) if self.start else 0
+        if first:
+            self._seek(cap, first)
+        index = first
+        next_time = self.start or 0.0
+        sampled = 0
+
+        while not (0 < self.max_frames <= sampled):
+            started = time.perf_counter()
+            ok = cap.grab()
+            self.grab_time += time.perf_counter() - started
+            if not ok:
+                return
+            self.grabbed += 1
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if self.end is not None and timestamp > self.end:
+                return
+
+            # за часом — по реальних мітках кадрів (працює і для змінного FPS), інакше кожен N-й кадр
+            if self.every_seconds is not None:
+                due = timestamp + 0.5 / fps >= next_time
+            else:
+                due = (index - first) % self.every_n_frames == 0
+
+            if due:
+                started = time.perf_counter()
+                ok, frame = cap.retrieve()
+                self.retrieve_time += time.perf_counter() - started
+                if not ok:
+                    return
+                self.retrieved += 1
+                sampled += 1
+                yield index, timestamp, frame
+
+                if self.every_seconds is not None:
+                    while next_time <= timestamp + 0.5 / fps:
+                        next_time += self.every_seconds
+                    gap = int((next_time - timestamp) * fps) - 1
+                else:
+                    gap = self.every_n_frames - 1
+                if gap > self.seek_threshold:
+                    index += gap + 1
+                    self._seek(cap, index)
+                    continue
+            index += 1
+
+    def _seek(self, cap: cv2.VideoCapture, index: int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        self.seeks += 1
+
+    def summary(self) -> dict:
+        return {
+            "grabbed": self.grabbed,
+            "retrieved": self.retrieved,
+            "seeks": self.seeks,
+            "grab_time": self.grab_time,
+            "retrieve_time": self.retrieve_time,
+        }
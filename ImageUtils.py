@@ -1,8 +1,20 @@
+import glob
+import os
 import numpy as np
-from typing import Tuple
+from typing import List, Tuple
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
 
 class ImageUtils:
     @staticmethod
     def extract_plate_image(image: np.ndarray, box: Tuple[int, int, int, int]) -> np.ndarray:
+        # лише зріз: кроп лишається view на кадр (зокрема на слот спільної пам'яті), без копії пікселів
         x1, y1, x2, y2 = box
-        return image[y1:y2, x1:x2]
\ No newline at end of file
+        return image[max(y1, 0):y2, max(x1, 0):x2]
+
+    @staticmethod
+    def list_images(pattern: str, recursive: bool = False) -> List[str]:
+        # тека або glob-шаблон; повертає відсортовані шляхи до зображень
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        return sorted(p for p in glob.glob(pattern, recursive=recursive) if p.lower().endswith(IMAGE_EXTENSIONS))
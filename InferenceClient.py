@@ -0,0 +1,109 @@
+import http.client
+import json
+import socket
+from typing import List, Optional, Union
+import cv2
+import numpy as np
+from InferenceServer import RAW_FRAME_TYPE
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class InferenceClient:
+    # address: "http://127.0.0.1:8765" або "unix:/tmp/vehicle-analysis.sock"; з'єднання тримається відкритим між запитами
+    def __init__(self, address: str = "http://127.0.0.1:8765", timeout: Optional[float] = 60.0,
+                 encoding: str = ".jpg", jpeg_quality: int = 90):
+        self.address = address
+        self.timeout = timeout
+        # ".jpg" / ".png" — стискати перед відправкою, "raw" — сирі BGR-байти (швидше на localhost)
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self._connection = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            if self.address.startswith("unix:"):
+                self._connection = _UnixHTTPConnection(self.address[len("unix:"):], self.timeout)
+            else:
+                host = self.address.split("://", 1)[-1].rstrip("/")
+                self._connection = http.client.HTTPConnection(host, timeout=self.timeout)
+        return self._connection
+
+    def _request(self, method: str, path: str, body: bytes = None, headers: Optional[dict] = None):
+        for attempt in range(2):
+            connection = self._connect()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # сервер закрив keep-alive з'єднання — одна повторна спроба з новим
+                self.close()
+                if attempt:
+                    raise
+        content_type = response.getheader("Content-Type", "")
+        payload = json.loads(data) if content_type.startswith("application/json") else data.decode()
+        if response.status != 200:
+            message = payload.get("error") if isinstance(payload, dict) else payload
+            raise RuntimeError(f"Сервер аналізу відповів {response.status}: {message}")
+        return payload
+
+    def encode(self, image: np.ndarray) -> tuple:
+        if self.encoding == "raw":
+            image = np.ascontiguousarray(image)
+            return image.tobytes(), {"Content-Type": RAW_FRAME_TYPE, "X-Frame-Shape": ",".join(map(str, image.shape))}
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if self.encoding == ".jpg" else []
+        ok, encoded = cv2.imencode(self.encoding, image, params)
+        if not ok:
+            raise ValueError(f"Не вдалося закодувати зображення у {self.encoding}")
+        return encoded.tobytes(), {"Content-Type": "image/png" if self.encoding == ".png" else "image/jpeg"}
+
+    def analyze_response(self, image: Union[np.ndarray, str, bytes]) -> dict:
+        # повна відповідь: звіти + розмір батча, час у черзі та інференсу
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                body, headers = f.read(), {"Content-Type": "application/octet-stream"}
+        elif isinstance(image, bytes):
+            body, headers = image, {"Content-Type": "application/octet-stream"}
+        else:
+            body, headers = self.encode(image)
+        return self.analyze_encoded(body, headers)
+
+    def analyze_encoded(self, body: bytes, headers: dict) -> dict:
+        # для повторної відправки того самого кадру без повторного кодування (навантажувальні тести)
+        return self._request("POST", "/analyze", body, headers)
+
+    def analyze(self, image: Union[np.ndarray, str, bytes]) -> List[dict]:
+        # image: кадр BGR, шлях до файлу зображення або вже закодовані байти
+        return self.analyze_response(image)["reports"]
+
+    def metrics(self) -> dict:
+        return self._request("GET", "/metrics")
+
+    def health(self) -> bool:
+        try:
+            return self._request("GET", "/health").get("status") == "ok"
+        except (OSError, RuntimeError):
+            return False
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
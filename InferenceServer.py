@@ -0,0 +1,333 @@
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlsplit, parse_qs
+import cv2
+import numpy as np
+from VehicleAnalysisSystem import VehicleAnalysisSystem
+from StageProfiler import LatencyHistogram
+
+# сирий BGR-кадр без кодування: розмір передається заголовком X-Frame-Shape: "висота,ширина[,канали]"
+RAW_FRAME_TYPE = "application/x-bgr24"
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _PendingImage:
+    __slots__ = ("image", "future", "enqueued_at")
+
+    def __init__(self, image: np.ndarray, future: asyncio.Future):
+        self.image = image
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceServer:
+    # моделі вантажаться один раз; одночасні запити збираються в мікробатчі не довше за max_wait
+    def __init__(self, system: VehicleAnalysisSystem, max_batch_images: int = 8, max_wait: float = 0.005,
+                 max_queue: int = 256, decode_workers: int = 4, max_body: int = 64 << 20):
+        self.system = system
+        self.max_batch_images = max_batch_images
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.max_body = max_body
+        # система аналізу не потокобезпечна: усі батчі йдуть через один потік
+        self._inference = ThreadPoolExecutor(1, thread_name_prefix="inference")
+        self._decoders = ThreadPoolExecutor(decode_workers, thread_name_prefix="decode")
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._batcher = None
+        self._loop = None
+        self._unix_socket = None
+        # відкриті з'єднання: при зупинці закриваються, щоб простійні keep-alive обробники завершилися
+        self._connections = {}
+
+        self.started_at = None
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_sizes = defaultdict(int)
+        self.queue_depth_max = 0
+        self.queue_wait = LatencyHistogram()
+        self.inference_latency = LatencyHistogram()
+        self.total_latency = LatencyHistogram()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_queue)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._unix_socket = unix_socket
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.started_at = time.perf_counter()
+        return self._server
+
+    @property
+    def address(self) -> str:
+        sockname = self._server.sockets[0].getsockname()
+        if isinstance(sockname, str):
+            return f"unix:{sockname}"
+        return f"http://{sockname[0]}:{sockname[1]}"
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None,
+                            ready=None):
+        await self.start(host, port, unix_socket)
+        print(f"🌐 Сервер аналізу слухає {self.address} (батч до {self.max_batch_images} зобр., "
+              f"очікування до {self.max_wait * 1000:.1f} ms)")
+        if ready is not None:
+            ready.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.close()
+
+    def run(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None, ready=None):
+        try:
+            asyncio.run(self.serve_forever(host, port, unix_socket, ready))
+        except KeyboardInterrupt:
+            print("\n🛑 Сервер зупинено")
+
+    def stop(self):
+        # можна викликати з іншого потоку
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    async def close(self):
+        self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            # обробник, що чекає на батч, ще отримає результат до зупинки батчера
+            await asyncio.wait(list(self._connections), timeout=5.0)
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        self._inference.shutdown(wait=True)
+        self._decoders.shutdown(wait=True)
+        if self._unix_socket and os.path.exists(self._unix_socket):
+            os.remove(self._unix_socket)
+
+    async def _batch_loop(self):
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            # вікно рахується від першого запиту: те, що накопичилося під час попереднього батча, йде одразу
+            deadline = first.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_images:
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch: list):
+        # клієнт міг відключитися, поки запит чекав у черзі
+        batch = [item for item in batch if not item.future.done()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        for item in batch:
+            self.queue_wait.record(started - item.enqueued_at)
+        try:
+            reports = await self._loop.run_in_executor(
+                self._inference, self.system.analyze_images, [item.image for item in batch])
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+        self.inference_latency.record(elapsed)
+        self.batches += 1
+        self.batch_sizes[len(batch)] += 1
+        for item, image_reports in zip(batch, reports):
+            if not item.future.done():
+                item.future.set_result((image_reports, len(batch), started - item.enqueued_at, elapsed))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    status, payload = 200, await self._dispatch(method, target, headers, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    self.errors += 1
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as e:
+            # запит не розібрано — відповідаємо й закриваємо з'єднання
+            await self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Некоректний рядок запиту")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(400, f"Некоректний Content-Length: {headers['content-length']}")
+        if length < 0:
+            raise HttpError(400, f"Некоректний Content-Length: {length}")
+        if length > self.max_body:
+            raise HttpError(413, f"Тіло запиту більше за {self.max_body} байт")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, headers: dict, body: bytes):
+        url = urlsplit(target)
+        if url.path == "/analyze":
+            if method != "POST":
+                raise HttpError(405, "Очікується POST")
+            return await self._analyze(headers, body)
+        if url.path == "/metrics":
+            if parse_qs(url.query).get("format") == ["prometheus"]:
+                return self.to_prometheus()
+            return self.metrics()
+        if url.path == "/health":
+            return {"status": "ok"}
+        raise HttpError(404, f"Невідомий шлях: {url.path}")
+
+    async def _analyze(self, headers: dict, body: bytes) -> dict:
+        received = time.perf_counter()
+        self.requests += 1
+        image = await self._loop.run_in_executor(self._decoders, self._decode, headers, body)
+        if self._queue.full():
+            self.rejected += 1
+            raise HttpError(503, "Черга запитів переповнена")
+        item = _PendingImage(image, self._loop.create_future())
+        self._queue.put_nowait(item)
+        self.queue_depth_max = max(self.queue_depth_max, self._queue.qsize())
+
+        reports, batch_size, queue_wait, inference_time = await item.future
+        latency = time.perf_counter() - received
+        self.total_latency.record(latency)
+        return {
+            "reports": [report.to_dict() for report in reports],
+            "batch_size": batch_size,
+            "queue_wait": queue_wait,
+            "inference_time": inference_time,
+            "latency": latency,
+        }
+
+    @staticmethod
+    def _decode(headers: dict, body: bytes) -> np.ndarray:
+        if not body:
+            raise HttpError(400, "Порожнє тіло запиту")
+        if headers.get("content-type", "").split(";")[0].strip() == RAW_FRAME_TYPE:
+            try:
+                shape = tuple(int(x) for x in headers["x-frame-shape"].split(","))
+                if len(shape) == 2:
+                    shape += (3,)
+                if len(shape) != 3 or shape[2] != 3 or min(shape) <= 0:
+                    raise ValueError(f"очікується H,W або H,W,3 (BGR), отримано {headers['x-frame-shape']}")
+                if shape[0] * shape[1] * 3 != len(body):
+                    raise ValueError(f"{shape[0]}x{shape[1]}x3 = {shape[0] * shape[1] * 3} байт, отримано {len(body)}")
+                # view на байти запиту без копії
+                return np.frombuffer(body, dtype=np.uint8).reshape(shape)
+            except (KeyError, ValueError) as e:
+                raise HttpError(400, f"Некоректний X-Frame-Shape для {RAW_FRAME_TYPE}: {e}")
+        image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise HttpError(400, "Не вдалося декодувати зображення")
+        return image
+
+    def metrics(self) -> dict:
+        uptime = time.perf_counter() - self.started_at if self.started_at else 0.0
+        images = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "uptime": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_depth_max": self.queue_depth_max,
+            "max_batch_images": self.max_batch_images,
+            "max_wait": self.max_wait,
+            "batches": self.batches,
+            "avg_batch_size": images / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "images_per_sec": images / uptime if uptime > 0 else 0.0,
+            "latency": {
+                "queue_wait": self.queue_wait.summary(),
+                "inference": self.inference_latency.summary(),
+                "total": self.total_latency.summary(),
+            },
+            "stages": self.system.profiler.snapshot()["stages"],
+        }
+
+    def to_prometheus(self) -> str:
+        metrics = self.metrics()
+        lines = []
+        for name in ("requests", "errors", "rejected", "batches"):
+            lines.append(f"# TYPE vehicle_analysis_server_{name}_total counter")
+            lines.append(f"vehicle_analysis_server_{name}_total {metrics[name]}")
+        for name in ("queue_depth", "queue_depth_max", "avg_batch_size"):
+            lines.append(f"# TYPE vehicle_analysis_server_{name} gauge")
+            lines.append(f"vehicle_analysis_server_{name} {metrics[name]}")
+        lines.append("# TYPE vehicle_analysis_server_latency_seconds summary")
+        for kind, s in metrics["latency"].items():
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'vehicle_analysis_server_latency_seconds{{kind="{kind}",quantile="0.{q[1:]}"}} {s[q]:.9f}')
+            lines.append(f'vehicle_analysis_server_latency_seconds_sum{{kind="{kind}"}} {s["sum"]:.9f}')
+            lines.append(f'vehicle_analysis_server_latency_seconds_count{{kind="{kind}"}} {s["count"]}')
+        return "\n".join(lines) + "\n" + self.system.profiler.to_prometheus()
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+from typing import Optional
+from RegionOfInterest import RegionOfInterest
+
+
+class MotionGate:
+    def __init__(self, method: str = "diff", threshold: float = 0.002, pixel_threshold: int = 25,
+                 max_skip: int = 25, width: int = 160, roi: Optional[RegionOfInterest] = None):
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Невідомий метод детекції руху: {method}")
+        self.method = method
+        self.threshold = threshold            # частка змінених пікселів, з якої кадр вважається «рухомим»
+        self.pixel_threshold = pixel_threshold
+        self.max_skip = max_skip              # навіть у статичній сцені повний аналіз раз на max_skip кадрів
+        self.width = width
+        self.roi = roi
+        self.reset()
+
+    def reset(self):
+        self._reference = None
+        self._mask = None
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=16, detectShadows=False) \
+            if self.method == "mog2" else None
+        self.skipped = 0
+        self.last_motion = 0.0
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        small = self._prepare(frame)
+        if self.method == "mog2":
+            foreground = self._subtractor.apply(small) > 0
+        else:
+            foreground = None if self._reference is None else \
+                cv2.absdiff(small, self._reference) > self.pixel_threshold
+
+        if foreground is None:
+            motion = True
+            self.last_motion = 1.0
+        else:
+            if self._mask is not None:
+                foreground &= self._mask
+            area = int(self._mask.sum()) if self._mask is not None else foreground.size
+            self.last_motion = foreground.sum() / max(area, 1)
+            motion = self.last_motion > self.threshold
+
+        if motion or self.skipped >= self.max_skip:
+            # для diff порівнюємо з останнім проаналізованим кадром: повільний рух теж накопичується
+            self._reference = small
+            self.skipped = 0
+            return True
+        self.skipped += 1
+        return False
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        size = (self.width, max(int(h * self.width / w), 1))
+        small = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        if self.roi is not None and (self._mask is None or self._mask.shape != small.shape):
+            # рух поза зонами інтересу (небо, будівлі, сусідні смуги) не враховуємо
+            self._mask = cv2.resize(self.roi.mask(frame.shape), size, interpolation=cv2.INTER_NEAREST) > 0
+        return small
@@ -0,0 +1,241 @@
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+import cv2
+from VehicleAnalysisSystem import VehicleAnalysisSystem
+from ReportVisualizer import ReportVisualizer
+from StageProfiler import LatencyHistogram
+from ReportSink import ReportSink
+
+_END_OF_STREAM = object()
+
+
+class VideoStream:
+    def __init__(self, stream_id: str, source: str, output_path: Optional[str] = None,
+                 realtime: bool = False, queue_size: int = 4, max_frames: int = -1):
+        self.stream_id = stream_id
+        self.source = source
+        self.output_path = output_path
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.frames = queue.Queue(maxsize=queue_size)
+
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {source}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.writer = None
+        if output_path:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.writer = cv2.VideoWriter(output_path, fourcc, self.fps, self.frame_size)
+
+        # ending: декодер дочитав потік, але кадри з поточного батча ще не записані
+        self.ending = False
+        self.finished = False
+        self.decoded = 0
+        self.processed = 0
+        self.dropped = 0
+        self.latency = LatencyHistogram()
+        self.started_at = None
+        self.finished_at = None
+
+    def decode_loop(self, stop: threading.Event):
+        self.started_at = time.perf_counter()
+        next_due = self.started_at
+        try:
+            while not stop.is_set():
+                if self.max_frames > 0 and self.decoded >= self.max_frames:
+                    break
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                if self.realtime:
+                    # відтворення файлу з рідною частотою кадрів, як у живої камери
+                    next_due += 1.0 / self.fps
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                item = (self.decoded, frame, time.perf_counter())
+                self.decoded += 1
+                if self.realtime:
+                    # жива камера не чекає: якщо черга повна, найстаріший кадр відкидається
+                    while True:
+                        try:
+                            self.frames.put_nowait(item)
+                            break
+                        except queue.Full:
+                            try:
+                                self.frames.get_nowait()
+                                self.dropped += 1
+                            except queue.Empty:
+                                pass
+                else:
+                    while not stop.is_set():
+                        try:
+                            self.frames.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            self.cap.release()
+            while not stop.is_set():
+                try:
+                    self.frames.put(_END_OF_STREAM, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def write(self, frame_index: int, frame, decoded_at: float):
+        if self.finished:
+            # writer уже звільнено — такий кадр не потрапить у відео, тож і не рахується
+            return
+        if self.writer:
+            self.writer.write(frame)
+        self.processed += 1
+        self.latency.record(time.perf_counter() - decoded_at)
+
+    def close(self):
+        self.finished = True
+        self.finished_at = time.perf_counter()
+        if self.writer:
+            self.writer.release()
+            self.writer = None
+
+    def stats(self) -> dict:
+        elapsed = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        return {
+            "source": self.source,
+            "decoded": self.decoded,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "fps": self.processed / elapsed if elapsed > 0 else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+class MultiStreamProcessor:
+    def __init__(self, system: VehicleAnalysisSystem, max_batch_frames: int = 8, max_wait: float = 0.01):
+        self.system = system
+        self.max_batch_frames = max_batch_frames
+        self.max_wait = max_wait
+        self._next_stream = 0
+
+    def process_streams(self, sources: List[str], output_dir: Optional[str] = None, realtime: bool = False,
+                        queue_size: int = 4, max_frames: int = -1, report_sink: Optional[ReportSink] = None) -> dict:
+        streams = []
+        for i, source in enumerate(sources):
+            stream_id = f"{i}:{os.path.splitext(os.path.basename(source))[0]}"
+            output_path = None
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+                output_path = os.path.join(output_dir, f"stream{i}_{os.path.basename(source)}")
+            streams.append(VideoStream(stream_id, source, output_path, realtime, queue_size, max_frames))
+
+        for stream in streams:
+            self.system.reset_state(stream.stream_id)
+
+        stop = threading.Event()
+        decoders = [threading.Thread(target=s.decode_loop, args=(stop,), daemon=True) for s in streams]
+        for decoder in decoders:
+            decoder.start()
+
+        start = time.perf_counter()
+        batches = 0
+        try:
+            while not all(s.finished for s in streams):
+                batch = self._collect_batch(streams)
+                if not batch:
+                    self._close_ended(streams)
+                    continue
+                batches += 1
+
+                frames = [frame for _, _, frame, _ in batch]
+                stream_ids = [stream.stream_id for stream, _, _, _ in batch]
+                reports_per_frame = self.system.analyze_images(frames, stream_ids=stream_ids)
+
+                for (stream, frame_index, frame, decoded_at), reports in zip(batch, reports_per_frame):
+                    if report_sink:
+                        report_sink.write_frame(frame_index, reports, frame_index / stream.fps, stream.stream_id)
+                    for report in reports:
+                        frame = ReportVisualizer.draw_report(frame, report)
+                    stream.write(frame_index, frame, decoded_at)
+                # потік закривається лише після запису всіх його кадрів з цього батча
+                self._close_ended(streams)
+
+                total = sum(s.processed for s in streams)
+                print(f"🧠 Оброблено кадрів: {total} ({len(streams)} потоків)", end='\r')
+        finally:
+            stop.set()
+            for decoder in decoders:
+                decoder.join()
+            for stream in streams:
+                if not stream.finished:
+                    stream.close()
+            if report_sink:
+                report_sink.flush()
+
+        elapsed = time.perf_counter() - start
+        self.system.write_average_times()
+        summary = {
+            "elapsed": elapsed,
+            "batches": batches,
+            "frames": sum(s.processed for s in streams),
+            "streams": {s.stream_id: s.stats() for s in streams},
+        }
+        summary["fps"] = summary["frames"] / elapsed if elapsed > 0 else 0.0
+        self._print_summary(summary)
+        return summary
+
+    def _collect_batch(self, streams: List[VideoStream]) -> list:
+        # round-robin по одному кадру з потоку, починаючи щоразу з наступного потоку,
+        # щоб жоден потік не захопив увесь батч
+        batch = []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_frames:
+            took_any = False
+            active = [s for s in streams if not s.ending]
+            if not active:
+                break
+            for offset in range(len(active)):
+                stream = active[(self._next_stream + offset) % len(active)]
+                try:
+                    item = stream.frames.get_nowait()
+                except queue.Empty:
+                    continue
+                if item is _END_OF_STREAM:
+                    stream.ending = True
+                    continue
+                frame_index, frame, decoded_at = item
+                batch.append((stream, frame_index, frame, decoded_at))
+                took_any = True
+                if len(batch) >= self.max_batch_frames:
+                    break
+            self._next_stream += 1
+
+            if not took_any:
+                if batch or time.perf_counter() >= deadline:
+                    break
+                time.sleep(0.001)
+        return batch
+
+    @staticmethod
+    def _close_ended(streams: List[VideoStream]):
+        for stream in streams:
+            if stream.ending and not stream.finished:
+                stream.close()
+
+    @staticmethod
+    def _print_summary(summary: dict):
+        print(f"\n✅ Завершено. Оброблено {summary['frames']} кадр(ів) за {summary['elapsed']:.2f} sec "
+              f"({summary['fps']:.2f} FPS, {summary['batches']} батчів)")
+        for stream_id, s in summary["streams"].items():
+            latency = s["latency"]
+            print(f"  {stream_id}:")
+            print(f"    ├─ Кадрів: {s['processed']} із {s['decoded']} (відкинуто {s['dropped']})")
+            print(f"    ├─ FPS: {s['fps']:.2f}")
+            print(f"    └─ Затримка p50/p95/p99: {latency['p50']:.3f} / {latency['p95']:.3f} / {latency['p99']:.3f} sec")
@@ -3,23 +3,31 @@ from typing import Optional
 from recognizers.ColorRecognizer import ColorName
 
 class RecognitionReport:
+    __slots__ = ("car_detection", "car_plate_detection", "car_damage_detections", "car_plate_number",
+                 "car_plate_confidence", "car_color", "car_brand", "track_id")
+
     def __init__(self,
                  car_detection: DetectionResult,
                  plate_detection: Optional[DetectionResult] = None,
                  damage_detections: Optional[list[DetectionResult]] = None,
                  plate_number: Optional[str] = None,
                  car_color: Optional[ColorName] = None,
-                 car_brand: Optional[str] = None):
+                 car_brand: Optional[str] = None,
+                 plate_confidence: Optional[float] = None,
+                 track_id: Optional[int] = None):
 
         self.car_detection: DetectionResult = car_detection
         self.car_plate_detection: Optional[DetectionResult] = plate_detection
         self.car_damage_detections: Optional[list[DetectionResult]] = damage_detections if damage_detections else None
         self.car_plate_number: Optional[str] = plate_number
+        self.car_plate_confidence: Optional[float] = float(plate_confidence) if plate_confidence is not None else None
         self.car_color: Optional[ColorName] = car_color
         self.car_brand: Optional[str] = car_brand
-        self.car_damages: Optional[list[str]] = (
-            [d.class_name for d in damage_detections] if damage_detections else None
-        )
+        self.track_id: Optional[int] = track_id
+
+    @property
+    def car_damages(self) -> Optional[list[str]]:
+        return [d.class_name for d in self.car_damage_detections] if self.car_damage_detections else None
 
     def to_dict(self):
         return {
@@ -27,16 +35,40 @@ class RecognitionReport:
             "car_plate_detection": self.car_plate_detection.to_dict() if self.car_plate_detection else None,
             "car_damage_detections": [d.to_dict() for d in self.car_damage_detections] if self.car_damage_detections else None,
             "car_plate_number": self.car_plate_number,
+            "car_plate_confidence": self.car_plate_confidence,
             "car_color": self.car_color.value if self.car_color else None,
             "car_brand": self.car_brand,
-            "car_damages": self.car_damages
+            "car_damages": self.car_damages,
+            "track_id": self.track_id
+        }
+
+    def to_record(self, frame_index: Optional[int] = None, timestamp: Optional[float] = None,
+                  stream_id: Optional[str] = None) -> dict:
+        # плоский запис для потокових вивантажень (JSONL / колонкові формати)
+        x1, y1, x2, y2 = self.car_detection.box
+        plate = self.car_plate_detection
+        return {
+            "frame_index": frame_index,
+            "timestamp": timestamp,
+            "stream_id": stream_id,
+            "track_id": self.track_id,
+            "vehicle_class": self.car_detection.class_name,
+            "vehicle_confidence": self.car_detection.confidence,
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "plate_number": self.car_plate_number,
+            "plate_confidence": self.car_plate_confidence,
+            "plate_detection_confidence": plate.confidence if plate else None,
+            "plate_box": list(plate.box) if plate else None,
+            "color": self.car_color.value if self.car_color else None,
+            "brand": self.car_brand,
+            "damages": self.car_damages,
         }
 
     def __repr__(self):
         return (
-            f"<RecognitionReport plate='{self.car_plate_number}', "
+            f"<RecognitionReport track={self.track_id}, plate='{self.car_plate_number}', "
             f"color={self.car_color.value if self.car_color else 'None'}, "
             f"brand='{self.car_brand or 'None'}', "
             f"damages={self.car_damages or 'None'}, "
             f"car_box={self.car_detection.box}>"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,138 @@
+import json
+import os
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+from recognizers.DetectionResult import DetectionResult
+
+PAD_VALUE = 114  # той самий сірий, яким yolov5 доповнює кадр при letterbox
+
+
+class RegionOfInterest:
+    def __init__(self, polygons: List[List[Tuple[float, float]]], tile_size: Optional[int] = None,
+                 tile_overlap: float = 0.2, mask_outside: bool = True, duplicate_overlap: float = 0.7):
+        if not polygons:
+            raise ValueError("ROI має містити хоча б один полігон")
+        self.polygons = [np.array(p, dtype=np.float32) for p in polygons]
+        # якщо всі координати в межах [0, 1] — це частки ширини/висоти кадру
+        self.relative = all(float(p.max()) <= 1.0 for p in self.polygons)
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.mask_outside = mask_outside
+        self.duplicate_overlap = duplicate_overlap
+        self._cache = {}
+
+    @classmethod
+    def parse(cls, spec: str, **kwargs) -> "RegionOfInterest":
+        # файл JSON ([[x, y], ...] або {"polygons": [...]}) чи рядок "x,y x,y x,y; x,y ..."
+        if os.path.isfile(spec):
+            with open(spec, encoding="utf-8") as f:
+                data = json.load(f)
+            polygons = data["polygons"] if isinstance(data, dict) else data
+            if polygons and isinstance(polygons[0][0], (int, float)):
+                polygons = [polygons]
+        else:
+            polygons = [[tuple(map(float, point.split(","))) for point in polygon.split()]
+                        for polygon in spec.split(";") if polygon.strip()]
+        for polygon in polygons:
+            if len(polygon) < 3:
+                raise ValueError(f"Полігон ROI має містити щонайменше 3 точки: {polygon}")
+        return cls(polygons, **kwargs)
+
+    def mask(self, shape) -> np.ndarray:
+        return self._geometry(shape)[0]
+
+    def tiles(self, image: np.ndarray) -> List[Tuple[np.ndarray, Tuple[int, int]]]:
+        mask, rects = self._geometry(image.shape)
+        tiles = []
+        for x1, y1, x2, y2 in rects:
+            crop = image[y1:y2, x1:x2]
+            if self.mask_outside:
+                crop = np.where(mask[y1:y2, x1:x2, None], crop, np.uint8(PAD_VALUE))
+            for tx, ty, tw, th in self._tile_grid(x2 - x1, y2 - y1):
+                tiles.append((crop[ty:ty + th, tx:tx + tw], (x1 + tx, y1 + ty)))
+        return tiles
+
+    def merge(self, detections: List[DetectionResult], shape,
+              clipped: Optional[List[bool]] = None) -> List[DetectionResult]:
+        mask = self.mask(shape)
+        h, w = mask.shape
+        clipped = clipped or [False] * len(detections)
+        inside = []
+        for d, cut in zip(detections, clipped):
+            cx = min(max((d.box[0] + d.box[2]) // 2, 0), w - 1)
+            cy = min(max((d.box[1] + d.box[3]) // 2, 0), h - 1)
+            if mask[cy, cx]:
+                inside.append((d, cut))
+
+        # сусідні плитки бачать одне авто двічі (іноді лише частину): перевага повній рамці, далі — найвпевненішій;
+        # дві обрізані частини одного авто зливаються в одну рамку
+        kept = []
+        for d, cut in sorted(inside, key=lambda item: (item[1], -item[0].confidence)):
+            duplicate = next((i for i, (k, _) in enumerate(kept)
+                              if self._overlap(d.box, k.box) >= self.duplicate_overlap), None)
+            if duplicate is None:
+                kept.append((d, cut))
+            elif cut and kept[duplicate][1]:
+                k = kept[duplicate][0]
+                box = (min(k.box[0], d.box[0]), min(k.box[1], d.box[1]), max(k.box[2], d.box[2]), max(k.box[3], d.box[3]))
+                kept[duplicate] = (DetectionResult(k.class_name, k.confidence, box), True)
+        return [d for d, _ in kept]
+
+    @staticmethod
+    def is_clipped(detection: DetectionResult, tile_shape, offset: Tuple[int, int], shape, margin: int = 2) -> bool:
+        # рамка впирається в край плитки, що не є краєм кадру, — авто, найімовірніше, обрізане плиткою
+        th, tw = tile_shape[:2]
+        h, w = shape[:2]
+        dx, dy = offset
+        x1, y1, x2, y2 = detection.box
+        return (dx > 0 and x1 <= margin) or (dy > 0 and y1 <= margin) or \
+            (dx + tw < w and x2 >= tw - margin) or (dy + th < h and y2 >= th - margin)
+
+    @staticmethod
+    def shift(detection: DetectionResult, offset: Tuple[int, int]) -> DetectionResult:
+        dx, dy = offset
+        x1, y1, x2, y2 = detection.box
+        return DetectionResult(detection.class_name, detection.confidence, (x1 + dx, y1 + dy, x2 + dx, y2 + dy))
+
+    def _geometry(self, shape):
+        h, w = shape[:2]
+        cached = self._cache.get((h, w))
+        if cached is None:
+            scale = np.array([w, h], dtype=np.float32) if self.relative else np.ones(2, dtype=np.float32)
+            points = [np.round(p * scale).astype(np.int32) for p in self.polygons]
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, points, 1)
+            rects = []
+            for p in points:
+                x, y, rw, rh = cv2.boundingRect(p)
+                x1, y1, x2, y2 = max(x, 0), max(y, 0), min(x + rw, w), min(y + rh, h)
+                if x2 > x1 and y2 > y1:
+                    rects.append((x1, y1, x2, y2))
+            cached = self._cache[(h, w)] = (mask.astype(bool), rects)
+        return cached
+
+    def _tile_grid(self, width: int, height: int) -> List[Tuple[int, int, int, int]]:
+        if not self.tile_size or (width <= self.tile_size and height <= self.tile_size):
+            return [(0, 0, width, height)]
+        size = self.tile_size
+        step = max(int(size * (1 - self.tile_overlap)), 1)
+        xs = self._starts(width, size, step)
+        ys = self._starts(height, size, step)
+        return [(x, y, min(size, width - x), min(size, height - y)) for y in ys for x in xs]
+
+    @staticmethod
+    def _starts(length: int, size: int, step: int) -> List[int]:
+        if length <= size:
+            return [0]
+        starts = list(range(0, length - size, step))
+        starts.append(length - size)  # остання плитка притиснута до краю
+        return starts
+
+    @staticmethod
+    def _overlap(a, b) -> float:
+        # перетин відносно меншої рамки: прибирає і дублікати, і обрізані краєм плитки частини авто
+        ix = max(min(a[2], b[2]) - max(a[0], b[0]), 0)
+        iy = max(min(a[3], b[3]) - max(a[1], b[1]), 0)
+        smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+        return ix * iy / smaller if smaller > 0 else 0.0
@@ -0,0 +1,128 @@
+import json
+import os
+from typing import Iterable, List, Optional
+from RecognitionReport import RecognitionReport
+
+
+class ReportSink:
+    def __init__(self, path: str, buffer_size: int = 1000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.records_written = 0
+        self._buffer: List[dict] = []
+
+    def write_frame(self, frame_index: int, reports: Iterable[RecognitionReport],
+                    timestamp: Optional[float] = None, stream_id: Optional[str] = None):
+        self.write_records(report.to_record(frame_index, timestamp, stream_id) for report in reports)
+
+    def write_records(self, records: Iterable[dict]):
+        # пам'ять обмежена розміром буфера: повний буфер одразу скидається на диск
+        for record in records:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+            self.records_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def _write(self, records: List[dict]):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonlReportSink(ReportSink):
+    def __init__(self, path: str, buffer_size: int = 1000, append: bool = False):
+        super().__init__(path, buffer_size)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def _write(self, records: List[dict]):
+        self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class ColumnarReportSink(ReportSink):
+    FORMATS = ("parquet", "arrow")
+
+    def __init__(self, path: str, buffer_size: int = 10000, file_format: str = "parquet"):
+        super().__init__(path, buffer_size)
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Для Parquet/Arrow потрібен pyarrow: pip install pyarrow")
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Невідомий колонковий формат: {file_format}")
+
+        self._pa = pa
+        self.file_format = file_format
+        self.schema = pa.schema([
+            ("frame_index", pa.int64()),
+            ("timestamp", pa.float64()),
+            ("stream_id", pa.string()),
+            ("track_id", pa.int64()),
+            ("vehicle_class", pa.string()),
+            ("vehicle_confidence", pa.float32()),
+            ("x1", pa.int32()), ("y1", pa.int32()), ("x2", pa.int32()), ("y2", pa.int32()),
+            ("plate_number", pa.string()),
+            ("plate_confidence", pa.float32()),
+            ("plate_detection_confidence", pa.float32()),
+            ("plate_box", pa.list_(pa.int32())),
+            ("color", pa.dictionary(pa.int8(), pa.string())),
+            ("brand", pa.dictionary(pa.int8(), pa.string())),
+            ("damages", pa.list_(pa.string())),
+        ])
+
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _write(self, records: List[dict]):
+        pa = self._pa
+        columns = []
+        for field in self.schema:
+            values = [r.get(field.name) for r in records]
+            if pa.types.is_dictionary(field.type):
+                columns.append(pa.array(values, type=pa.string()).dictionary_encode().cast(field.type))
+            else:
+                columns.append(pa.array(values, type=field.type))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        super().close()
+        self._writer.close()
+        if self.file_format == "arrow":
+            self._sink.close()
+
+
+def open_report_sink(path: str, buffer_size: Optional[int] = None, append: bool = False,
+                     default_stream_id: Optional[str] = None) -> ReportSink:
+    extension = os.path.splitext(path)[1].lower()
+    kwargs = {"buffer_size": buffer_size} if buffer_size else {}
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        # індекс спостережень завжди дописується: повторні запуски доповнюють ту саму базу
+        from SightingIndex import SightingIndexSink
+        return SightingIndexSink(path, default_stream_id=default_stream_id, **kwargs)
+    if extension in (".jsonl", ".ndjson"):
+        return JsonlReportSink(path, append=append, **kwargs)
+    if extension == ".parquet":
+        return ColumnarReportSink(path, file_format="parquet", **kwargs)
+    if extension in (".arrow", ".arrows"):
+        return ColumnarReportSink(path, file_format="arrow", **kwargs)
+    raise ValueError(f"Невідомий формат звітів для {path}: очікується .jsonl, .parquet, .arrow або .db")
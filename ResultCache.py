@@ -0,0 +1,230 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Iterable, List, Optional
+import numpy as np
+
+# значення в кеші може бути None (номер не знайдено), тож відсутність позначає окремий маркер
+MISS = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS weights (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+class ResultCache:
+    # результати розпізнавачів за вмістом вхідного зображення: LRU у пам'яті поверх sqlite на диску
+    def __init__(self, path: str, max_bytes: int = 1 << 30, memory_items: int = 4096,
+                 flush_every: int = 256, flush_interval: float = 2.0, touch_interval: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        # час звернення на диску оновлюється не частіше за touch_interval: інакше кожен хіт з пам'яті — запис у sqlite
+        self.touch_interval = touch_interval
+
+        # key -> (значення, час останнього звернення)
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        # з'єднання відкривається ліниво: об'єкт можна створити там, де кеш лише збирає статистику
+        self._db = None
+
+        # recognizer -> [з пам'яті, з диска, промахи]
+        self.stats = defaultdict(lambda: [0, 0, 0])
+        self.evicted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # кілька процесів-воркерів можуть писати в один файл кешу
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def weights_digest(self, weights_path: Optional[str]) -> str:
+        # хеш вмісту ваг, а не шляху: перенавчена модель з тим самим ім'ям не віддасть старі результати
+        if not weights_path or not os.path.isfile(weights_path):
+            return weights_path or "-"
+        path = os.path.abspath(weights_path)
+        stat = os.stat(path)
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT size, mtime, digest FROM weights WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                return row[2]
+            digest = hashlib.blake2b(digest_size=16)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+            db.execute("INSERT OR REPLACE INTO weights VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime, digest))
+            db.commit()
+            return digest
+
+    def scope(self, recognizer: str, weights_path: Optional[str], *params) -> str:
+        # усе, від чого залежить результат, окрім самого зображення
+        return ":".join([recognizer, self.weights_digest(weights_path)] + [repr(p) for p in params])
+
+    @staticmethod
+    def key(scope: str, image: np.ndarray) -> str:
+        digest = hashlib.blake2b(scope.encode(), digest_size=20)
+        digest.update(f"{image.shape}:{image.dtype}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def get_many(self, recognizer: str, keys: List[str]) -> list:
+        values = [MISS] * len(keys)
+        stats = self.stats[recognizer]
+        with self._lock:
+            missing = []
+            now = time.time()
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    values[i], accessed = self._memory[key]
+                    # гарячі записи не повинні виглядати найстарішими для LRU-витіснення на диску
+                    if now - accessed >= self.touch_interval and key not in self._pending:
+                        self._memory[key] = (values[i], now)
+                        self._touched[key] = now
+                    stats[0] += 1
+                elif key in self._pending:
+                    values[i] = self._pending[key][0]
+                    stats[0] += 1
+                else:
+                    missing.append(i)
+
+            if missing:
+                found = self._read([keys[i] for i in missing])
+                for i in missing:
+                    blob = found.get(keys[i])
+                    if blob is None:
+                        stats[2] += 1
+                        continue
+                    values[i] = pickle.loads(blob)
+                    self._remember(keys[i], values[i], now)
+                    self._touched[keys[i]] = now
+                    stats[1] += 1
+            self._maybe_flush()
+        return values
+
+    def put_many(self, keys: Iterable[str], values: Iterable):
+        with self._lock:
+            now = time.time()
+            for key, value in zip(keys, values):
+                self._remember(key, value, now)
+                self._pending[key] = (value, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._pending) + len(self._touched) >= self.flush_every or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _remember(self, key: str, value, accessed: float):
+        self._memory[key] = (value, accessed)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read(self, keys: List[str]) -> dict:
+        db = self._connect()
+        found = {}
+        # sqlite обмежує кількість параметрів у запиті
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            query = f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})"
+            found.update(db.execute(query, chunk).fetchall())
+        return found
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._touched:
+                return
+            db = self._connect()
+            now = time.time()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                               [(key, blob, len(blob), now) for key, (_, blob) in self._pending.items()])
+                db.executemany("UPDATE results SET accessed = ? WHERE key = ?",
+                               [(accessed, key) for key, accessed in self._touched.items()])
+            wrote = bool(self._pending)
+            self._pending.clear()
+            self._touched.clear()
+            if wrote:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        # LRU за часом останнього звернення; чистимо із запасом, щоб не видаляти на кожному скиданні
+        total = self.disk_bytes(db)
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        with db:
+            db.executemany("DELETE FROM results WHERE key = ?", victims)
+        for (key,) in victims:
+            self._memory.pop(key, None)
+        self.evicted += len(victims)
+
+    def disk_bytes(self, db: Optional[sqlite3.Connection] = None) -> int:
+        db = db or self._connect()
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending.clear()
+            self._touched.clear()
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self.flush()
+                self._db.close()
+                self._db = None
+
+    def export_stats(self) -> dict:
+        return {"stages": {name: list(counts) for name, counts in self.stats.items()}, "evicted": self.evicted}
+
+    def merge_stats(self, state: dict):
+        for name, counts in state["stages"].items():
+            merged = self.stats[name]
+            for i, count in enumerate(counts):
+                merged[i] += count
+        self.evicted += state["evicted"]
+
+    def reset_stats(self):
+        self.stats.clear()
+        self.evicted = 0
@@ -0,0 +1,281 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import cv2
+import numpy as np
+from ReportVisualizer import ReportVisualizer
+from ReportSink import ReportSink
+from VehicleTracker import VehicleTracker
+
+# система аналізу живе в процесі-воркері весь час його роботи: моделі вантажаться раз на воркер
+_worker_system = None
+
+
+def build_worker_system(system_kwargs: dict, registry_kwargs: dict, torch_threads: int):
+    # потоки обмежуються до завантаження моделей, інакше кожен процес займе всі ядра
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+    from VehicleAnalysisSystem import VehicleAnalysisSystem
+    from recognizers.ModelRegistry import ModelRegistry
+    registry_kwargs = dict(registry_kwargs, inference_threads=registry_kwargs.get("inference_threads") or torch_threads)
+    return VehicleAnalysisSystem(registry=ModelRegistry(**registry_kwargs), **system_kwargs)
+
+
+def _init_worker(system_kwargs: dict, registry_kwargs: dict, torch_threads: int):
+    global _worker_system
+    _worker_system = build_worker_system(system_kwargs, registry_kwargs, torch_threads)
+
+
+def _process_segment(task: dict) -> dict:
+    system = _worker_system
+    system.reset_state()
+    system.reset_stats()
+
+    cap = cv2.VideoCapture(task["video_path"])
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Не вдалося відкрити відео: {task['video_path']}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = None
+    if task["output_path"]:
+        writer = cv2.VideoWriter(task["output_path"], cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+
+    start, end, warmup_start = task["start"], task["end"], task["warmup_start"]
+    fps = fps or 25.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+
+    # записи кадрів ідуть у файл частини, а не в результат: пам'ять не залежить від довжини сегмента
+    records_file = open(task["records_path"], "wb") if task["records_path"] else None
+    head_tracks, tail_tracks = [], []
+    written = 0
+    for frame_index in range(warmup_start, end):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        reports = system.analyze_image(frame)
+        tracks = [(r.track_id, r.car_detection.box) for r in reports if r.track_id is not None]
+
+        # останній кадр розігріву збігається з останнім кадром попереднього сегмента
+        if frame_index == start - 1:
+            head_tracks = tracks
+        if frame_index < start:
+            continue
+        tail_tracks = tracks
+
+        if records_file:
+            pickle.dump([r.to_record(frame_index, frame_index / fps) for r in reports], records_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        if writer:
+            for report in reports:
+                frame = ReportVisualizer.draw_report(frame, report)
+            writer.write(frame)
+        written += 1
+
+    cap.release()
+    if writer:
+        writer.release()
+    if records_file:
+        records_file.close()
+
+    return {
+        "index": task["index"],
+        "start": start,
+        "end": end,
+        "written": written,
+        "output_path": task["output_path"],
+        "records_path": task["records_path"],
+        "head_tracks": head_tracks,
+        "tail_tracks": tail_tracks,
+        "stats": system.stats_state(),
+    }
+
+
+class SegmentedVideoProcessor:
+    def __init__(self, system_kwargs: dict, registry_kwargs: Optional[dict] = None,
+                 workers: Optional[int] = None, torch_threads: Optional[int] = None,
+                 segments_per_worker: int = 2, warmup_frames: int = 15):
+        cpu_count = os.cpu_count() or 1
+        self.system_kwargs = system_kwargs
+        self.registry_kwargs = registry_kwargs or {}
+        # воркери * потоки torch не повинні перевищувати кількість ядер
+        if workers is None and torch_threads is None:
+            torch_threads = 2 if cpu_count >= 4 else 1
+        if workers is None:
+            workers = max(1, cpu_count // torch_threads)
+        if torch_threads is None:
+            torch_threads = max(1, cpu_count // workers)
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self.segments_per_worker = segments_per_worker
+        self.warmup_frames = warmup_frames
+
+    def process_video(self, video_path: str, output_path: Optional[str] = None, max_frames: int = -1,
+                      collect_reports: bool = True, report_sink: Optional[ReportSink] = None) -> dict:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if max_frames > 0:
+            total_frames = min(total_frames, max_frames)
+
+        segment_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_path or video_path)))
+        tasks = []
+        for index, (start, end) in enumerate(self._split(total_frames)):
+            tasks.append({
+                "index": index,
+                "video_path": video_path,
+                "start": start,
+                "end": end,
+                "warmup_start": max(0, start - self.warmup_frames),
+                "output_path": os.path.join(segment_dir, f"segment_{index:05d}.mp4") if output_path else None,
+                "records_path": os.path.join(segment_dir, f"segment_{index:05d}.records")
+                if collect_reports or report_sink is not None else None,
+            })
+
+        from recognizers.ModelRegistry import ModelRegistry
+        ModelRegistry(**self.registry_kwargs).prepare_backends(
+            self.system_kwargs[name] for name in ("vehicle_weights", "plate_weights", "damage_weights", "brand_weights"))
+
+        started = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.system_kwargs, self.registry_kwargs, self.torch_threads)) as pool:
+            futures = [pool.submit(_process_segment, task) for task in tasks]
+            # сегмент k записується, щойно готові він і всі попередні; пізніші чекають у своїх файлах
+            results = []
+            frames = []
+            track_ids = _SegmentTrackIds()
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                track_ids.begin_segment(result["head_tracks"])
+                for records in self._read_records(result["records_path"]):
+                    track_ids.remap(records)
+                    if report_sink:
+                        report_sink.write_records(records)
+                    if collect_reports:
+                        frames.append(records)
+                track_ids.end_segment(result["tail_tracks"])
+                print(f"🧩 Сегментів готово: {len(results)}/{len(tasks)}", end='\r')
+        if report_sink:
+            report_sink.flush()
+        if output_path:
+            self._stitch([r["output_path"] for r in results], output_path)
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        elapsed = time.perf_counter() - started
+
+        from VehicleAnalysisSystem import VehicleAnalysisSystem
+        # моделі вантажаться ліниво, тож ця система лише збирає статистику
+        merged = VehicleAnalysisSystem(registry=ModelRegistry(**self.registry_kwargs), **self.system_kwargs)
+        for result in results:
+            merged.merge_stats(result["stats"])
+        merged.write_average_times()
+
+        written = sum(r["written"] for r in results)
+        print(f"\n✅ Завершено. Оброблено {written} кадр(ів) за {elapsed:.2f} sec "
+              f"({written / elapsed if elapsed > 0 else 0.0:.2f} FPS, {self.workers} воркерів x {self.torch_threads} потоків)")
+        return {"frames": frames, "elapsed": elapsed, "written": written, "segments": len(results)}
+
+    def _split(self, total_frames: int) -> List[tuple]:
+        count = max(1, min(self.workers * self.segments_per_worker, total_frames))
+        bounds = np.linspace(0, total_frames, count + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    @staticmethod
+    def _read_records(path: Optional[str]):
+        if not path:
+            return
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    break
+        os.remove(path)
+
+    @staticmethod
+    def _stitch(segment_paths: List[str], output_path: str):
+        segment_paths = [p for p in segment_paths if p and os.path.exists(p)]
+        if shutil.which("ffmpeg"):
+            # склеювання без перекодування
+            list_path = output_path + ".segments.txt"
+            with open(list_path, "w") as f:
+                for path in segment_paths:
+                    f.write(f"file '{os.path.abspath(path)}'\n")
+            try:
+                subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                                "-i", list_path, "-c", "copy", output_path], check=True)
+                return
+            except subprocess.CalledProcessError:
+                pass
+            finally:
+                os.remove(list_path)
+
+        writer = None
+        for path in segment_paths:
+            cap = cv2.VideoCapture(path)
+            if writer is None:
+                frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), frame_size)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+            cap.release()
+        if writer:
+            writer.release()
+
+
+class _SegmentTrackIds:
+    # ID треків кожного сегмента зводяться до глобальних: треки, що перетинають межу,
+    # зіставляються за IoU на спільному кадрі (кінець сегмента k = кінець розігріву k+1)
+    def __init__(self):
+        self.next_global_id = 1
+        self.previous_tail = {}
+        self.mapping = {}
+
+    def begin_segment(self, head_tracks: list):
+        self.mapping = {}
+        if not self.previous_tail or not head_tracks:
+            return
+        tail_ids = list(self.previous_tail.keys())
+        tail_boxes = np.array([self.previous_tail[t] for t in tail_ids], dtype=np.float32)
+        head_boxes = np.array([box for _, box in head_tracks], dtype=np.float32)
+        iou = VehicleTracker.iou_matrix(head_boxes, tail_boxes)
+        used = set()
+        for h, (local_id, _) in enumerate(head_tracks):
+            t = int(np.argmax(iou[h]))
+            if iou[h, t] >= 0.5 and t not in used:
+                self.mapping[local_id] = tail_ids[t]
+                used.add(t)
+
+    def _global_id(self, local_id: int) -> int:
+        if local_id not in self.mapping:
+            self.mapping[local_id] = self.next_global_id
+            self.next_global_id += 1
+        return self.mapping[local_id]
+
+    def remap(self, records: List[dict]):
+        for record in records:
+            if record.get("track_id") is not None:
+                record["track_id"] = self._global_id(record["track_id"])
+
+    def end_segment(self, tail_tracks: list):
+        self.previous_tail = {self._global_id(local_id): box for local_id, box in tail_tracks}
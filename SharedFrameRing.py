@@ -0,0 +1,110 @@
+import math
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import numpy as np
+
+# заголовок слота: номер запису (seq), кількість читачів, що ще тримають слот
+_SEQ, _REFS = 0, 1
+_HEADER_FIELDS = 2
+
+
+class SharedFrameRing:
+    # кільце слотів фіксованого розміру у спільній пам'яті: кадр пишеться раз, читачі отримують numpy-view без копій
+    def __init__(self, spec: dict, create: bool = False):
+        self.slots = spec["slots"]
+        self.frame_shape = tuple(spec["frame_shape"])
+        self.slot_bytes = math.prod(self.frame_shape)
+        self._lock = spec["lock"]
+        self._free = spec["free"]
+        if create:
+            self._frames_shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+            self._header_shm = shared_memory.SharedMemory(create=True, size=self.slots * _HEADER_FIELDS * 8)
+        else:
+            self._frames_shm = self._attach(spec["frames_name"])
+            self._header_shm = self._attach(spec["header_name"])
+        self.frames = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8, buffer=self._frames_shm.buf)
+        self.header = np.ndarray((self.slots, _HEADER_FIELDS), dtype=np.int64, buffer=self._header_shm.buf)
+        if create:
+            self.header[:] = 0
+        self.owner = create
+        self._next = 0
+
+    @classmethod
+    def create(cls, slots: int, frame_shape: Tuple[int, ...], context) -> "SharedFrameRing":
+        spec = {
+            "slots": slots,
+            "frame_shape": tuple(frame_shape),
+            "lock": context.Lock(),
+            "free": context.Semaphore(slots),
+        }
+        return cls(spec, create=True)
+
+    @classmethod
+    def attach(cls, spec: dict) -> "SharedFrameRing":
+        return cls(spec)
+
+    @staticmethod
+    def _attach(name: str) -> shared_memory.SharedMemory:
+        # читачі не володіють пам'яттю: її звільняє лише процес, що створив кільце.
+        # До Python 3.13 spawn-воркери ділять resource_tracker із батьком, тож повторна реєстрація нешкідлива
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            return shared_memory.SharedMemory(name=name)
+
+    def spec(self) -> dict:
+        # передається процесам-воркерам при старті (замки й семафор успадковуються лише так)
+        return {
+            "slots": self.slots,
+            "frame_shape": self.frame_shape,
+            "lock": self._lock,
+            "free": self._free,
+            "frames_name": self._frames_shm.name,
+            "header_name": self._header_shm.name,
+        }
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        # лише для процесу-письменника: чекає, поки якийсь слот звільнять усі читачі
+        if not self._free.acquire(timeout=timeout):
+            return None
+        with self._lock:
+            for i in range(self.slots):
+                slot = (self._next + i) % self.slots
+                if self.header[slot, _REFS] == 0:
+                    self._next = slot + 1
+                    # слот зайнятий письменником, доки publish не віддасть його читачам
+                    self.header[slot, _REFS] = -1
+                    return slot
+        raise RuntimeError("Семафор вільних слотів розійшовся з лічильниками посилань")
+
+    def slot(self, slot: int) -> np.ndarray:
+        return self.frames[slot]
+
+    def publish(self, slot: int, readers: int = 1) -> int:
+        with self._lock:
+            self.header[slot, _SEQ] += 1
+            self.header[slot, _REFS] = readers
+            return int(self.header[slot, _SEQ])
+
+    def view(self, slot: int, seq: int) -> np.ndarray:
+        # seq захищає від читання слота, який уже перезаписано іншим кадром
+        if self.header[slot, _SEQ] != seq or self.header[slot, _REFS] <= 0:
+            raise RuntimeError(f"Слот {slot} уже не містить кадр #{seq}")
+        return self.frames[slot]
+
+    def release(self, slot: int):
+        with self._lock:
+            self.header[slot, _REFS] -= 1
+            free = self.header[slot, _REFS] == 0
+        if free:
+            self._free.release()
+
+    def close(self):
+        # view на буфер мають зникнути до закриття спільної пам'яті
+        self.frames = None
+        self.header = None
+        self._frames_shm.close()
+        self._header_shm.close()
+        if self.owner:
+            self._frames_shm.unlink()
+            self._header_shm.unlink()
@@ -0,0 +1,283 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from typing import Optional
+import cv2
+import numpy as np
+from ReportVisualizer import ReportVisualizer
+from ReportSink import ReportSink
+from SharedFrameRing import SharedFrameRing
+from SegmentedVideoProcessor import build_worker_system
+
+# "shm" — кадри в кільці спільної пам'яті, "queue" — кадри пікляться через multiprocessing.Queue (для порівняння)
+TRANSPORTS = ("shm", "queue")
+
+
+def _analysis_worker(transport: str, spec: Optional[dict], system_kwargs: dict, registry_kwargs: dict,
+                     torch_threads: int, tasks, results):
+    system = build_worker_system(system_kwargs, registry_kwargs, torch_threads)
+    ring = SharedFrameRing.attach(spec) if transport == "shm" else None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            frame_index, payload = task
+            try:
+                if ring is not None:
+                    slot, seq = payload
+                    # view прямо на слот: ні кадр, ні кропи авто не копіюються
+                    frame = ring.view(slot, seq)
+                    try:
+                        reports = system.analyze_image(frame)
+                    finally:
+                        del frame
+                        ring.release(slot)
+                else:
+                    reports = system.analyze_image(payload)
+                results.put((frame_index, reports, None))
+            except Exception:
+                results.put((frame_index, None, traceback.format_exc()))
+    finally:
+        results.put((None, system.stats_state(), None))
+        if ring is not None:
+            ring.close()
+
+
+class SharedMemoryVideoProcessor:
+    # декодування в головному процесі, аналіз у процесах-воркерах; кадр передається номером слота, а не байтами
+    def __init__(self, system_kwargs: dict, registry_kwargs: Optional[dict] = None, workers: Optional[int] = None,
+                 torch_threads: Optional[int] = None, ring_slots: Optional[int] = None, transport: str = "shm"):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Невідомий транспорт кадрів: {transport} (доступні: {', '.join(TRANSPORTS)})")
+        cpu_count = os.cpu_count() or 1
+        # кадри розходяться між воркерами впереміш, тож стан між кадрами (трекер, кеш номерів, детектор руху) вимкнено
+        self.system_kwargs = dict(system_kwargs, tracking=False, plate_text_cache=False, motion_gate=None)
+        self.registry_kwargs = registry_kwargs or {}
+        if workers is None and torch_threads is None:
+            torch_threads = 2 if cpu_count >= 4 else 1
+        if workers is None:
+            workers = max(1, cpu_count // torch_threads)
+        if torch_threads is None:
+            torch_threads = max(1, cpu_count // workers)
+        self.workers = workers
+        self.torch_threads = torch_threads
+        # по два слоти на воркер (аналізується + чекає) і запас для декодера та запису
+        self.ring_slots = ring_slots or 2 * workers + 2
+        self.transport = transport
+
+    def process_video(self, video_path: str, output_path: Optional[str] = None, max_frames: int = -1,
+                      report_sink: Optional[ReportSink] = None) -> dict:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if max_frames > 0:
+            total_frames = min(total_frames, max_frames)
+
+        writer = None
+        if output_path:
+            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (frame_width, frame_height))
+
+        from recognizers.ModelRegistry import ModelRegistry
+        ModelRegistry(**self.registry_kwargs).prepare_backends(
+            self.system_kwargs[name] for name in ("vehicle_weights", "plate_weights", "damage_weights", "brand_weights"))
+
+        context = multiprocessing.get_context("spawn")
+        ring = None
+        if self.transport == "shm":
+            ring = SharedFrameRing.create(self.ring_slots, (frame_height, frame_width, 3), context)
+        # у режимі queue кількість кадрів у польоті обмежує звичайний семафор — так само, як слоти кільця
+        in_flight = threading.Semaphore(self.ring_slots)
+        tasks = context.Queue(maxsize=self.ring_slots)
+        results = context.Queue()
+        workers = [
+            context.Process(target=_analysis_worker, daemon=True,
+                            args=(self.transport, ring.spec() if ring else None, self.system_kwargs,
+                                  self.registry_kwargs, self.torch_threads, tasks, results))
+            for _ in range(self.workers)
+        ]
+
+        stop = threading.Event()
+        errors = []
+        # frame_index -> (час кадру, слот і seq або сам кадр)
+        frames = {}
+        counters = {"decoded": 0, "copies": 0, "copied_bytes": 0, "decode_time": 0.0, "slot_wait_time": 0.0}
+
+        def decode():
+            try:
+                while not stop.is_set() and not (max_frames > 0 and counters["decoded"] >= max_frames):
+                    wait_start = time.perf_counter()
+                    if ring is not None:
+                        slot = ring.acquire(timeout=0.1)
+                        if slot is None:
+                            counters["slot_wait_time"] += time.perf_counter() - wait_start
+                            continue
+                    elif not in_flight.acquire(timeout=0.1):
+                        counters["slot_wait_time"] += time.perf_counter() - wait_start
+                        continue
+                    counters["slot_wait_time"] += time.perf_counter() - wait_start
+
+                    frame_index = counters["decoded"]
+                    start = time.perf_counter()
+                    if ring is not None:
+                        # декодер пише одразу в слот; копія лише якщо OpenCV виділив власний буфер
+                        target = ring.slot(slot)
+                        ret, frame = cap.read(target)
+                        if ret and frame.ctypes.data != target.ctypes.data:
+                            self._copy_into(frame, target)
+                            counters["copies"] += 1
+                            counters["copied_bytes"] += target.nbytes
+                    else:
+                        ret, frame = cap.read()
+                    counters["decode_time"] += time.perf_counter() - start
+                    if not ret:
+                        if ring is not None:
+                            ring.publish(slot, readers=1)
+                            ring.release(slot)
+                        break
+
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                    if ring is not None:
+                        # другий читач — головний процес, який малює звіти й пише кадр у вихідне відео
+                        seq = ring.publish(slot, readers=2 if writer else 1)
+                        frames[frame_index] = (timestamp, (slot, seq))
+                        self._put(tasks, (frame_index, (slot, seq)), stop)
+                    else:
+                        frames[frame_index] = (timestamp, frame)
+                        # піклінг у головному процесі й відновлення у воркері — дві копії кадру
+                        counters["copies"] += 2
+                        counters["copied_bytes"] += 2 * frame.nbytes
+                        self._put(tasks, (frame_index, frame), stop)
+                    counters["decoded"] += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in workers:
+                    self._put(tasks, None, stop)
+
+        for worker in workers:
+            worker.start()
+        decoder = threading.Thread(target=decode)
+        started = time.perf_counter()
+        decoder.start()
+
+        system_stats = []
+        ready = {}
+        next_index = 0
+        finished = 0
+        try:
+            while finished < len(workers):
+                try:
+                    frame_index, payload, error = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not all(worker.is_alive() for worker in workers):
+                        raise RuntimeError("Процес-воркер аналізу завершився аварійно")
+                    continue
+                if frame_index is None:
+                    system_stats.append(payload)
+                    finished += 1
+                    continue
+                if error is not None:
+                    raise RuntimeError(f"Помилка аналізу кадру {frame_index}:\n{error}")
+
+                # воркери повертають кадри не по порядку — відео й звіти пишемо строго послідовно
+                ready[frame_index] = payload
+                while next_index in ready:
+                    reports = ready.pop(next_index)
+                    timestamp, item = frames.pop(next_index)
+                    if report_sink:
+                        report_sink.write_frame(next_index, reports, timestamp)
+                    if writer:
+                        frame = ring.view(*item) if ring is not None else item
+                        for report in reports:
+                            frame = ReportVisualizer.draw_report(frame, report)
+                        writer.write(frame)
+                        del frame
+                    if ring is not None:
+                        if writer:
+                            ring.release(item[0])
+                    else:
+                        in_flight.release()
+                    del item
+                    next_index += 1
+                    print(f"🧠 Оброблено кадрів: {next_index}/{total_frames}", end='\r')
+        finally:
+            stop.set()
+            decoder.join()
+            for worker in workers:
+                # після помилки воркери можуть чекати на завдання, яких уже не буде
+                if finished < len(workers):
+                    worker.terminate()
+                worker.join()
+            elapsed = time.perf_counter() - started
+            cap.release()
+            if writer:
+                writer.release()
+            if report_sink:
+                report_sink.flush()
+            frames.clear()
+            if ring is not None:
+                ring.close()
+
+        if errors:
+            raise errors[0]
+
+        from VehicleAnalysisSystem import VehicleAnalysisSystem
+        merged = VehicleAnalysisSystem(registry=ModelRegistry(**self.registry_kwargs), **self.system_kwargs)
+        for state in system_stats:
+            merged.merge_stats(state)
+        merged.write_average_times()
+
+        decoded = counters["decoded"]
+        summary = {
+            "transport": self.transport,
+            "frames": next_index,
+            "elapsed": elapsed,
+            "fps": next_index / elapsed if elapsed > 0 else 0.0,
+            "workers": self.workers,
+            "ring_slots": self.ring_slots,
+            "frame_bytes": frame_width * frame_height * 3,
+            "frame_copies": counters["copies"],
+            "copies_per_frame": counters["copies"] / decoded if decoded else 0.0,
+            "copied_bytes": counters["copied_bytes"],
+            "copy_bandwidth": counters["copied_bytes"] / elapsed if elapsed > 0 else 0.0,
+            "decode_time": counters["decode_time"],
+            "slot_wait_time": counters["slot_wait_time"],
+        }
+        self._print_summary(summary)
+        return summary
+
+    @staticmethod
+    def _put(q, item, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    @staticmethod
+    def _copy_into(frame: np.ndarray, target: np.ndarray):
+        if frame.shape == target.shape:
+            np.copyto(target, frame)
+        else:
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            cv2.resize(frame, (target.shape[1], target.shape[0]), dst=target)
+
+    @staticmethod
+    def _print_summary(summary: dict):
+        print(f"\n✅ Завершено. Оброблено {summary['frames']} кадр(ів) за {summary['elapsed']:.2f} sec "
+              f"({summary['fps']:.2f} FPS, {summary['workers']} воркерів, транспорт: {summary['transport']})")
+        print(f"📦 Копій кадру: {summary['frame_copies']} ({summary['copies_per_frame']:.2f} на кадр), "
+              f"скопійовано {summary['copied_bytes'] / 2 ** 20:.1f} MB "
+              f"({summary['copy_bandwidth'] / 2 ** 20:.1f} MB/sec)")
+        print(f"⏱️ Декодування: {summary['decode_time']:.2f} sec, очікування вільного слота: "
+              f"{summary['slot_wait_time']:.2f} sec (кільце на {summary['ring_slots']} слотів)")
@@ -0,0 +1,315 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+from ReportSink import ReportSink
+
+# символи, які OCR номерів плутає між собою, зводяться до одного представника
+PLATE_CONFUSIONS = str.maketrans({
+    "O": "0", "Q": "0", "D": "0",
+    "I": "1", "J": "1",
+    "Z": "2",
+    "S": "5",
+    "G": "6",
+    "B": "8",
+})
+
+GRAM_SIZE = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plates (
+    id INTEGER PRIMARY KEY,
+    plate_key TEXT NOT NULL UNIQUE,
+    sightings INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS plate_grams (
+    gram TEXT NOT NULL,
+    plate_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, plate_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sightings (
+    id INTEGER PRIMARY KEY,
+    plate_id INTEGER,
+    plate_number TEXT,
+    plate_confidence REAL,
+    timestamp REAL,
+    frame_index INTEGER,
+    stream_id TEXT,
+    track_id INTEGER,
+    vehicle_class TEXT,
+    vehicle_confidence REAL,
+    color TEXT,
+    brand TEXT,
+    damages TEXT,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plates_length ON plates (length(plate_key));
+CREATE INDEX IF NOT EXISTS sightings_plate ON sightings (plate_id, timestamp);
+CREATE INDEX IF NOT EXISTS sightings_stream_time ON sightings (stream_id, timestamp);
+CREATE INDEX IF NOT EXISTS sightings_time ON sightings (timestamp);
+"""
+
+_COLUMNS = ("plate_id", "plate_number", "plate_confidence", "timestamp", "frame_index", "stream_id", "track_id",
+            "vehicle_class", "vehicle_confidence", "color", "brand", "damages", "x1", "y1", "x2", "y2", "ingested_at")
+
+
+def plate_key(text: Optional[str]) -> Optional[str]:
+    # регістр, пробіли й дефіси не важливі; O/0, B/8 тощо — один символ
+    if not text:
+        return None
+    key = re.sub(r"[^0-9A-Z]", "", text.upper()).translate(PLATE_CONFUSIONS)
+    return key or None
+
+
+def plate_grams(key: str) -> set:
+    padded = f"^{key}$"
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Левенштейн з раннім виходом: рядки, далі за limit, не цікаві
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SightingIndex:
+    # sqlite у режимі WAL: запити можна робити, поки обробка відео ще дописує спостереження
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._plate_ids = {}
+
+    def add_records(self, records: Iterable[dict]) -> int:
+        # записи у форматі RecognitionReport.to_record; один батч — одна транзакція
+        now = time.time()
+        rows = []
+        plate_stats = {}
+        try:
+            self._insert(records, now, rows, plate_stats)
+        except Exception:
+            # транзакцію відкочено — нові номери з кешу id теж недійсні
+            self._plate_ids.clear()
+            raise
+        return len(rows)
+
+    def _insert(self, records: Iterable[dict], now: float, rows: list, plate_stats: dict):
+        with self._db:
+            for r in records:
+                key = plate_key(r.get("plate_number"))
+                plate_id = self._plate_id(key) if key else None
+                timestamp = r.get("timestamp")
+                if plate_id is not None:
+                    count, first, last = plate_stats.get(plate_id, (0, timestamp, timestamp))
+                    if timestamp is not None:
+                        first = timestamp if first is None else min(first, timestamp)
+                        last = timestamp if last is None else max(last, timestamp)
+                    plate_stats[plate_id] = (count + 1, first, last)
+                damages = r.get("damages")
+                rows.append((
+                    plate_id, r.get("plate_number"), r.get("plate_confidence"), timestamp, r.get("frame_index"),
+                    r.get("stream_id"), r.get("track_id"), r.get("vehicle_class"), r.get("vehicle_confidence"),
+                    r.get("color"), r.get("brand"), json.dumps(damages) if damages else None,
+                    r.get("x1"), r.get("y1"), r.get("x2"), r.get("y2"), now,
+                ))
+            self._db.executemany(
+                f"INSERT INTO sightings ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+            self._db.executemany(
+                "UPDATE plates SET sightings = sightings + ?, "
+                "first_seen = CASE WHEN first_seen IS NULL OR ? < first_seen THEN ? ELSE first_seen END, "
+                "last_seen = CASE WHEN last_seen IS NULL OR ? > last_seen THEN ? ELSE last_seen END WHERE id = ?",
+                [(count, first, first, last, last, plate_id) for plate_id, (count, first, last) in plate_stats.items()])
+
+    def _plate_id(self, key: str) -> int:
+        plate_id = self._plate_ids.get(key)
+        if plate_id is None:
+            # номер міг уже додати інший процес, що пише в той самий індекс
+            self._db.execute("INSERT OR IGNORE INTO plates (plate_key) VALUES (?)", (key,))
+            plate_id = self._db.execute("SELECT id FROM plates WHERE plate_key = ?", (key,)).fetchone()[0]
+            self._db.executemany("INSERT OR IGNORE INTO plate_grams VALUES (?, ?)",
+                                 [(gram, plate_id) for gram in plate_grams(key)])
+            self._plate_ids[key] = plate_id
+        return plate_id
+
+    def ingest_jsonl(self, path: str, batch_size: int = 5000) -> int:
+        total = 0
+        batch = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    total += self.add_records(batch)
+                    batch = []
+        return total + self.add_records(batch)
+
+    def find_plates(self, text: str, max_distance: int = 1, limit: int = 50) -> List[dict]:
+        # кандидати — номери зі спільними триграмами (лема про q-грами), потім точна відстань редагування
+        key = plate_key(text)
+        if not key:
+            return []
+        grams = plate_grams(key)
+        min_shared = len(grams) - GRAM_SIZE * max_distance
+        if min_shared > 0:
+            rows = self._db.execute(
+                f"SELECT p.id, p.plate_key, p.sightings, p.first_seen, p.last_seen FROM plates p JOIN ("
+                f"  SELECT plate_id FROM plate_grams WHERE gram IN ({', '.join('?' * len(grams))})"
+                f"  GROUP BY plate_id HAVING COUNT(*) >= ?"
+                f") g ON g.plate_id = p.id",
+                (*grams, min_shared)).fetchall()
+        else:
+            # короткий запит або велика відстань: збіг може не мати жодної спільної триграми,
+            # тож перевіряються всі номери сумісної довжини
+            rows = self._db.execute(
+                "SELECT id, plate_key, sightings, first_seen, last_seen FROM plates "
+                "WHERE length(plate_key) BETWEEN ? AND ?",
+                (len(key) - max_distance, len(key) + max_distance)).fetchall()
+
+        matches = []
+        for row in rows:
+            distance = edit_distance(key, row["plate_key"], max_distance)
+            if distance <= max_distance:
+                matches.append(dict(row, distance=distance))
+        matches.sort(key=lambda m: (m["distance"], -m["sightings"]))
+        return matches[:limit]
+
+    def search(self, text: str, max_distance: int = 1, start: Optional[float] = None, end: Optional[float] = None,
+               stream_id: Optional[str] = None, limit: int = 1000) -> List[dict]:
+        plates = self.find_plates(text, max_distance)
+        if not plates:
+            return []
+        distances = {p["id"]: p["distance"] for p in plates}
+        where, params = self._range_filter(start, end, stream_id)
+        where.append(f"plate_id IN ({', '.join('?' * len(distances))})")
+        params.extend(distances)
+        rows = self._db.execute(
+            f"SELECT * FROM sightings WHERE {' AND '.join(where)} ORDER BY timestamp, id LIMIT ?",
+            (*params, limit)).fetchall()
+        return [self._to_sighting(row, distances[row["plate_id"]]) for row in rows]
+
+    def sightings_between(self, start: Optional[float] = None, end: Optional[float] = None,
+                          stream_id: Optional[str] = None, color: Optional[str] = None, brand: Optional[str] = None,
+                          with_plate: bool = False, limit: int = 1000) -> List[dict]:
+        where, params = self._range_filter(start, end, stream_id)
+        if color:
+            where.append("color = ?")
+            params.append(color)
+        if brand:
+            where.append("brand = ?")
+            params.append(brand)
+        if with_plate:
+            where.append("plate_id IS NOT NULL")
+        rows = self._db.execute(
+            f"SELECT * FROM sightings {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY timestamp, id LIMIT ?",
+            (*params, limit)).fetchall()
+        return [self._to_sighting(row) for row in rows]
+
+    @staticmethod
+    def _range_filter(start: Optional[float], end: Optional[float], stream_id: Optional[str]):
+        where, params = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("timestamp <= ?")
+            params.append(end)
+        if stream_id is not None:
+            where.append("stream_id = ?")
+            params.append(stream_id)
+        return where, params
+
+    @staticmethod
+    def _to_sighting(row: sqlite3.Row, distance: Optional[int] = None) -> dict:
+        sighting = dict(row)
+        sighting["damages"] = json.loads(sighting["damages"]) if sighting["damages"] else None
+        if distance is not None:
+            sighting["distance"] = distance
+        return sighting
+
+    @staticmethod
+    def visits(sightings: List[dict], max_gap: float = 2.0) -> List[dict]:
+        # послідовні спостереження того самого номера на тій самій камері зводяться в один проїзд
+        visits = []
+        open_visits = {}
+        for s in sorted(sightings, key=lambda s: (s["timestamp"] is None, s["timestamp"] or 0.0)):
+            key = (s["plate_id"], s["stream_id"])
+            visit = open_visits.get(key)
+            if visit is None or s["timestamp"] is None or visit["last_seen"] is None \
+                    or s["timestamp"] - visit["last_seen"] > max_gap:
+                visit = {
+                    "plate_number": s["plate_number"], "stream_id": s["stream_id"], "distance": s.get("distance"),
+                    "first_seen": s["timestamp"], "last_seen": s["timestamp"], "sightings": 0, "readings": {},
+                    "color": s["color"], "brand": s["brand"],
+                }
+                visits.append(visit)
+                open_visits[key] = visit
+            visit["last_seen"] = s["timestamp"]
+            visit["sightings"] += 1
+            visit["readings"][s["plate_number"]] = visit["readings"].get(s["plate_number"], 0) + 1
+        for visit in visits:
+            # найчастіше прочитання вважаємо справжнім номером
+            visit["plate_number"] = max(visit["readings"].items(), key=lambda x: x[1])[0]
+        return visits
+
+    def stats(self) -> dict:
+        row = self._db.execute(
+            "SELECT COUNT(*), COUNT(plate_id), MIN(timestamp), MAX(timestamp), COUNT(DISTINCT stream_id) FROM sightings"
+        ).fetchone()
+        return {
+            "sightings": row[0],
+            "with_plate": row[1],
+            "plates": self._db.execute("SELECT COUNT(*) FROM plates").fetchone()[0],
+            "first_seen": row[2],
+            "last_seen": row[3],
+            "streams": row[4],
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+class SightingIndexSink(ReportSink):
+    # звіти з конвеєра одразу потрапляють в індекс; невеликі батчі й скидання за часом — щоб шукати під час обробки
+    def __init__(self, path: str, buffer_size: int = 500, flush_interval: float = 1.0,
+                 default_stream_id: Optional[str] = None):
+        super().__init__(path, buffer_size)
+        self.index = SightingIndex(path)
+        self.flush_interval = flush_interval
+        self.default_stream_id = default_stream_id
+        self._last_flush = time.monotonic()
+
+    def write_records(self, records: Iterable[dict]):
+        if self.default_stream_id is not None:
+            records = (dict(r, stream_id=r.get("stream_id") or self.default_stream_id) for r in records)
+        super().write_records(records)
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+    def _write(self, records: List[dict]):
+        self.index.add_records(records)
+
+    def close(self):
+        super().close()
+        self.index.close()
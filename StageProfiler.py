@@ -0,0 +1,255 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class LatencyHistogram:
+    # логарифмічні бакети: відносна похибка перцентилів не перевищує growth - 1
+    def __init__(self, min_value: float = 1e-6, max_value: float = 1e3, growth: float = 1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * (int(math.log(max_value / min_value) / self._log_growth) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.log(value / self.min_value) / self._log_growth) + 1, len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                upper = self.min_value * self.growth ** index
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class StageProfiler:
+    VEHICLE_COUNT_BUCKETS = [(0, 0), (1, 2), (3, 5), (6, 10), (11, 20), (21, None)]
+
+    def __init__(self, trace: bool = False, max_trace_events: int = 200_000):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.by_vehicle_count: Dict[str, Dict[str, LatencyHistogram]] = defaultdict(lambda: defaultdict(LatencyHistogram))
+
+        self.trace_enabled = trace
+        self.trace_events = deque(maxlen=max_trace_events)
+        self._pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+
+        self._lock = threading.Lock()
+        self._frame_index: Optional[int] = None
+        self._frame_samples: List[tuple] = []
+
+        self.metrics_path: Optional[str] = None
+        self.metrics_format = "json"
+        self.metrics_interval = 0.0
+        self.trace_path: Optional[str] = None
+        self._last_export = time.monotonic()
+
+    def configure_export(self, metrics_path: Optional[str] = None, metrics_format: str = "json",
+                         metrics_interval: float = 0.0, trace_path: Optional[str] = None):
+        if metrics_format not in ("json", "prometheus"):
+            raise ValueError(f"Невідомий формат метрик: {metrics_format}")
+        self.metrics_path = metrics_path
+        self.metrics_format = metrics_format
+        self.metrics_interval = metrics_interval
+        self.trace_path = trace_path
+        if trace_path:
+            self.trace_enabled = True
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.record(name, start, end)
+
+    def record(self, name: str, start_ns: int, end_ns: int):
+        duration = (end_ns - start_ns) / 1e9
+        with self._lock:
+            self.totals[name] += duration
+            self.histograms[name].record(duration)
+            if self._frame_index is not None:
+                # розбивку за кількістю авто робимо в кінці кадру, коли кількість відома
+                self._frame_samples.append((name, duration))
+            if self.trace_enabled:
+                self.trace_events.append(self._trace_event(name, start_ns, end_ns, "stage"))
+
+    @contextmanager
+    def frame(self, frame_index: int, frames: int = 1):
+        # кілька кадрів, проаналізованих одним батчем, рахуються окремо від одиночних
+        span = "frame" if frames == 1 else "batch"
+        frame = {"vehicles": 0}
+        with self._lock:
+            self._frame_index = frame_index
+            self._frame_samples = []
+        start = time.perf_counter_ns()
+        try:
+            yield frame
+        finally:
+            end = time.perf_counter_ns()
+            bucket = self.vehicle_count_bucket(frame["vehicles"])
+            with self._lock:
+                self._frame_index = None
+                samples, self._frame_samples = self._frame_samples, []
+                for name, duration in samples:
+                    self.by_vehicle_count[name][bucket].record(duration)
+                self.histograms[span].record((end - start) / 1e9)
+                self.by_vehicle_count[span][bucket].record((end - start) / 1e9)
+                if self.trace_enabled:
+                    event = self._trace_event(f"{span} {frame_index}", start, end, span)
+                    event["args"] = {"frame": frame_index, "frames": frames, "vehicles": frame["vehicles"]}
+                    self.trace_events.append(event)
+            self.maybe_export()
+
+    @classmethod
+    def vehicle_count_bucket(cls, count: int) -> str:
+        for low, high in cls.VEHICLE_COUNT_BUCKETS:
+            if high is None:
+                return f"{low}+"
+            if low <= count <= high:
+                return str(low) if low == high else f"{low}-{high}"
+        return "unknown"
+
+    def _trace_event(self, name: str, start_ns: int, end_ns: int, category: str) -> dict:
+        return {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self._origin_ns) / 1e3,
+            "dur": (end_ns - start_ns) / 1e3,
+            "pid": self._pid,
+            "tid": threading.get_native_id(),
+        }
+
+    def export_state(self) -> dict:
+        # лише прості типи — стан можна передати з процесу-воркера і злити з іншим
+        with self._lock:
+            return {
+                "totals": dict(self.totals),
+                "histograms": dict(self.histograms),
+                "by_vehicle_count": {name: dict(buckets) for name, buckets in self.by_vehicle_count.items()},
+            }
+
+    def merge_state(self, state: dict):
+        with self._lock:
+            for name, total in state["totals"].items():
+                self.totals[name] += total
+            for name, histogram in state["histograms"].items():
+                self.histograms[name].merge(histogram)
+            for name, buckets in state["by_vehicle_count"].items():
+                for bucket, histogram in buckets.items():
+                    self.by_vehicle_count[name][bucket].merge(histogram)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "stages": {name: h.summary() for name, h in self.histograms.items()},
+                "by_vehicle_count": {
+                    name: {bucket: h.summary() for bucket, h in buckets.items()}
+                    for name, buckets in self.by_vehicle_count.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP vehicle_analysis_stage_seconds Stage latency in seconds",
+            "# TYPE vehicle_analysis_stage_seconds summary",
+        ]
+        for name, s in snapshot["stages"].items():
+            label = self._prometheus_label(name)
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'vehicle_analysis_stage_seconds{{stage="{label}",quantile="0.{q[1:]}"}} {s[q]:.9f}')
+            lines.append(f'vehicle_analysis_stage_seconds_sum{{stage="{label}"}} {s["sum"]:.9f}')
+            lines.append(f'vehicle_analysis_stage_seconds_count{{stage="{label}"}} {s["count"]}')
+        lines.append("# TYPE vehicle_analysis_stage_by_vehicles_seconds summary")
+        for name, buckets in snapshot["by_vehicle_count"].items():
+            label = self._prometheus_label(name)
+            for bucket, s in buckets.items():
+                for q in ("p50", "p95", "p99"):
+                    lines.append(f'vehicle_analysis_stage_by_vehicles_seconds{{stage="{label}",vehicles="{bucket}",'
+                                 f'quantile="0.{q[1:]}"}} {s[q]:.9f}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _prometheus_label(name: str) -> str:
+        return name.replace("\\", "\\\\").replace('"', '\\"')
+
+    def maybe_export(self):
+        if not self.metrics_path or self.metrics_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_export >= self.metrics_interval:
+            self._last_export = now
+            self.write_metrics(self.metrics_path, self.metrics_format)
+
+    def flush(self):
+        if self.metrics_path:
+            self.write_metrics(self.metrics_path, self.metrics_format)
+        if self.trace_path:
+            self.write_chrome_trace(self.trace_path)
+
+    def write_metrics(self, path: str, metrics_format: str = "json"):
+        if metrics_format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+        self._atomic_write(path, content)
+
+    def write_chrome_trace(self, path: str):
+        with self._lock:
+            events = list(self.trace_events)
+        self._atomic_write(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    @staticmethod
+    def _atomic_write(path: str, content: str):
+        # метрики можуть читатися під час довгого запуску — пишемо через тимчасовий файл
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -1,5 +1,4 @@
 from collections import defaultdict
-import time
 from typing import List
 import numpy as np
 from recognizers.VehicleRecognizer import VehicleRecognizer
@@ -7,9 +6,27 @@ from recognizers.PlateRecognizer import PlateRecognizer
 from recognizers.DamageRecognizer import DamageRecognizer
 from recognizers.CarBrandRecognizer import CarBrandRecognizer
 from recognizers.ColorRecognizer import ColorRecognizer, ColorName
+from recognizers.PlateTextCache import PlateTextCache
+from recognizers.ModelRegistry import ModelRegistry
 from ImageUtils import ImageUtils
 from recognizers.DetectionResult import DetectionResult
 from RecognitionReport import RecognitionReport
+from VehicleTracker import VehicleTracker, Track
+from AnalysisPipeline import AnalysisPipeline, Stage, VehicleContext, all_of, min_box_area, vehicle_class_in
+from AnalysisPipeline import min_plate_confidence as plate_confidence_at_least
+from StageProfiler import StageProfiler
+from MotionGate import MotionGate
+from RegionOfInterest import RegionOfInterest
+from ResultCache import ResultCache, MISS
+
+
+class StreamState:
+    def __init__(self, tracker: VehicleTracker | None, plate_cache: PlateTextCache | None,
+                 motion_gate: MotionGate | None = None):
+        self.tracker = tracker
+        self.plate_cache = plate_cache
+        self.motion_gate = motion_gate
+        self.last_reports = None
 
 
 class VehicleAnalysisSystem:
@@ -18,91 +35,551 @@ class VehicleAnalysisSystem:
                  plate_weights: str,
                  damage_weights: str,
                  brand_weights: str,
-                 ocr_langs=None):
-        self.vehicle_recognizer = VehicleRecognizer(vehicle_weights)
-        self.plate_recognizer = PlateRecognizer(plate_weights, ocr_langs)
-        self.damage_recognizer = DamageRecognizer(damage_weights)
+                 ocr_langs=None,
+                 batched: bool = True,
+                 batch_size: int = 16,
+                 tracking: bool = False,
+                 track_refresh_interval: int = 30,
+                 track_min_confidence: float = 0.5,
+                 track_plate_retries: int = 3,
+                 track_plate_retry_interval: int = 10,
+                 plate_text_cache: bool = False,
+                 registry: ModelRegistry | None = None,
+                 profile: str = "full",
+                 parallel_stages: bool = False,
+                 stages: List[str] | None = None,
+                 motion_gate: str | None = None,
+                 motion_threshold: float = 0.002,
+                 motion_max_skip: int = 25,
+                 roi: RegionOfInterest | None = None,
+                 result_cache: str | None = None,
+                 result_cache_max_mb: float = 1024,
+                 min_vehicle_area: int = 0,
+                 vehicle_classes: List[str] | None = None,
+                 min_plate_confidence: float = 0.0):
+        # models are loaded lazily through the registry on first use (or by preload_models)
+        self.registry = registry or ModelRegistry.default()
+        self.vehicle_recognizer = VehicleRecognizer(vehicle_weights, registry=self.registry)
+        self.plate_recognizer = PlateRecognizer(plate_weights, ocr_langs, registry=self.registry)
+        self.damage_recognizer = DamageRecognizer(damage_weights, registry=self.registry)
         self.color_recognizer = ColorRecognizer()
-        self.brand_recognizer = CarBrandRecognizer(brand_weights)
+        self.brand_recognizer = CarBrandRecognizer(brand_weights, registry=self.registry)
+        self.model_load_time = 0.0
+
+        # batched=False keeps the old one-crop-per-forward-pass path for comparison
+        self.batched = batched
+        self.batch_size = batch_size
+
+        # per-vehicle stages: vehicle -> {plate -> ocr, damage, colour, brand}
+        self.pipeline = AnalysisPipeline([
+            Stage("plate", self._detect_plates, inputs=("crop",), outputs=("plate_detection",), models=("plate",)),
+            Stage("ocr", self._read_plates, inputs=("plate_detection",), outputs=("plate_number",), models=("ocr",)),
+            Stage("damage", self._detect_damages, inputs=("crop",), outputs=("damage_detections",), models=("damage",)),
+            Stage("colour", self._recognize_colors, inputs=("crop",), outputs=("car_color",)),
+            Stage("brand", self._detect_brands, inputs=("crop",), outputs=("car_brand",), models=("brand",)),
+        ], parallel=parallel_stages)
+        self.pipeline.apply_profile(profile)
+        if stages:
+            self.pipeline.enable_only(stages)
+        # гейтування задається простими значеннями, тож доходить і до процесів-воркерів
+        self.pipeline.vehicle_condition = all_of(
+            min_box_area(min_vehicle_area) if min_vehicle_area > 0 else None,
+            vehicle_class_in(vehicle_classes) if vehicle_classes else None
+        )
+        if min_plate_confidence > 0:
+            self.pipeline.set_condition("ocr", plate_confidence_at_least(min_plate_confidence))
+
+        # tracking: per-vehicle stages run only for new, stale or low-confidence tracks
+        self.tracking = tracking
+        self.track_refresh_interval = track_refresh_interval
+        self.track_min_confidence = track_min_confidence
+        # невпевнений номер перечитується (лише plate/ocr) track_plate_retries разів поспіль, далі — раз на інтервал
+        self.track_plate_retries = track_plate_retries
+        self.track_plate_retry_interval = track_plate_retry_interval
+
+        # plate texts are voted over several reads and not OCR'd again once settled
+        self.plate_text_cache = plate_text_cache
+
+        # кадри без руху не аналізуються: для них повторюються останні звіти потоку
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.motion_max_skip = motion_max_skip
+
+        # детектор авто бачить лише зони інтересу (за потреби — плитками)
+        self.roi = roi
 
-        # counters
-        self.timing_data = defaultdict(float)
+        # результати детекторів і OCR за вмістом зображення: повторний прогін тих самих медіа не рахує моделі
+        self.result_cache = ResultCache(result_cache, max_bytes=int(result_cache_max_mb * 2 ** 20)) if result_cache else None
+        self._cache_scopes = {}
+
+        # tracker and plate cache live per video stream (stream_id None is the default one)
+        self.streams: dict = {}
+
+        # counters; timing_data holds per-stage totals kept by the profiler
+        self.profiler = StageProfiler()
+        self.timing_data = self.profiler.totals
         self.call_count = 0
         self.total_vehicle_count = 0
+        self.cached_vehicle_count = 0
+        self.plate_retry_count = 0
+        self.ocr_call_count = 0
+        self.plate_cache_hits = 0
+        self.plate_cache_misses = 0
+        self.motion_skipped_frames = 0
+        self.roi_tile_count = 0
+
+    def preload_models(self, models: List[str] | None = None, max_workers: int | None = None) -> float:
+        loaders = {
+            "vehicle": self.vehicle_recognizer.load,
+            "plate": self.plate_recognizer.load,
+            "ocr": self.plate_recognizer.load_reader,
+            "damage": self.damage_recognizer.load,
+            "brand": self.brand_recognizer.load,
+        }
+        if models is None:
+            models = ["vehicle"] + self.pipeline.required_models()
+        selected = [loaders[name] for name in models]
+        self.model_load_time = self.registry.preload(selected, max_workers)
+        return self.model_load_time
+
+    def analyze_image(self, image: np.ndarray, batched: bool | None = None, stream_id=None) -> List[RecognitionReport]:
+        return self.analyze_images([image], batched=batched, stream_ids=[stream_id])[0]
+
+    def analyze_images(self, images: List[np.ndarray], batched: bool | None = None,
+                       stream_ids: list | None = None) -> List[List[RecognitionReport]]:
+        if not images:
+            return []
+        if stream_ids is None:
+            stream_ids = [None] * len(images)
+
+        first_frame = self.call_count + 1
+        self.call_count += len(images)
+
+        active = self._gate_frames(images, stream_ids) if self.motion_gate else list(range(len(images)))
+        results = [None] * len(images)
+        if active:
+            active_images = [images[i] for i in active]
+            active_streams = [stream_ids[i] for i in active]
+            with self.profiler.frame(first_frame, frames=len(active)) as frame:
+                # VEHICLE RECOGNITION
+                with self.profiler.stage("VehicleRecognizer"):
+                    vehicle_batches = self._detect_vehicles(active_images)
 
-    def analyze_image(self, image: np.ndarray) -> List[RecognitionReport]:
-        self.call_count += 1
-        reports = []
-
-        # VEHICLE RECOGNITION
-        start = time.time()
-        vehicle_detections = self.vehicle_recognizer.detect_vehicles(image)
-        self.timing_data["VehicleRecognizer"] += time.time() - start
-
-        self.total_vehicle_count += len(vehicle_detections)
-
-        for vehicle in vehicle_detections:
-            crop = ImageUtils.extract_plate_image(image, vehicle.box)
-
-            # PLATE DETECTION
-            start = time.time()
-            plate_detection: DetectionResult | None = self.plate_recognizer.detect_plate(crop)
-            self.timing_data["PlateRecognizer - detect_plate"] += time.time() - start
-
-            plate_number = None
-            if plate_detection:
-                plate_crop = ImageUtils.extract_plate_image(crop, plate_detection.box)
-                start = time.time()
-                plate_number, _ = self.plate_recognizer.recognize_text(plate_crop)
-                self.timing_data["PlateRecognizer - recognize_text"] += time.time() - start
-
-            # DAMAGE DETECTION
-            start = time.time()
-            damage_detections = self.damage_recognizer.detect_damages(crop)
-            self.timing_data["DamageRecognizer"] += time.time() - start
-            if not damage_detections:
-                damage_detections = None
-
-            # COLOR DETECTION
-            car_color = None
-            try:
-                start = time.time()
-                car_color = self.color_recognizer.recognize_color(crop)
-                self.timing_data["ColorRecognizer"] += time.time() - start
-            except Exception:
-                pass
-
-            # BRAND DETECTION
-            start = time.time()
-            brand_detections = self.brand_recognizer.detect_brands(crop)
-            self.timing_data["CarBrandRecognizer"] += time.time() - start
-            car_brand = brand_detections[0].class_name if brand_detections else None
-
-            report = RecognitionReport(
-                car_detection=vehicle,
-                plate_detection=plate_detection,
-                damage_detections=damage_detections,
-                plate_number=plate_number,
-                car_color=car_color,
-                car_brand=car_brand
+                vehicle_count = sum(len(vehicles) for vehicles in vehicle_batches)
+                self.total_vehicle_count += vehicle_count
+                frame["vehicles"] = vehicle_count
+                for i, reports in zip(active, self._analyze_vehicles(active_images, vehicle_batches, active_streams, batched)):
+                    results[i] = reports
+
+        # пропущені кадри отримують звіти останнього проаналізованого кадру свого потоку
+        for i, stream_id in enumerate(stream_ids):
+            stream = self._stream(stream_id)
+            if results[i] is None:
+                results[i] = stream.last_reports or []
+            else:
+                stream.last_reports = results[i]
+        return results
+
+    def _gate_frames(self, images: List[np.ndarray], stream_ids: list) -> List[int]:
+        active = []
+        with self.profiler.stage("MotionGate"):
+            for i, (image, stream_id) in enumerate(zip(images, stream_ids)):
+                if self._stream(stream_id).motion_gate.has_motion(image):
+                    active.append(i)
+        self.motion_skipped_frames += len(images) - len(active)
+        return active
+
+    def _detect_vehicles(self, images: List[np.ndarray]) -> List[List[DetectionResult]]:
+        if self.roi is None:
+            return self._run_cached("vehicle", self.vehicle_recognizer.detect_vehicles_batch, images)
+
+        # плитки всіх кадрів ідуть у детектор спільними батчами, потім рамки повертаються в координати кадру
+        tiles, owners = [], []
+        for i, image in enumerate(images):
+            for tile, offset in self.roi.tiles(image):
+                tiles.append(tile)
+                owners.append((i, offset))
+        self.roi_tile_count += len(tiles)
+
+        detections = [[] for _ in images]
+        clipped = [[] for _ in images]
+        tile_results = self._run_cached("vehicle", self.vehicle_recognizer.detect_vehicles_batch, tiles)
+        for tile, (i, offset), tile_detections in zip(tiles, owners, tile_results):
+            for d in tile_detections:
+                clipped[i].append(RegionOfInterest.is_clipped(d, tile.shape, offset, images[i].shape))
+                detections[i].append(RegionOfInterest.shift(d, offset))
+        return [self.roi.merge(d, image.shape, c) for d, c, image in zip(detections, clipped, images)]
+
+    def reset_state(self, stream_id=None):
+        if stream_id is None:
+            self.streams.clear()
+        else:
+            self.streams.pop(stream_id, None)
+
+    def _stream(self, stream_id) -> StreamState:
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            stream = StreamState(
+                VehicleTracker() if self.tracking else None,
+                PlateTextCache() if self.plate_text_cache else None,
+                MotionGate(self.motion_gate, self.motion_threshold, max_skip=self.motion_max_skip, roi=self.roi)
+                if self.motion_gate else None
             )
-            reports.append(report)
+            self.streams[stream_id] = stream
+        return stream
+
+    def _analyze_vehicles(self, images: List[np.ndarray], vehicle_batches: List[List[DetectionResult]],
+                          stream_ids: list, batched: bool | None) -> List[List[RecognitionReport]]:
+        # кадри одного потоку з трекером чи кешем номерів залежать від попередніх: k-й кадр кожного потоку
+        # йде в k-ту хвилю, і хвилі аналізуються по черзі (новий трек аналізується раз, а не на кожному кадрі батча)
+        waves = []
+        seen = defaultdict(int)
+        for i, stream_id in enumerate(stream_ids):
+            stream = self._stream(stream_id)
+            wave = 0
+            if stream.tracker is not None or stream.plate_cache is not None:
+                wave = seen[stream_id]
+                seen[stream_id] += 1
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(i)
+
+        if len(waves) == 1:
+            return self._analyze_wave(images, vehicle_batches, stream_ids, batched)
+        results = [None] * len(images)
+        for wave in waves:
+            reports = self._analyze_wave([images[i] for i in wave], [vehicle_batches[i] for i in wave],
+                                         [stream_ids[i] for i in wave], batched)
+            for i, frame_reports in zip(wave, reports):
+                results[i] = frame_reports
+        return results
+
+    def _analyze_wave(self, images: List[np.ndarray], vehicle_batches: List[List[DetectionResult]],
+                      stream_ids: list, batched: bool | None) -> List[List[RecognitionReport]]:
+        contexts_per_frame = []
+        pending = []
+        plate_retries = []
+        for image, vehicles, stream_id in zip(images, vehicle_batches, stream_ids):
+            stream = self._stream(stream_id)
+            if stream.plate_cache is not None:
+                stream.plate_cache.next_frame()
+            tracks = stream.tracker.update(vehicles) if stream.tracker is not None else [None] * len(vehicles)
+
+            contexts = []
+            for vehicle, track in zip(vehicles, tracks):
+                ctx = VehicleContext(vehicle, ImageUtils.extract_plate_image(image, vehicle.box), stream, track)
+                refresh = self._refresh_kind(stream.tracker, track) if track is not None else "full"
+                if refresh == "full":
+                    ctx.analyzed = True
+                    pending.append(ctx)
+                elif refresh == "plate":
+                    ctx.plate_retry = True
+                    plate_retries.append(ctx)
+                    self.plate_retry_count += 1
+                else:
+                    self.cached_vehicle_count += 1
+                contexts.append(ctx)
+            contexts_per_frame.append(contexts)
+
+        # кропи всіх кадрів (і всіх потоків) ідуть у моделі спільними батчами
+        if batched is None:
+            batched = self.batched
+        if batched:
+            self.pipeline.run(pending)
+            self.pipeline.run(plate_retries, only=self._PLATE_STAGES)
+        else:
+            # той самий граф стадій, але по одному кропу на прохід моделі
+            for ctx in pending:
+                self.pipeline.run([ctx], parallel=False)
+            for ctx in plate_retries:
+                self.pipeline.run([ctx], parallel=False, only=self._PLATE_STAGES)
+
+        return [[self._report_for(ctx) for ctx in contexts] for contexts in contexts_per_frame]
 
-        return reports
+    def _report_for(self, ctx: VehicleContext) -> RecognitionReport:
+        track = ctx.track
+        if track is None:
+            return self._to_report(ctx)
+
+        frame_index = ctx.stream.tracker.frame_index
+        if ctx.analyzed:
+            track.report = self._to_report(ctx)
+            track.analyzed_frame = frame_index
+            self._record_plate_attempt(track, frame_index)
+        elif ctx.plate_retry:
+            cached = track.report
+            # нове прочитання замінює лише номер, і лише якщо воно не гірше за збережене
+            if ctx.plate_number is not None and (cached.car_plate_number is None or
+                                                 (ctx.plate_confidence or 0.0) >= (cached.car_plate_confidence or 0.0)):
+                track.report = RecognitionReport(
+                    car_detection=cached.car_detection,
+                    plate_detection=ctx.plate_detection,
+                    damage_detections=cached.car_damage_detections,
+                    plate_number=ctx.plate_number,
+                    car_color=cached.car_color,
+                    car_brand=cached.car_brand,
+                    plate_confidence=ctx.plate_confidence
+                )
+            self._record_plate_attempt(track, frame_index)
+        cached = track.report
+        return RecognitionReport(
+            car_detection=ctx.vehicle,
+            plate_detection=cached.car_plate_detection,
+            damage_detections=cached.car_damage_detections,
+            plate_number=cached.car_plate_number,
+            car_color=cached.car_color,
+            car_brand=cached.car_brand,
+            plate_confidence=cached.car_plate_confidence,
+            track_id=track.track_id
+        )
+
+    _PLATE_STAGES = ("plate", "ocr")
+
+    def _refresh_kind(self, tracker: VehicleTracker, track: Track) -> str | None:
+        # "full" — усі стадії, "plate" — лише перечитати номер, None — усе з кешу трека
+        if track.report is None:
+            return "full"
+        if tracker.frame_index - track.analyzed_frame >= self.track_refresh_interval:
+            return "full"
+        # номерний знак знайдено, але прочитано невпевнено — пробуємо ще раз, з відступом після кількох невдач
+        if self._plate_unresolved(track.report) and (
+                track.plate_failures < self.track_plate_retries or
+                tracker.frame_index - track.plate_attempt_frame >= self.track_plate_retry_interval):
+            return "plate"
+        return None
+
+    def _plate_unresolved(self, report: RecognitionReport) -> bool:
+        return self.pipeline.stages["ocr"].enabled and report.car_plate_detection is not None and (
+            report.car_plate_number is None or (report.car_plate_confidence or 0.0) < self.track_min_confidence)
+
+    def _record_plate_attempt(self, track: Track, frame_index: int):
+        track.plate_attempt_frame = frame_index
+        if self._plate_unresolved(track.report):
+            track.plate_failures += 1
+        else:
+            track.plate_failures = 0
+
+    @staticmethod
+    def _to_report(ctx: VehicleContext) -> RecognitionReport:
+        return RecognitionReport(
+            car_detection=ctx.vehicle,
+            plate_detection=ctx.plate_detection,
+            damage_detections=ctx.damage_detections,
+            plate_number=ctx.plate_number,
+            car_color=ctx.car_color,
+            car_brand=ctx.car_brand,
+            plate_confidence=ctx.plate_confidence
+        )
+
+    # PLATE DETECTION
+    def _detect_plates(self, contexts: List[VehicleContext]):
+        with self.profiler.stage("PlateRecognizer - detect_plate"):
+            plate_detections = self._run_cached("plate", self.plate_recognizer.detect_plates_batch, [c.crop for c in contexts])
+        for ctx, plate_detection in zip(contexts, plate_detections):
+            ctx.plate_detection = plate_detection
+
+    # PLATE OCR
+    def _read_plates(self, contexts: List[VehicleContext]):
+        with self.profiler.stage("PlateRecognizer - recognize_text"):
+            self._read_plate_texts(contexts)
+
+    def _read_plate_texts(self, contexts: List[VehicleContext]):
+        pending, pending_images = [], []
+        for ctx in contexts:
+            plate_crop = ImageUtils.extract_plate_image(ctx.crop, ctx.plate_detection.box)
+            if plate_crop.size == 0:
+                continue
+
+            entry = None
+            plate_cache = ctx.stream.plate_cache if ctx.stream is not None else None
+            if plate_cache is not None:
+                x_offset, y_offset = ctx.vehicle.box[:2]
+                x1, y1, x2, y2 = ctx.plate_detection.box
+                entry = plate_cache.lookup((x1 + x_offset, y1 + y_offset, x2 + x_offset, y2 + y_offset), plate_crop)
+                if not plate_cache.needs_read(entry):
+                    self.plate_cache_hits += 1
+                    ctx.plate_number, ctx.plate_confidence = entry.text, entry.confidence
+                    continue
+                self.plate_cache_misses += 1
+
+            pending.append((ctx, entry))
+            pending_images.append(plate_crop)
+
+        self.ocr_call_count += len(pending_images)
+        texts = self._run_cached("ocr", self.plate_recognizer.recognize_texts, pending_images)
+        for (ctx, entry), (text, conf) in zip(pending, texts):
+            if entry is not None:
+                ctx.stream.plate_cache.add_read(entry, text, conf)
+                text, conf = entry.text, entry.confidence
+            ctx.plate_number, ctx.plate_confidence = text, conf
+
+    # DAMAGE DETECTION
+    def _detect_damages(self, contexts: List[VehicleContext]):
+        with self.profiler.stage("DamageRecognizer"):
+            damage_batches = self._run_cached("damage", self.damage_recognizer.detect_damages_batch, [c.crop for c in contexts])
+        for ctx, damage_detections in zip(contexts, damage_batches):
+            ctx.damage_detections = damage_detections or None
+
+    # COLOR DETECTION
+    def _recognize_colors(self, contexts: List[VehicleContext]):
+        with self.profiler.stage("ColorRecognizer"):
+            car_colors = self.color_recognizer.recognize_colors([c.crop for c in contexts])
+        for ctx, car_color in zip(contexts, car_colors):
+            ctx.car_color = car_color
+
+    # BRAND DETECTION
+    def _detect_brands(self, contexts: List[VehicleContext]):
+        with self.profiler.stage("CarBrandRecognizer"):
+            brand_batches = self._run_cached("brand", self.brand_recognizer.detect_brands_batch, [c.crop for c in contexts])
+        for ctx, brand_detections in zip(contexts, brand_batches):
+            ctx.car_brand = brand_detections[0].class_name if brand_detections else None
+
+    def _run_in_batches(self, detect_batch, crops: List[np.ndarray]) -> list:
+        results = []
+        for i in range(0, len(crops), self.batch_size):
+            results.extend(detect_batch(crops[i:i + self.batch_size]))
+        return results
+
+    def _run_cached(self, recognizer: str, detect_batch, images: List[np.ndarray]) -> list:
+        if self.result_cache is None or not images:
+            return self._run_in_batches(detect_batch, images)
+
+        scope = self._cache_scope(recognizer)
+        keys = [ResultCache.key(scope, image) for image in images]
+        results = self.result_cache.get_many(recognizer, keys)
+        missing = [i for i, result in enumerate(results) if result is MISS]
+        if missing:
+            computed = self._run_in_batches(detect_batch, [images[i] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+            self.result_cache.put_many([keys[i] for i in missing], computed)
+        return results
+
+    def _cache_scope(self, recognizer: str) -> str:
+        scope = self._cache_scopes.get(recognizer)
+        if scope is None:
+            if recognizer == "ocr":
+                reader = self.plate_recognizer
+                scope = self.result_cache.scope(recognizer, None, reader.ocr_langs, reader.ocr_input_size)
+            else:
+                detector = {
+                    "vehicle": self.vehicle_recognizer,
+                    "plate": self.plate_recognizer,
+                    "damage": self.damage_recognizer,
+                    "brand": self.brand_recognizer,
+                }[recognizer]
+                scope = self.result_cache.scope(recognizer, detector.weights_path, detector.yolo_conf, detector.yolo_iou,
+                                                self.registry.backend_for(detector.weights_path))
+            self._cache_scopes[recognizer] = scope
+        return scope
+
+    _FRAME_STAGES = ("VehicleRecognizer", "MotionGate")
+
+    _COUNTERS = ("call_count", "total_vehicle_count", "cached_vehicle_count", "plate_retry_count",
+                 "ocr_call_count", "plate_cache_hits", "plate_cache_misses",
+                 "motion_skipped_frames", "roi_tile_count")
+
+    def stats_state(self) -> dict:
+        state = {name: getattr(self, name) for name in self._COUNTERS}
+        state["profiler"] = self.profiler.export_state()
+        if self.result_cache is not None:
+            self.result_cache.flush()
+            state["result_cache"] = self.result_cache.export_stats()
+        return state
+
+    def merge_stats(self, state: dict):
+        for name in self._COUNTERS:
+            setattr(self, name, getattr(self, name) + state[name])
+        self.profiler.merge_state(state["profiler"])
+        if self.result_cache is not None and "result_cache" in state:
+            self.result_cache.merge_stats(state["result_cache"])
+
+    def reset_stats(self):
+        for name in self._COUNTERS:
+            setattr(self, name, 0)
+        if self.result_cache is not None:
+            self.result_cache.reset_stats()
+        profiler = StageProfiler()
+        profiler.configure_export(self.profiler.metrics_path, self.profiler.metrics_format,
+                                  self.profiler.metrics_interval, self.profiler.trace_path)
+        self.profiler = profiler
+        self.timing_data = profiler.totals
 
     def write_average_times(self, output_file: str = "recognition_times_avg.log"):
         with open(output_file, "w") as f:
             f.write(f"🔎 Загальна кількість кадрів: {self.call_count}\n")
-            f.write(f"🚗 Загальна кількість розпізнаних авто: {self.total_vehicle_count}\n\n")
+            f.write(f"🚗 Загальна кількість розпізнаних авто: {self.total_vehicle_count}\n")
+            if self.tracking:
+                f.write(f"♻️ Атрибути взято з кешу треків: {self.cached_vehicle_count} авто\n")
+                f.write(f"🔁 Повторних читань номера (без інших стадій): {self.plate_retry_count}\n")
+            f.write(f"🔤 Викликів OCR: {self.ocr_call_count}\n")
+            if self.plate_text_cache:
+                f.write(f"📦 Номери з кешу OCR: {self.plate_cache_hits} (промахів: {self.plate_cache_misses})\n")
+            if self.motion_gate:
+                self._write_motion_savings(f)
+            if self.roi is not None:
+                analyzed = self.call_count - self.motion_skipped_frames
+                f.write(f"🔲 Плиток ROI у детектор авто: {self.roi_tile_count} "
+                        f"({self.roi_tile_count / analyzed if analyzed else 0:.1f} на кадр)\n")
+            if self.result_cache is not None:
+                self._write_cache_hit_rate(f)
+            f.write("\n")
+
+            if self.registry.load_times:
+                f.write("⏱️ Завантаження моделей:\n")
+                for key, load_time in self.registry.load_times.items():
+                    f.write(f"  ├─ {key}: {load_time:.2f} sec\n")
+                if self.model_load_time:
+                    f.write(f"  └─ Паралельне попереднє завантаження: {self.model_load_time:.2f} sec\n")
+                f.write("\n")
 
             for name, total_time in self.timing_data.items():
                 time_per_frame = total_time / self.call_count if self.call_count else 0
-                time_per_vehicle = total_time / self.total_vehicle_count if self.total_vehicle_count and name != "VehicleRecognizer" else None
+                time_per_vehicle = total_time / self.total_vehicle_count if self.total_vehicle_count and name not in self._FRAME_STAGES else None
+                latency = self.profiler.histograms[name]
 
                 f.write(f"{name}:\n")
                 f.write(f"  ├─ Середній час на кадр:   {time_per_frame:.4f} sec\n")
+                f.write(f"  ├─ Виклик p50/p95/p99:     {latency.percentile(50):.4f} / "
+                        f"{latency.percentile(95):.4f} / {latency.percentile(99):.4f} sec\n")
                 if time_per_vehicle is not None:
                     f.write(f"  └─ Середній час на авто:   {time_per_vehicle:.4f} sec\n")
                 else:
-                    f.write(f"  └─ (не обчислюється на авто — це детектор авто)\n")
-                f.write("\n")
\ No newline at end of file
+                    f.write(f"  └─ (не обчислюється на авто — стадія рівня кадру)\n")
+                f.write("\n")
+
+            frame_latency = self.profiler.histograms["frame"]
+            if frame_latency.count:
+                f.write("Кадр загалом (за кількістю авто в кадрі):\n")
+                for bucket, latency in self.profiler.by_vehicle_count["frame"].items():
+                    f.write(f"  ├─ {bucket} авто: p50/p95/p99 {latency.percentile(50):.4f} / "
+                            f"{latency.percentile(95):.4f} / {latency.percentile(99):.4f} sec ({latency.count} кадр.)\n")
+                f.write(f"  └─ усі: p50/p95/p99 {frame_latency.percentile(50):.4f} / "
+                        f"{frame_latency.percentile(95):.4f} / {frame_latency.percentile(99):.4f} sec\n")
+
+        self.profiler.flush()
+
+    def _write_cache_hit_rate(self, f):
+        cache = self.result_cache
+        cache.flush()
+        stats = cache.stats
+        memory_hits = sum(s[0] for s in stats.values())
+        disk_hits = sum(s[1] for s in stats.values())
+        lookups = memory_hits + disk_hits + sum(s[2] for s in stats.values())
+        f.write(f"💾 Кеш результатів: влучань {memory_hits + disk_hits} з {lookups} "
+                f"({(memory_hits + disk_hits) / lookups if lookups else 0:.1%}; з пам'яті {memory_hits}, з диска {disk_hits}), "
+                f"на диску {cache.disk_bytes() / 2 ** 20:.1f} MB з {cache.max_bytes / 2 ** 20:.1f} MB, витіснено: {cache.evicted}\n")
+        for i, (name, (memory, disk, missed)) in enumerate(stats.items()):
+            total = memory + disk + missed
+            branch = "└─" if i == len(stats) - 1 else "├─"
+            f.write(f"  {branch} {name}: {memory + disk}/{total} ({(memory + disk) / total if total else 0:.1%})\n")
+
+    def _write_motion_savings(self, f):
+        skipped = self.motion_skipped_frames
+        analyzed = self.call_count - skipped
+        gate_time = self.timing_data.get("MotionGate", 0.0)
+        analysis_time = sum(t for name, t in self.timing_data.items() if name != "MotionGate")
+        saved = skipped * analysis_time / analyzed if analyzed else 0.0
+        f.write(f"🎞️ Кадрів без руху (взято попередні звіти): {skipped} з {self.call_count} "
+                f"({skipped / self.call_count if self.call_count else 0:.1%})\n")
+        f.write(f"⏳ Заощаджено ≈ {saved:.2f} sec аналізу (перевірка руху: {gate_time:.2f} sec)\n")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import numpy as np
+from typing import List, Optional
+from recognizers.DetectionResult import DetectionResult
+
+
+class Track:
+    def __init__(self, track_id: int, detection: DetectionResult, frame_index: int):
+        self.track_id = track_id
+        self.box = np.array(detection.box, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.detection = detection
+        self.hits = 1
+        self.misses = 0
+        self.last_seen = frame_index
+
+        # кеш дорогих атрибутів (номер, колір, марка, пошкодження)
+        self.report = None
+        self.analyzed_frame = -1
+        # невдалі спроби прочитати номер і кадр останньої спроби (для відступу між повторами)
+        self.plate_failures = 0
+        self.plate_attempt_frame = -1
+
+    def predict(self) -> np.ndarray:
+        return self.box + self.velocity
+
+    def update(self, detection: DetectionResult, frame_index: int, smoothing: float):
+        box = np.array(detection.box, dtype=np.float32)
+        frames = max(frame_index - self.last_seen, 1)
+        self.velocity = smoothing * self.velocity + (1 - smoothing) * (box - self.box) / frames
+        self.box = box
+        self.detection = detection
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = frame_index
+
+
+class VehicleTracker:
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 30, velocity_smoothing: float = 0.7):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.velocity_smoothing = velocity_smoothing
+        self.tracks: List[Track] = []
+        self.frame_index = -1
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+        self.frame_index = -1
+        self._next_id = 1
+
+    def update(self, detections: List[DetectionResult]) -> List[Track]:
+        self.frame_index += 1
+        assigned: List[Optional[Track]] = [None] * len(detections)
+
+        if self.tracks and detections:
+            predicted = np.stack([track.predict() for track in self.tracks])
+            boxes = np.array([d.box for d in detections], dtype=np.float32)
+            iou = self.iou_matrix(predicted, boxes)
+
+            # жадібне зіставлення: спершу пари з найбільшим IoU
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if assigned[d] is not None or self.tracks[t].last_seen == self.frame_index:
+                    continue
+                self.tracks[t].update(detections[d], self.frame_index, self.velocity_smoothing)
+                assigned[d] = self.tracks[t]
+
+        for i, detection in enumerate(detections):
+            if assigned[i] is None:
+                track = Track(self._next_id, detection, self.frame_index)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[i] = track
+
+        for track in self.tracks:
+            if track.last_seen != self.frame_index:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        return assigned
+
+    @staticmethod
+    def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+        y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+        x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+        y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+        area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        union = area_a[:, None] + area_b[None, :] - inter
+        return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
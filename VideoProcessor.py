@@ -1,12 +1,48 @@
+import queue
+import threading
+import time
 import cv2
 from VehicleAnalysisSystem import VehicleAnalysisSystem
 from ReportVisualizer import ReportVisualizer
+from ReportSink import ReportSink
+from FrameSampler import FrameSampler
+from DegradationController import DegradationController
+from StageProfiler import LatencyHistogram
+
+_END_OF_STREAM = object()
+
+
+class PipelineStageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0
+        self.input_stall_time = 0.0   # чекали на вхідну чергу (стадія голодує)
+        self.output_stall_time = 0.0  # чекали на вихідну чергу (backpressure)
+        self.queue_depth_sum = 0
+        self.queue_depth_max = 0
+
+    def record_queue_depth(self, depth: int):
+        self.queue_depth_sum += depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    def to_dict(self):
+        return {
+            "items": self.items,
+            "busy_time": self.busy_time,
+            "input_stall_time": self.input_stall_time,
+            "output_stall_time": self.output_stall_time,
+            "avg_output_queue_depth": self.queue_depth_sum / self.items if self.items else 0.0,
+            "max_output_queue_depth": self.queue_depth_max
+        }
+
 
 class VideoProcessor:
     def __init__(self, system: VehicleAnalysisSystem):
         self.system = system
 
-    def process_video(self, video_path: str, output_path: str = None, max_frames: int = -1):
+    def process_video(self, video_path: str, output_path: str = None, max_frames: int = -1,
+                      report_sink: ReportSink | None = None):
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
@@ -21,6 +57,7 @@ class VideoProcessor:
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
             writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
 
+        self.system.reset_state()
         frame_count = 0
 
         while cap.isOpened():
@@ -30,6 +67,8 @@ class VideoProcessor:
 
             # Аналіз зображення
             reports = self.system.analyze_image(frame)
+            if report_sink:
+                report_sink.write_frame(frame_count, reports, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
             for report in reports:
                 frame = ReportVisualizer.draw_report(frame, report)
 
@@ -46,6 +85,365 @@ class VideoProcessor:
         cap.release()
         if writer:
             writer.release()
-        cv2.destroyAllWindows()
+        if report_sink:
+            report_sink.flush()
+        self.system.write_average_times()
+        print(f"\n✅ Завершено. Оброблено {frame_count} кадр(ів) із {min(total_frames, max_frames) if max_frames > 0 else total_frames}.")
+
+    def process_video_sampled(self, video_path: str, sampler: FrameSampler, output_path: str = None,
+                              report_sink: ReportSink | None = None) -> dict:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
+
+        writer = None
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if output_path:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            writer = cv2.VideoWriter(output_path, fourcc, sampler.output_fps(fps), (frame_width, frame_height))
+
+        self.system.reset_state()
+        frame_count = 0
+        start = time.perf_counter()
+
+        for frame_index, timestamp, frame in sampler.frames(cap):
+            reports = self.system.analyze_image(frame)
+            # звіти мають індекс і час кадру у вихідному відео, а не порядковий номер вибірки
+            if report_sink:
+                report_sink.write_frame(frame_index, reports, timestamp)
+            for report in reports:
+                frame = ReportVisualizer.draw_report(frame, report)
+            if writer:
+                writer.write(frame)
+
+            frame_count += 1
+            print(f"🧠 Оброблено кадрів: {frame_count} (кадр {frame_index}/{total_frames}, {timestamp:.1f} sec)", end='\r')
+
+        elapsed = time.perf_counter() - start
+        cap.release()
+        if writer:
+            writer.release()
+        if report_sink:
+            report_sink.flush()
+        self.system.write_average_times()
+
+        summary = dict(sampler.summary(), analyzed=frame_count, elapsed=elapsed)
+        print(f"\n✅ Завершено. Проаналізовано {frame_count} кадр(ів), пропущено без декодування в BGR: "
+              f"{sampler.grabbed - sampler.retrieved}, перемотувань: {sampler.seeks}.")
+        print(f"⏱️ grab: {sampler.grab_time:.2f} sec, retrieve: {sampler.retrieve_time:.2f} sec, усього: {elapsed:.2f} sec")
+        return summary
+
+    def process_video_pipelined(self, video_path: str, output_path: str = None, max_frames: int = -1,
+                                queue_size: int = 8, report_sink: ReportSink | None = None,
+                                sampler: FrameSampler | None = None) -> dict:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
+
+        writer = None
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if output_path:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            writer = cv2.VideoWriter(output_path, fourcc, sampler.output_fps(fps) if sampler else fps,
+                                     (frame_width, frame_height))
+
+        self.system.reset_state()
+
+        # decode -> analyze -> annotate -> encode; кожна стадія — один потік, тож FIFO-черги
+        # зберігають порядок кадрів, а обмежений розмір черг дає backpressure
+        decoded_q = queue.Queue(maxsize=queue_size)
+        analyzed_q = queue.Queue(maxsize=queue_size)
+        annotated_q = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+
+        def decode():
+            if sampler is not None:
+                for frame_index, timestamp, frame in sampler.frames(cap):
+                    yield frame_index, frame, timestamp
+                return
+            frame_index = 0
+            while not (max_frames > 0 and frame_index >= max_frames):
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield frame_index, frame, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                frame_index += 1
+
+        def analyze(item):
+            frame_index, frame, timestamp = item
+            return frame_index, frame, timestamp, self.system.analyze_image(frame)
+
+        def annotate(item):
+            frame_index, frame, timestamp, reports = item
+            # звіти пишуться в тій самій стадії, тож порядок кадрів зберігається
+            if report_sink:
+                report_sink.write_frame(frame_index, reports, timestamp)
+            for report in reports:
+                frame = ReportVisualizer.draw_report(frame, report)
+            return frame_index, frame
+
+        def encode(item):
+            frame_index, frame = item
+            if writer:
+                writer.write(frame)
+            print(f"🧠 Оброблено кадрів: {frame_index + 1}/{total_frames}", end='\r')
+            return None
+
+        stats = [PipelineStageStats(name) for name in ("decode", "analyze", "annotate", "encode")]
+        threads = [
+            threading.Thread(target=self._run_source_stage, args=(decode, decoded_q, stats[0], stop, errors)),
+            threading.Thread(target=self._run_stage, args=(analyze, decoded_q, analyzed_q, stats[1], stop, errors)),
+            threading.Thread(target=self._run_stage, args=(annotate, analyzed_q, annotated_q, stats[2], stop, errors)),
+            threading.Thread(target=self._run_stage, args=(encode, annotated_q, None, stats[3], stop, errors)),
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        cap.release()
+        if writer:
+            writer.release()
+        if report_sink:
+            report_sink.flush()
+
+        if errors:
+            raise errors[0]
+
+        self.system.write_average_times()
+        summary = self._summarize_pipeline(stats, elapsed)
+        self._print_pipeline_summary(summary)
+        return summary
+
+    def process_video_realtime(self, video_path: str, output_path: str = None, max_frames: int = -1,
+                               budget: float | None = None, degrade_order=("brand", "damage", "colour"),
+                               report_sink: ReportSink | None = None) -> dict:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Не вдалося відкрити відео: {video_path}")
+
+        writer = None
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        budget = budget or 1.0 / fps
+
+        if output_path:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+
+        self.system.reset_state()
+        controller = DegradationController(self.system.pipeline, budget, degrade_order)
+        latency = LatencyHistogram()
+
+        # джерело «живе» у власному потоці з рідним FPS; аналіз завжди бере найновіший кадр
+        cond = threading.Condition()
+        state = {"latest": None, "finished": False, "captured": 0, "dropped": 0}
+        stop = threading.Event()
+        errors = []
+
+        def capture():
+            next_due = time.perf_counter()
+            try:
+                while not stop.is_set() and not (max_frames > 0 and state["captured"] >= max_frames):
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    next_due += 1.0 / fps
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    item = (state["captured"], frame, time.perf_counter(), cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+                    with cond:
+                        if state["latest"] is not None:
+                            state["dropped"] += 1
+                        state["latest"] = item
+                        state["captured"] += 1
+                        cond.notify()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                with cond:
+                    state["finished"] = True
+                    cond.notify()
+
+        processed = deadline_misses = 0
+        capture_thread = threading.Thread(target=capture)
+        start = time.perf_counter()
+        capture_thread.start()
+        try:
+            while True:
+                with cond:
+                    while state["latest"] is None and not state["finished"]:
+                        cond.wait(0.1)
+                    item, state["latest"] = state["latest"], None
+                if item is None:
+                    break
+
+                frame_index, frame, captured_at, timestamp = item
+                analysis_start = time.perf_counter()
+                reports = self.system.analyze_image(frame)
+                processing_time = time.perf_counter() - analysis_start
+                controller.observe(frame_index, processing_time)
+
+                if report_sink:
+                    report_sink.write_frame(frame_index, reports, timestamp)
+                for report in reports:
+                    frame = ReportVisualizer.draw_report(frame, report)
+                if writer:
+                    writer.write(frame)
+
+                # затримка від появи кадру в джерелі до готового анотованого кадру
+                end_to_end = time.perf_counter() - captured_at
+                latency.record(end_to_end)
+                deadline_misses += end_to_end > budget
+                processed += 1
+                degraded = ",".join(controller.degraded_stages) or "-"
+                print(f"🧠 Оброблено кадрів: {processed} (відкинуто: {state['dropped']}, вимкнено: {degraded})", end='\r')
+        finally:
+            stop.set()
+            capture_thread.join()
+            controller.restore()
+            elapsed = time.perf_counter() - start
+            cap.release()
+            if writer:
+                writer.release()
+            if report_sink:
+                report_sink.flush()
+
+        if errors:
+            raise errors[0]
+
         self.system.write_average_times()
-        print(f"\n✅ Завершено. Оброблено {frame_count} кадр(ів) із {min(total_frames, max_frames) if max_frames > 0 else total_frames}.")
\ No newline at end of file
+        summary = dict(
+            controller.summary(),
+            captured=state["captured"],
+            processed=processed,
+            dropped=state["dropped"],
+            deadline_misses=deadline_misses,
+            elapsed=elapsed,
+            fps=processed / elapsed if elapsed > 0 else 0.0,
+            latency=latency.summary(),
+        )
+        self._print_realtime_summary(summary)
+        return summary
+
+    @staticmethod
+    def _print_realtime_summary(summary: dict):
+        captured = summary["captured"]
+        latency = summary["latency"]
+        print(f"\n✅ Завершено. Оброблено {summary['processed']} з {captured} кадр(ів) за {summary['elapsed']:.2f} sec "
+              f"({summary['fps']:.2f} FPS)")
+        print(f"🗑️ Відкинуто кадрів: {summary['dropped']} ({summary['dropped'] / captured if captured else 0:.1%}), "
+              f"пропущено дедлайнів ({summary['budget'] * 1000:.0f} ms): {summary['deadline_misses']}")
+        print(f"⏱️ Затримка end-to-end p50/p95/p99/max: {latency['p50']:.3f} / {latency['p95']:.3f} / "
+              f"{latency['p99']:.3f} / {latency['max']:.3f} sec")
+        print(f"📉 Деградацій: {summary['degradations']}, відновлень: {summary['recoveries']}")
+        for level, frames in summary["frames_at_level"].items():
+            print(f"  ├─ {level}: {frames} кадр.")
+        skips = ", ".join(f"{name} — {frames} кадр." for name, frames in summary["stage_skips"].items())
+        print(f"  └─ Вимкнені стадії: {skips or 'жодної'}")
+
+    @staticmethod
+    def _run_source_stage(produce, out_q, stats, stop, errors):
+        try:
+            items = produce()
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                stats.busy_time += time.perf_counter() - start
+                stats.items += 1
+                VideoProcessor._put(out_q, item, stats, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            VideoProcessor._put(out_q, _END_OF_STREAM, None, stop)
+
+    @staticmethod
+    def _run_stage(work, in_q, out_q, stats, stop, errors):
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = VideoProcessor._get(in_q, stop)
+                stats.input_stall_time += time.perf_counter() - wait_start
+                if item is _END_OF_STREAM:
+                    break
+
+                start = time.perf_counter()
+                result = work(item)
+                stats.busy_time += time.perf_counter() - start
+                stats.items += 1
+
+                if out_q is not None:
+                    VideoProcessor._put(out_q, result, stats, stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if out_q is not None:
+                VideoProcessor._put(out_q, _END_OF_STREAM, None, stop)
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stats, stop: threading.Event):
+        if stats is not None:
+            stats.record_queue_depth(q.qsize())
+        wait_start = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                # стадія-споживач впала — далі ніхто не читатиме, тож не блокуємося
+                if stop.is_set():
+                    return
+        if stats is not None:
+            stats.output_stall_time += time.perf_counter() - wait_start
+
+    @staticmethod
+    def _get(q: queue.Queue, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END_OF_STREAM
+
+    @staticmethod
+    def _summarize_pipeline(stats: list, elapsed: float) -> dict:
+        frames = stats[-1].items
+        bottleneck = max(stats, key=lambda s: s.busy_time)
+        return {
+            "frames": frames,
+            "elapsed": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "bottleneck": bottleneck.name,
+            "stages": {s.name: s.to_dict() for s in stats}
+        }
+
+    @staticmethod
+    def _print_pipeline_summary(summary: dict):
+        print(f"\n✅ Завершено. Оброблено {summary['frames']} кадр(ів) за {summary['elapsed']:.2f} sec "
+              f"({summary['fps']:.2f} FPS)")
+        for name, s in summary["stages"].items():
+            print(f"  {name}:")
+            print(f"    ├─ Робота:              {s['busy_time']:.3f} sec")
+            print(f"    ├─ Очікування входу:    {s['input_stall_time']:.3f} sec")
+            print(f"    ├─ Очікування виходу:   {s['output_stall_time']:.3f} sec")
+            print(f"    └─ Глибина черги:       сер. {s['avg_output_queue_depth']:.1f}, макс. {s['max_output_queue_depth']}")
+        print(f"🐢 Обмежувальна стадія: {summary['bottleneck']}")
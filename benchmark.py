@@ -0,0 +1,163 @@
+import argparse
+import sys
+import cv2
+from ImageUtils import ImageUtils
+from recognizers.InferenceBackends import BACKENDS
+from recognizers.ModelRegistry import ModelRegistry
+from benchmarks.BenchmarkSuite import BenchmarkSuite, save_results, load_results, compare_results, validate_backends
+from benchmarks.ServerLoad import run_load, print_load
+from benchmarks.SyntheticScene import SyntheticScene
+from InferenceClient import InferenceClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vehicle Analysis benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run benchmarks on synthetic frames and save results as JSON")
+    run.add_argument("--output", help="Path to save results JSON", default="benchmark_results.json")
+    run.add_argument("--backend", choices=["auto", "stub", "real"], help="Stub models, real weights, or real when weights are present", default="auto")
+    run.add_argument("--only", help="Comma-separated benchmarks to run: analyze_image,recognize_color,draw_report,process_video,frame_transport,server,sighting_index", default=None)
+    run.add_argument("--vehicles", type=int, help="Vehicles per synthetic frame", default=5)
+    run.add_argument("--width", type=int, help="Synthetic frame width", default=1280)
+    run.add_argument("--height", type=int, help="Synthetic frame height", default=720)
+    run.add_argument("--repeat", type=int, help="Timed calls per benchmark", default=20)
+    run.add_argument("--video-frames", type=int, help="Frames in the synthetic video", default=50)
+    run.add_argument("--stub-latency-ms", type=float, help="Simulated latency of every stub model call", default=0.0)
+    run.add_argument("--stub-per-image-ms", type=float, help="Simulated extra latency per image in a stub model call", default=0.0)
+    run.add_argument("--batch-size", type=int, help="Max vehicle crops per batched model call", default=16)
+    run.add_argument("--seed", type=int, help="Seed of the synthetic scene", default=0)
+    run.add_argument("--sightings", type=int, help="Synthetic sightings in the sighting index benchmark", default=200000)
+    run.add_argument("--baseline", help="Compare against this results JSON after the run", default=None)
+    run.add_argument("--threshold", type=float, help="Allowed relative slowdown before a change counts as a regression", default=0.1)
+
+    compare = sub.add_parser("compare", help="Compare two results JSON files")
+    compare.add_argument("baseline", help="Baseline results JSON")
+    compare.add_argument("current", help="Current results JSON")
+    compare.add_argument("--threshold", type=float, help="Allowed relative slowdown before a change counts as a regression", default=0.1)
+    compare.add_argument("--memory-threshold", type=float, help="Allowed relative peak memory growth (defaults to --threshold)", default=None)
+
+    backends = sub.add_parser("backends", help="Check accuracy and speed of an exported backend against PyTorch")
+    backends.add_argument("samples", help="Directory or glob of sample frames")
+    backends.add_argument("--backend", choices=[b for b in BACKENDS if b != "pytorch"], help="Backend to check", default="onnx")
+    backends.add_argument("--models", help="Comma-separated detectors to check: vehicle,plate,damage,brand", default=None)
+    backends.add_argument("--calibration", help="Directory or glob of frames for static INT8 calibration (defaults to the samples)", default=None)
+    backends.add_argument("--export-dir", help="Directory for exported models", default=None)
+    backends.add_argument("--yolov5-repo", help="Local yolov5 checkout", default=None)
+    backends.add_argument("--min-recall", type=float, help="Fail when a detector keeps fewer of the PyTorch boxes than this", default=0.95)
+    backends.add_argument("--output", help="Path to save results JSON", default=None)
+
+    load = sub.add_parser("load", help="Generate load against a running analysis server (main.py serve)")
+    load.add_argument("address", help="Server address: http://HOST:PORT or unix:/path/to/socket")
+    load.add_argument("--images", help="Directory or glob of images to send (default: synthetic frames)", default=None)
+    load.add_argument("--concurrency", help="Comma-separated numbers of concurrent clients", default="1,4,16")
+    load.add_argument("--requests", type=int, help="Requests per concurrency level", default=200)
+    load.add_argument("--encoding", choices=[".jpg", ".png", "raw"], help="How frames are sent: compressed or raw BGR bytes", default=".jpg")
+    load.add_argument("--width", type=int, help="Synthetic frame width", default=1280)
+    load.add_argument("--height", type=int, help="Synthetic frame height", default=720)
+    load.add_argument("--vehicles", type=int, help="Vehicles per synthetic frame", default=5)
+    load.add_argument("--output", help="Path to save results JSON", default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        suite = BenchmarkSuite(
+            backend=args.backend,
+            vehicles=args.vehicles,
+            width=args.width,
+            height=args.height,
+            repeat=args.repeat,
+            video_frames=args.video_frames,
+            latency=args.stub_latency_ms / 1000,
+            per_image_latency=args.stub_per_image_ms / 1000,
+            batch_size=args.batch_size,
+            seed=args.seed,
+            sightings=args.sightings,
+        )
+        results = suite.run(args.only.split(",") if args.only else None)
+        save_results(results, args.output)
+        print_results(results)
+        print(f"✅ Результати збережено: {args.output}")
+        if args.baseline:
+            sys.exit(report_comparison(compare_results(load_results(args.baseline), results, args.threshold)))
+    elif args.command == "backends":
+        samples = ImageUtils.list_images(args.samples)
+        registry = ModelRegistry(yolov5_repo=args.yolov5_repo, export_dir=args.export_dir,
+                                 calibration_images=ImageUtils.list_images(args.calibration) if args.calibration else samples)
+        images = [img for img in (cv2.imread(p) for p in samples) if img is not None]
+        results = validate_backends(registry, images, args.backend, args.models.split(",") if args.models else None)
+        if args.output:
+            save_results(results, args.output)
+        sys.exit(report_backends(results, args.min_recall))
+    elif args.command == "load":
+        sys.exit(run_load_levels(args))
+    else:
+        rows = compare_results(load_results(args.baseline), load_results(args.current),
+                               args.threshold, args.memory_threshold)
+        sys.exit(report_comparison(rows))
+
+
+def print_results(results: dict):
+    print(f"\nBackend: {results['meta']['backend']}, vehicles per frame: {results['meta']['vehicles']}")
+    for name, r in results["results"].items():
+        peak = f"  peak {r['peak_memory_bytes'] / 1024 / 1024:7.2f} MiB" if "peak_memory_bytes" in r else ""
+        print(f"{name:<16} {r['fps']:>10.1f} fps  mean {r['mean'] * 1000:8.2f} ms  p95 {r['p95'] * 1000:8.2f} ms{peak}")
+        for level in r.get("levels", []):
+            print_load(level)
+        for stage, s in r.get("stages", {}).items():
+            print(f"    {stage:<34} mean {s['mean'] * 1000:8.2f} ms  p95 {s['p95'] * 1000:8.2f} ms")
+        if "queue" in r:
+            q = r["queue"]
+            print(f"    {'pickled queue':<34} {q['fps']:>8.1f} fps  {q['copies_per_frame']} copies/frame  "
+                  f"{q['copy_bandwidth'] / 2 ** 20:8.1f} MiB/s copied")
+            print(f"    {'shared-memory ring':<34} {r['fps']:>8.1f} fps  {r['copies_per_frame']} copies/frame  "
+                  f"({r['speedup']:.2f}x)")
+
+
+def run_load_levels(args) -> int:
+    if not InferenceClient(args.address).health():
+        print(f"❌ Сервер аналізу недоступний: {args.address}")
+        return 1
+    if args.images:
+        images = [img for img in (cv2.imread(p) for p in ImageUtils.list_images(args.images)) if img is not None]
+    else:
+        images = list(SyntheticScene(args.width, args.height, args.vehicles).frames(8))
+    print(f"🚀 Навантаження на {args.address}: {args.requests} запитів на рівень, {len(images)} різних кадрів")
+    runs = []
+    for level in (int(c) for c in args.concurrency.split(",")):
+        runs.append(run_load(args.address, images, level, args.requests, args.encoding))
+        print_load(runs[-1])
+    server = InferenceClient(args.address).metrics()
+    print(f"📊 Сервер: батчів {server['batches']}, середній батч {server['avg_batch_size']:.2f}, "
+          f"макс. глибина черги {server['queue_depth_max']}, відхилено {server['rejected']}")
+    if args.output:
+        save_results({"address": args.address, "encoding": args.encoding, "levels": runs, "server": server}, args.output)
+    return 1 if any(r["errors"] for r in runs) else 0
+
+
+def report_backends(results: dict, min_recall: float) -> int:
+    failed = 0
+    for name, r in results.items():
+        ok = r["recall"] >= min_recall
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {name:<8} {r['backend']:<17} recall {r['recall']:.3f}  precision {r['precision']:.3f}  "
+              f"IoU {r['mean_iou']:.3f}  Δconf {r['mean_conf_delta']:.3f}  "
+              f"{r['reference_latency'] * 1000:.1f} -> {r['candidate_latency'] * 1000:.1f} ms ({r['speedup']:.2f}x)")
+    return 1 if failed else 0
+
+
+def report_comparison(rows: list) -> int:
+    regressions = [row for row in rows if row["regression"]]
+    for row in rows:
+        mark = "❌" if row["regression"] else "  "
+        print(f"{mark} {row['benchmark']:<16} {row['metric']:<18} {row['baseline']:>14.6g} -> {row['current']:<14.6g} "
+              f"({row['change']:+.1%})")
+    if regressions:
+        print(f"\n❌ Регресій: {len(regressions)}")
+        return 1
+    print("\n✅ Регресій не виявлено")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
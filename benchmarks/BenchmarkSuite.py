@@ -0,0 +1,362 @@
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, List, Optional
+from VehicleAnalysisSystem import VehicleAnalysisSystem
+from ReportVisualizer import ReportVisualizer
+from VideoProcessor import VideoProcessor
+from SharedFrameRing import SharedFrameRing
+from recognizers.ColorRecognizer import ColorRecognizer
+from recognizers.ModelRegistry import ModelRegistry
+from benchmarks.SyntheticScene import SyntheticScene
+from benchmarks.StubModels import StubModelRegistry, STUB_WEIGHTS
+from benchmarks.ServerLoad import start_server, run_load
+from InferenceServer import InferenceServer
+from SightingIndex import SightingIndex
+
+REAL_WEIGHTS = {
+    "vehicle_weights": 'car-detect-weights/weights/best.pt',
+    "plate_weights": 'car-numbers-weights/weights/best.pt',
+    "damage_weights": 'car-damage-weights/best.pt',
+    "brand_weights": 'car-brand-weights/best.pt',
+}
+
+# метрики, для яких більше значення — гірше; fps порівнюється навпаки
+LOWER_IS_BETTER = ("mean", "p50", "p95", "peak_memory_bytes")
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1, items_per_call: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    # пікову пам'ять міряємо окремим прогоном: tracemalloc суттєво сповільнює виконання
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = np.array(times)
+    return {
+        "calls": repeat,
+        "mean": float(times.mean()),
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+        "fps": items_per_call * repeat / float(times.sum()) if times.sum() > 0 else 0.0,
+        "peak_memory_bytes": int(peak),
+    }
+
+
+def _transport_consumer(spec: Optional[dict], tasks, acks):
+    # воркер без моделей: лише торкається кадру, щоб виміряти чисту вартість передачі
+    ring = SharedFrameRing.attach(spec) if spec else None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        if ring is not None:
+            slot, seq = task
+            frame = ring.view(slot, seq)
+            acks.put(int(frame[::64, ::64, 0].sum()))
+            del frame
+            ring.release(slot)
+        else:
+            acks.put(int(task[::64, ::64, 0].sum()))
+    if ring is not None:
+        ring.close()
+
+
+class BenchmarkSuite:
+    def __init__(self, backend: str = "auto", vehicles: int = 5, width: int = 1280, height: int = 720,
+                 repeat: int = 20, video_frames: int = 50, latency: float = 0.0, per_image_latency: float = 0.0,
+                 batch_size: int = 16, seed: int = 0, sightings: int = 200000):
+        self.backend = self._resolve_backend(backend)
+        self.vehicles = vehicles
+        self.width = width
+        self.height = height
+        self.repeat = repeat
+        self.video_frames = video_frames
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.batch_size = batch_size
+        self.seed = seed
+        self.sightings = sightings
+
+    @staticmethod
+    def _resolve_backend(backend: str) -> str:
+        if backend == "auto":
+            return "real" if all(os.path.isfile(p) for p in REAL_WEIGHTS.values()) else "stub"
+        return backend
+
+    def _build_system(self, **kwargs) -> VehicleAnalysisSystem:
+        if self.backend == "stub":
+            registry = StubModelRegistry(latency=self.latency, per_image_latency=self.per_image_latency)
+            weights = STUB_WEIGHTS
+        else:
+            registry = ModelRegistry()
+            weights = REAL_WEIGHTS
+        system = VehicleAnalysisSystem(**weights, batch_size=self.batch_size, registry=registry, **kwargs)
+        system.preload_models()
+        return system
+
+    def _scene(self) -> SyntheticScene:
+        return SyntheticScene(self.width, self.height, self.vehicles, self.seed)
+
+    def run(self, names: Optional[List[str]] = None) -> dict:
+        benchmarks = {
+            "analyze_image": self.bench_analyze_image,
+            "recognize_color": self.bench_recognize_color,
+            "draw_report": self.bench_draw_report,
+            "process_video": self.bench_process_video,
+            "frame_transport": self.bench_frame_transport,
+            "server": self.bench_server,
+            "sighting_index": self.bench_sighting_index,
+        }
+        results = {}
+        for name, bench in benchmarks.items():
+            if names and name not in names:
+                continue
+            print(f"⏱️ {name}...")
+            results[name] = bench()
+        return {"meta": self.meta(), "results": results}
+
+    def meta(self) -> dict:
+        return {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "backend": self.backend,
+            "vehicles": self.vehicles,
+            "frame_size": [self.width, self.height],
+            "repeat": self.repeat,
+            "video_frames": self.video_frames,
+            "stub_latency": self.latency,
+            "stub_per_image_latency": self.per_image_latency,
+            "batch_size": self.batch_size,
+            "sightings": self.sightings,
+        }
+
+    def bench_analyze_image(self) -> dict:
+        system = self._build_system()
+        frame = self._scene().render()
+        result = measure(lambda: system.analyze_image(frame), self.repeat)
+        result["vehicles_detected"] = len(system.analyze_image(frame))
+        result["stages"] = {
+            name: {k: s[k] for k in ("count", "mean", "p50", "p95")}
+            for name, s in system.profiler.snapshot()["stages"].items()
+        }
+        return result
+
+    def bench_recognize_color(self) -> dict:
+        scene = self._scene()
+        frame = scene.render()
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in scene.boxes()]
+        recognizer = ColorRecognizer()
+        single = measure(lambda: [recognizer.recognize_color(c) for c in crops], self.repeat,
+                         items_per_call=len(crops))
+        single["batched"] = measure(lambda: recognizer.recognize_colors(crops), self.repeat,
+                                    items_per_call=len(crops))
+        return single
+
+    def bench_draw_report(self) -> dict:
+        system = self._build_system()
+        frame = self._scene().render()
+        reports = system.analyze_image(frame)
+
+        def draw():
+            annotated = frame.copy()
+            for report in reports:
+                annotated = ReportVisualizer.draw_report(annotated, report)
+            return annotated
+
+        return measure(draw, self.repeat)
+
+    def bench_process_video(self) -> dict:
+        system = self._build_system()
+        processor = VideoProcessor(system)
+        with tempfile.TemporaryDirectory() as tmp:
+            video = self._scene().write_video(os.path.join(tmp, "synthetic.mp4"), self.video_frames)
+            output = os.path.join(tmp, "annotated.mp4")
+            return measure(lambda: processor.process_video(video, output), repeat=max(self.repeat // 10, 1),
+                           items_per_call=self.video_frames)
+
+    def bench_frame_transport(self, slots: int = 6) -> dict:
+        # кадр у воркер: піклінг через multiprocessing.Queue проти слотів спільної пам'яті;
+        # в обох випадках «декодер» один раз пише кадр у новий буфер
+        frame = self._scene().render()
+        frames = max(self.video_frames, 2 * slots)
+        context = multiprocessing.get_context("spawn")
+        results = {}
+        for transport in ("queue", "shm"):
+            ring = SharedFrameRing.create(slots, frame.shape, context) if transport == "shm" else None
+            tasks, acks = context.Queue(maxsize=slots), context.Queue()
+            consumer = context.Process(target=_transport_consumer, args=(ring.spec() if ring else None, tasks, acks))
+            consumer.start()
+            try:
+                def send(count: int):
+                    pending = 0
+                    for _ in range(count):
+                        if pending >= slots:
+                            acks.get()
+                            pending -= 1
+                        if ring is not None:
+                            slot = ring.acquire()
+                            np.copyto(ring.slot(slot), frame)
+                            tasks.put((slot, ring.publish(slot)))
+                        else:
+                            tasks.put(frame.copy())
+                        pending += 1
+                    for _ in range(pending):
+                        acks.get()
+
+                send(slots)
+                times = []
+                for _ in range(frames):
+                    start = time.perf_counter()
+                    send(1)
+                    times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                send(frames)
+                elapsed = time.perf_counter() - start
+            finally:
+                tasks.put(None)
+                consumer.join()
+                if ring is not None:
+                    ring.close()
+
+            times = np.array(times)
+            # копії кадру поза «декодером»: піклінг + відновлення у воркері або жодної
+            copies = 2 if transport == "queue" else 0
+            results[transport] = {
+                "mean": float(times.mean()),
+                "p50": float(np.percentile(times, 50)),
+                "p95": float(np.percentile(times, 95)),
+                "fps": frames / elapsed if elapsed > 0 else 0.0,
+                "copies_per_frame": copies,
+                "copied_bytes_per_frame": copies * frame.nbytes,
+                "copy_bandwidth": copies * frame.nbytes * frames / elapsed if elapsed > 0 else 0.0,
+            }
+
+        # верхній рівень — кільце, щоб compare відстежував саме його
+        return dict(results["shm"], frame_bytes=int(frame.nbytes), queue=results["queue"],
+                    speedup=results["shm"]["fps"] / results["queue"]["fps"] if results["queue"]["fps"] else 0.0)
+
+    def bench_server(self, concurrency=(1, 4, 16), max_wait: float = 0.005) -> dict:
+        # локальний сервер із мікробатчингом під навантаженням кількох клієнтів
+        server = InferenceServer(self._build_system(tracking=False), max_batch_images=8, max_wait=max_wait)
+        thread = start_server(server)
+        images = list(self._scene().frames(8))
+        requests = max(self.repeat * 4, 32)
+        try:
+            runs = [run_load(server.address, images, level, requests) for level in concurrency]
+        finally:
+            server.stop()
+            thread.join()
+        # верхній рівень — найвища конкурентність, де мікробатчинг має найбільший ефект
+        return dict(runs[-1], levels=runs)
+
+    def bench_sighting_index(self) -> dict:
+        # кожен номер видно в кількох десятках кадрів; шукаємо з типовою помилкою OCR (0 -> O, 8 -> B)
+        rng = np.random.default_rng(self.seed)
+        alphabet = np.array(list("ABCEHKMPTX0123456789"))
+        plates = ["".join(rng.choice(alphabet, 8)) for _ in range(max(self.sightings // 30, 1))]
+        records = [{
+            "frame_index": i,
+            "timestamp": i / 25.0,
+            "stream_id": f"camera-{i % 4}",
+            "plate_number": plates[int(rng.integers(len(plates)))],
+            "plate_confidence": 0.9,
+            "color": "white",
+            "brand": "Toyota",
+            "damages": None,
+        } for i in range(self.sightings)]
+        queries = [p.replace("0", "O").replace("8", "B")[:-1] + "Z" for p in plates[:50]]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SightingIndex(os.path.join(tmp, "sightings.db"))
+            started = time.perf_counter()
+            for i in range(0, len(records), 5000):
+                index.add_records(records[i:i + 5000])
+            ingest_time = time.perf_counter() - started
+
+            lookups = iter(range(10 ** 9))
+            result = measure(lambda: index.search(queries[next(lookups) % len(queries)], max_distance=1),
+                             self.repeat * 5)
+            span = self.sightings / 25.0
+            result["range_query"] = measure(lambda: index.sightings_between(span / 2, span / 2 + 10, "camera-1"),
+                                            self.repeat * 5)
+            result["found"] = sum(bool(index.search(q, max_distance=1)) for q in queries) / len(queries)
+            result["ingest_per_sec"] = self.sightings / ingest_time if ingest_time > 0 else 0.0
+            result["size_bytes"] = index.stats()["size_bytes"]
+            index.close()
+        return result
+
+
+def validate_backends(registry: ModelRegistry, images: List[np.ndarray], backend: str,
+                      models: Optional[List[str]] = None, conf: float = 0.25, iou: float = 0.45) -> dict:
+    # детектор авто перевіряємо на кадрах, решту — на кропах авто, знайдених еталонною PyTorch-моделлю
+    vehicle_model = registry._load_pytorch_yolo(REAL_WEIGHTS["vehicle_weights"], conf, iou)
+    crops = []
+    for image in images:
+        for x1, y1, x2, y2, *_ in vehicle_model(image).xyxy[0].cpu().numpy().astype(int):
+            crops.append(image[y1:y2, x1:x2])
+
+    results = {}
+    for key, weights_path in REAL_WEIGHTS.items():
+        name = key[:-len("_weights")]
+        if models and name not in models:
+            continue
+        samples = images if name == "vehicle" else crops
+        print(f"🔎 {name}: {backend} проти pytorch на {len(samples)} зображеннях")
+        results[name] = registry.validate_backend(weights_path, backend, samples, conf, iou)
+    return results
+
+
+def save_results(results: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1,
+                    memory_threshold: Optional[float] = None) -> List[dict]:
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    rows = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        for metric in LOWER_IS_BETTER + ("fps",):
+            if metric not in base or metric not in cur or not base[metric]:
+                continue
+            change = (cur[metric] - base[metric]) / base[metric]
+            if metric == "fps":
+                change = -change
+            limit = memory_threshold if metric == "peak_memory_bytes" else threshold
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": base[metric],
+                "current": cur[metric],
+                "change": change,
+                "regression": change > limit,
+            })
+    return rows
@@ -0,0 +1,80 @@
+import itertools
+import threading
+import time
+from typing import List
+import numpy as np
+from InferenceClient import InferenceClient
+from InferenceServer import InferenceServer
+from StageProfiler import LatencyHistogram
+
+
+def start_server(server: InferenceServer, host: str = "127.0.0.1", port: int = 0) -> threading.Thread:
+    # сервер у фоновому потоці з власним циклом подій; port=0 — будь-який вільний порт
+    ready = threading.Event()
+    thread = threading.Thread(target=server.run, args=(host, port, None, ready), daemon=True)
+    thread.start()
+    if not ready.wait(30):
+        raise RuntimeError("Сервер аналізу не запустився")
+    return thread
+
+
+def run_load(address: str, images: List[np.ndarray], concurrency: int, requests: int, encoding: str = ".jpg") -> dict:
+    # кожен потік — окремий клієнт із власним з'єднанням; кадри кодуються заздалегідь, щоб міряти сервер
+    encoded = [InferenceClient(address, encoding=encoding).encode(image) for image in images]
+    tickets = itertools.count()
+    lock = threading.Lock()
+    latency = LatencyHistogram()
+    queue_wait = LatencyHistogram()
+    batch_sizes = []
+    errors = []
+
+    def client_loop():
+        with InferenceClient(address, encoding=encoding) as client:
+            while True:
+                i = next(tickets)
+                if i >= requests:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = client.analyze_encoded(*encoded[i % len(encoded)])
+                except (OSError, RuntimeError) as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latency.record(elapsed)
+                    queue_wait.record(response["queue_wait"])
+                    batch_sizes.append(response["batch_size"])
+
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    completed = latency.count
+    summary = latency.summary()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "completed": completed,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "elapsed": elapsed,
+        "fps": completed / elapsed if elapsed > 0 else 0.0,
+        "mean": summary["mean"],
+        "p50": summary["p50"],
+        "p95": summary["p95"],
+        "p99": summary["p99"],
+        "queue_wait_p95": queue_wait.percentile(95),
+        "avg_batch_size": float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+    }
+
+
+def print_load(result: dict):
+    print(f"  {result['concurrency']:>4} клієнтів: {result['fps']:8.1f} зобр./сек  p50 {result['p50'] * 1000:7.1f} ms  "
+          f"p95 {result['p95'] * 1000:7.1f} ms  p99 {result['p99'] * 1000:7.1f} ms  "
+          f"батч {result['avg_batch_size']:.2f}  помилок {result['errors']}")
@@ -0,0 +1,142 @@
+import time
+import zlib
+import cv2
+import numpy as np
+from typing import Callable, List, Optional
+from recognizers.ModelRegistry import ModelRegistry
+from benchmarks.SyntheticScene import BACKGROUND
+
+
+class _StubTensor:
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self._array
+
+
+class _StubResults:
+    def __init__(self, arrays: List[np.ndarray]):
+        self.xyxy = [_StubTensor(a) for a in arrays]
+
+
+class StubYoloModel:
+    # імітує AutoShape: model(image | [images]).xyxy[i].cpu().numpy() -> N x (x1, y1, x2, y2, conf, cls)
+    def __init__(self, detect: Callable[[np.ndarray], np.ndarray], latency: float = 0.0, per_image_latency: float = 0.0):
+        self.detect = detect
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.conf = 0.5
+        self.iou = 0.5
+        self.calls = 0
+
+    def __call__(self, images):
+        images = images if isinstance(images, list) else [images]
+        self.calls += 1
+        if self.latency or self.per_image_latency:
+            time.sleep(self.latency + self.per_image_latency * len(images))
+        return _StubResults([self.detect(image) for image in images])
+
+
+class StubOcrReader:
+    def __init__(self, latency: float = 0.0, per_image_latency: float = 0.0):
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.calls = 0
+
+    def readtext(self, image: np.ndarray):
+        return self.readtext_batched([image])[0]
+
+    def readtext_batched(self, images: List[np.ndarray], **kwargs):
+        self.calls += 1
+        if self.latency or self.per_image_latency:
+            time.sleep(self.latency + self.per_image_latency * len(images))
+        return [self._read(image) for image in images]
+
+    @staticmethod
+    def _read(image: np.ndarray):
+        # детерміновано: текст залежить лише від вмісту кропу
+        digest = zlib.crc32(cv2.resize(image, (16, 4)).tobytes())
+        text = f"{digest:08X}"[:8]
+        h, w = image.shape[:2]
+        return [([[0, 0], [w, 0], [w, h], [0, h]], text, 0.9)]
+
+
+def _boxes(mask: np.ndarray, min_area: int, cls: int = 0, conf: float = 0.9) -> np.ndarray:
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=4)
+    rows = []
+    for x, y, w, h, area in stats[1:]:
+        if area >= min_area:
+            rows.append((x, y, x + w, y + h, conf, cls))
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def detect_vehicles(image: np.ndarray) -> np.ndarray:
+    # з допуском: після стиснення відео фон уже не рівно BACKGROUND
+    mask = cv2.absdiff(image, (BACKGROUND, BACKGROUND, BACKGROUND, 0)).max(axis=2) > 24
+    mask = cv2.morphologyEx(mask.astype(np.uint8), cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    return _boxes(mask, min_area=400, cls=1)
+
+
+def detect_plate(image: np.ndarray) -> np.ndarray:
+    mask = np.all(image >= 250, axis=2)
+    boxes = _boxes(mask, min_area=20)
+    return boxes[:1]
+
+
+def detect_damages(image: np.ndarray) -> np.ndarray:
+    h, w = image.shape[:2]
+    if h < 4 or w < 4 or int(image[h // 2, w // 2].sum()) % 3:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.array([[w // 4, h // 4, w // 2, h // 2, 0.7, 9]], dtype=np.float32)
+
+
+def detect_brands(image: np.ndarray) -> np.ndarray:
+    h, w = image.shape[:2]
+    if h == 0 or w == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    cls = int(image[h // 3, w // 3].sum()) % 9
+    return np.array([[0, 0, w, h, 0.8, cls]], dtype=np.float32)
+
+
+STUB_DETECTORS = {
+    "vehicle": detect_vehicles,
+    "plate": detect_plate,
+    "damage": detect_damages,
+    "brand": detect_brands,
+}
+
+
+class StubModelRegistry(ModelRegistry):
+    # ваги з префіксом "stub:" замінюються детермінованими заглушками з заданою затримкою
+    def __init__(self, latency: float = 0.0, per_image_latency: float = 0.0,
+                 ocr_latency: Optional[float] = None, stub_ocr: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.stub_ocr = stub_ocr
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.ocr_latency = latency if ocr_latency is None else ocr_latency
+
+    def _load_yolo(self, weights_path: str, conf: float, iou: float):
+        if not weights_path.startswith("stub:"):
+            return super()._load_yolo(weights_path, conf, iou)
+        model = StubYoloModel(STUB_DETECTORS[weights_path[5:]], self.latency, self.per_image_latency)
+        model.conf = conf
+        model.iou = iou
+        return model
+
+    def _load_ocr_reader(self, langs: list, recog_network: str):
+        if self.stub_ocr:
+            return StubOcrReader(self.ocr_latency, self.per_image_latency)
+        return super()._load_ocr_reader(langs, recog_network)
+
+
+STUB_WEIGHTS = {
+    "vehicle_weights": "stub:vehicle",
+    "plate_weights": "stub:plate",
+    "damage_weights": "stub:damage",
+    "brand_weights": "stub:brand",
+}
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+BACKGROUND = 110
+
+# кольори кузова (BGR), що потрапляють у різні HSV-класи ColorRecognizer
+BODY_COLORS = [
+    (40, 40, 200), (30, 140, 240), (40, 220, 230), (60, 180, 60), (200, 90, 30),
+    (160, 40, 140), (25, 25, 25), (235, 235, 235), (150, 150, 150),
+]
+
+
+class SyntheticScene:
+    def __init__(self, width: int = 1280, height: int = 720, vehicles: int = 5, seed: int = 0):
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.vehicles = [self._random_vehicle() for _ in range(vehicles)]
+
+    def _random_vehicle(self) -> dict:
+        w = int(self.rng.integers(self.width // 12, self.width // 6))
+        h = int(w * self.rng.uniform(0.5, 0.8))
+        return {
+            "x": float(self.rng.integers(0, self.width - w)),
+            "y": float(self.rng.integers(0, self.height - h)),
+            "w": w,
+            "h": h,
+            "dx": float(self.rng.uniform(-4, 4)),
+            "dy": float(self.rng.uniform(-2, 2)),
+            "color": BODY_COLORS[int(self.rng.integers(len(BODY_COLORS)))],
+            "plate": "".join(self.rng.choice(list("ABCEHKMOPTX0123456789"), 8)),
+        }
+
+    def boxes(self) -> List[Tuple[int, int, int, int]]:
+        return [(int(v["x"]), int(v["y"]), int(v["x"]) + v["w"], int(v["y"]) + v["h"]) for v in self.vehicles]
+
+    def render(self) -> np.ndarray:
+        frame = np.full((self.height, self.width, 3), BACKGROUND, dtype=np.uint8)
+        for v, (x1, y1, x2, y2) in zip(self.vehicles, self.boxes()):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), v["color"], -1)
+            # номерний знак — білий прямокутник з чорним текстом унизу по центру кузова
+            pw, ph = v["w"] // 3, max(v["h"] // 8, 8)
+            px1, py1 = x1 + (v["w"] - pw) // 2, y2 - ph - 4
+            cv2.rectangle(frame, (px1, py1), (px1 + pw, py1 + ph), (255, 255, 255), -1)
+            cv2.putText(frame, v["plate"], (px1 + 2, py1 + ph - 2), cv2.FONT_HERSHEY_PLAIN,
+                        max(ph / 16, 0.5), (0, 0, 0), 1)
+        return frame
+
+    def step(self):
+        for v in self.vehicles:
+            v["x"] += v["dx"]
+            v["y"] += v["dy"]
+            if not 0 <= v["x"] <= self.width - v["w"]:
+                v["dx"] = -v["dx"]
+                v["x"] = min(max(v["x"], 0), self.width - v["w"])
+            if not 0 <= v["y"] <= self.height - v["h"]:
+                v["dy"] = -v["dy"]
+                v["y"] = min(max(v["y"], 0), self.height - v["h"])
+
+    def frames(self, count: int, moving: bool = True):
+        for _ in range(count):
+            yield self.render()
+            if moving:
+                self.step()
+
+    def write_video(self, path: str, count: int, fps: float = 25.0, moving: bool = True) -> str:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (self.width, self.height))
+        for frame in self.frames(count, moving):
+            writer.write(frame)
+        writer.release()
+        return path
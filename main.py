@@ -1,34 +1,187 @@
 import argparse
+import time
 import cv2
 from VehicleAnalysisSystem import VehicleAnalysisSystem
 from ReportVisualizer import ReportVisualizer
 from VideoProcessor import VideoProcessor
+from MultiStreamProcessor import MultiStreamProcessor
+from SegmentedVideoProcessor import SegmentedVideoProcessor
+from SharedMemoryVideoProcessor import SharedMemoryVideoProcessor, TRANSPORTS
+from BatchImageProcessor import BatchImageProcessor
+from InferenceServer import InferenceServer
+from RegionOfInterest import RegionOfInterest
+from FrameSampler import FrameSampler
+from ImageUtils import ImageUtils
+from ReportSink import open_report_sink
+from recognizers.ModelRegistry import ModelRegistry
+from recognizers.InferenceBackends import BACKENDS
+from AnalysisPipeline import AnalysisPipeline
 import os
 
 def main():
     parser = argparse.ArgumentParser(description="Vehicle Analysis Tool")
-    parser.add_argument("mode", choices=["image", "video"], help="Mode: image or video")
-    parser.add_argument("path", help="Path to image or video file")
+    parser.add_argument("mode", choices=["image", "video", "streams", "batch", "serve"], help="Mode: image, video, streams (several videos at once), batch (many images) or serve (local analysis server)")
+    parser.add_argument("path", nargs="*", help="Path to image or video file (one per stream in streams mode; directories, globs or manifests in batch mode; none in serve mode)")
     parser.add_argument("--output", help="Path to save output file", default=None)
     parser.add_argument("--max-frames", type=int, help="Max frames to process (video only)", default=-1)
+    parser.add_argument("--per-crop", action="store_true", help="Run recognizers one vehicle crop at a time instead of batching")
+    parser.add_argument("--pipelined", action="store_true", help="Run decode/analyze/annotate/encode as concurrent stages (video only)")
+    parser.add_argument("--queue-size", type=int, help="Max frames buffered between pipeline stages", default=8)
+    parser.add_argument("--track", action="store_true", help="Track vehicles and reuse per-vehicle attributes between frames (video only)")
+    parser.add_argument("--track-refresh", type=int, help="Re-run per-vehicle stages for a track every N frames", default=30)
+    parser.add_argument("--no-plate-cache", action="store_true", help="OCR every plate in every frame instead of voting and caching reads (video only)")
+    parser.add_argument("--yolov5-repo", help="Local yolov5 checkout used to build models (defaults to $YOLOV5_REPO or the torch hub cache)", default=None)
+    parser.add_argument("--ocr-model-dir", help="Directory with EasyOCR model files", default=None)
+    parser.add_argument("--offline", action="store_true", help="Never download model code or weights")
+    parser.add_argument("--preload", action="store_true", help="Load all models up front in parallel instead of on first use")
+    parser.add_argument("--profile", choices=list(AnalysisPipeline.PROFILES), help="Set of per-vehicle stages to run", default="full")
+    parser.add_argument("--stages", help="Comma-separated per-vehicle stages to run (overrides --profile): plate,ocr,damage,colour,brand", default=None)
+    parser.add_argument("--min-vehicle-area", type=int, help="Skip per-vehicle stages for boxes smaller than N pixels", default=0)
+    parser.add_argument("--vehicle-classes", help="Comma-separated vehicle classes to analyse further, e.g. car,van", default=None)
+    parser.add_argument("--min-plate-confidence", type=float, help="Only OCR plates detected with at least this confidence", default=0.0)
+    parser.add_argument("--parallel-stages", action="store_true", help="Run independent per-vehicle stages concurrently")
+    parser.add_argument("--trace", help="Write a Chrome trace / Perfetto JSON timeline of frame stages to this path", default=None)
+    parser.add_argument("--metrics", help="Write a latency metrics snapshot to this path", default=None)
+    parser.add_argument("--metrics-format", choices=["json", "prometheus"], help="Format of the metrics snapshot", default="json")
+    parser.add_argument("--metrics-interval", type=float, help="Rewrite the metrics snapshot every N seconds during the run", default=0.0)
+    parser.add_argument("--realtime", action="store_true", help="Play video files back at their native FPS, dropping frames that fall behind (video / streams); in video mode also degrades stages to meet --latency-budget")
+    parser.add_argument("--latency-budget", type=float, help="Per-frame deadline in ms for --realtime video (default: one frame interval)", default=None)
+    parser.add_argument("--degrade-order", help="Stages switched off first when --realtime video falls behind", default="brand,damage,colour")
+    parser.add_argument("--max-batch-frames", type=int, help="Max frames from all streams analysed in one batch (streams only)", default=8)
+    parser.add_argument("--segments", action="store_true", help="Split the video into frame ranges processed in parallel worker processes (video only)")
+    parser.add_argument("--shared-memory", action="store_true", help="Decode in the main process and analyse frames in worker processes that read them from a shared-memory ring (video only)")
+    parser.add_argument("--frame-transport", choices=TRANSPORTS, help="How --shared-memory hands frames to workers; 'queue' pickles them for comparison", default="shm")
+    parser.add_argument("--ring-slots", type=int, help="Frame slots in the shared-memory ring (default: 2 per worker + 2)", default=None)
+    parser.add_argument("--workers", type=int, help="Worker processes for --segments / --shared-memory (default: cores / torch threads)", default=None)
+    parser.add_argument("--torch-threads", type=int, help="Torch intra-op threads per worker for --segments / --shared-memory", default=None)
+    parser.add_argument("--reports", help="Stream per-vehicle reports to this file (.jsonl, .parquet, .arrow, or .db for a searchable sighting index)", default=None)
+    parser.add_argument("--batch-size", type=int, help="Max vehicle crops per batched model call", default=16)
+    parser.add_argument("--batch-images", type=int, help="Images analysed together in one call (batch / serve)", default=8)
+    parser.add_argument("--decode-workers", type=int, help="Threads decoding and writing images (batch / serve)", default=4)
+    parser.add_argument("--host", help="Address the analysis server listens on (serve only)", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="TCP port of the analysis server (serve only)", default=8765)
+    parser.add_argument("--unix-socket", help="Listen on this Unix socket instead of TCP (serve only)", default=None)
+    parser.add_argument("--max-wait-ms", type=float, help="How long the server holds a request to group it with concurrent ones (serve only)", default=5.0)
+    parser.add_argument("--max-queue", type=int, help="Requests waiting for analysis before the server answers 503 (serve only)", default=256)
+    parser.add_argument("--prefetch", type=int, help="Images decoded ahead of the analysis (batch only)", default=32)
+    parser.add_argument("--max-side", type=int, help="Downscale images so the longer side is at most N pixels (batch only)", default=None)
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping images finished by an earlier run (batch only)")
+    parser.add_argument("--no-annotated", action="store_true", help="Write only reports, not annotated images (batch only)")
+    parser.add_argument("--every", type=int, help="Analyse only every N-th frame; skipped frames are grabbed but not decoded to BGR (video only)", default=1)
+    parser.add_argument("--every-seconds", type=float, help="Analyse one frame every N seconds of video time (video only)", default=None)
+    parser.add_argument("--start", type=float, help="Seek to this timestamp in seconds before analysing (video only)", default=None)
+    parser.add_argument("--end", type=float, help="Stop at this timestamp in seconds (video only)", default=None)
+    parser.add_argument("--motion", choices=["diff", "mog2"], help="Skip frames without motion (frame difference or MOG2 background subtraction) and reuse the last results (video / streams)", default=None)
+    parser.add_argument("--motion-threshold", type=float, help="Fraction of changed pixels that counts as motion", default=0.002)
+    parser.add_argument("--motion-max-skip", type=int, help="Analyse at least every N-th frame even without motion", default=25)
+    parser.add_argument("--roi", help="Region-of-interest polygons for the vehicle detector: JSON file or \"x,y x,y x,y; ...\" (pixels, or fractions of the frame)", default=None)
+    parser.add_argument("--roi-tile", type=int, help="Split each ROI into tiles of at most N pixels for the vehicle detector", default=None)
+    parser.add_argument("--roi-tile-overlap", type=float, help="Overlap between neighbouring ROI tiles", default=0.2)
+    parser.add_argument("--result-cache", help="SQLite file caching detector and OCR results by image content, so reruns on the same media skip inference", default=None)
+    parser.add_argument("--result-cache-mb", type=float, help="Size limit of --result-cache on disk; least recently used results are evicted", default=1024)
+    parser.add_argument("--backend", choices=BACKENDS, help="Inference backend for all detectors (exported next to the weights on first use)", default="pytorch")
+    parser.add_argument("--model-backend", action="append", metavar="MODEL=BACKEND", help="Backend for one detector, e.g. vehicle=onnx-int8-static (models: vehicle, plate, damage, brand)", default=[])
+    parser.add_argument("--export-dir", help="Directory for exported ONNX / TorchScript models (defaults to next to the weights)", default=None)
+    parser.add_argument("--calibration", help="Directory or glob of sample frames for static INT8 calibration", default=None)
 
     args = parser.parse_args()
+    if args.mode == "serve" and args.path:
+        parser.error("serve mode takes no path")
+    if args.mode in ("streams", "batch") and not args.path:
+        parser.error(f"{args.mode} mode takes at least one path")
+    if args.mode not in ("streams", "batch", "serve") and len(args.path) != 1:
+        parser.error(f"{args.mode} mode takes exactly one path")
+    path = args.path[0] if args.path else None
+    sampler = FrameSampler(args.every, args.every_seconds, args.start, args.end, args.max_frames)
+    if sampler.active and (args.segments or args.shared_memory):
+        parser.error("--every, --every-seconds, --start and --end are not supported with --segments or --shared-memory")
+    if args.segments and args.shared_memory:
+        parser.error("--segments and --shared-memory are mutually exclusive")
+    if args.mode == "video" and args.realtime and (args.segments or args.shared_memory or args.pipelined or sampler.active):
+        parser.error("--realtime video cannot be combined with --segments, --shared-memory, --pipelined or frame sampling")
 
-    system = VehicleAnalysisSystem(
+    start = time.perf_counter()
+    system_kwargs = dict(
         vehicle_weights='car-detect-weights/weights/best.pt',
         plate_weights='car-numbers-weights/weights/best.pt',
         damage_weights='car-damage-weights/best.pt',
         brand_weights='car-brand-weights/best.pt',
-        ocr_langs=['en']
+        ocr_langs=['en'],
+        batched=not args.per_crop,
+        batch_size=args.batch_size,
+        tracking=args.track and args.mode not in ("image", "batch", "serve"),
+        track_refresh_interval=args.track_refresh,
+        plate_text_cache=args.mode not in ("image", "batch", "serve") and not args.no_plate_cache,
+        profile=args.profile,
+        stages=args.stages.split(",") if args.stages else None,
+        parallel_stages=args.parallel_stages,
+        motion_gate=args.motion if args.mode not in ("image", "batch", "serve") else None,
+        motion_threshold=args.motion_threshold,
+        motion_max_skip=args.motion_max_skip,
+        roi=RegionOfInterest.parse(args.roi, tile_size=args.roi_tile, tile_overlap=args.roi_tile_overlap) if args.roi else None,
+        result_cache=args.result_cache,
+        result_cache_max_mb=args.result_cache_mb,
+        min_vehicle_area=args.min_vehicle_area,
+        vehicle_classes=args.vehicle_classes.split(",") if args.vehicle_classes else None,
+        min_plate_confidence=args.min_plate_confidence
     )
+    model_backends = {}
+    for item in args.model_backend:
+        name, _, backend = item.partition("=")
+        if f"{name}_weights" not in system_kwargs or backend not in BACKENDS:
+            parser.error(f"invalid --model-backend {item!r}: expected MODEL=BACKEND with MODEL in vehicle, plate, damage, brand")
+        model_backends[system_kwargs[f"{name}_weights"]] = backend
+    registry_kwargs = dict(
+        yolov5_repo=args.yolov5_repo,
+        ocr_model_dir=args.ocr_model_dir,
+        offline=args.offline,
+        backend=args.backend,
+        model_backends=model_backends,
+        export_dir=args.export_dir,
+        calibration_images=ImageUtils.list_images(args.calibration) if args.calibration else None
+    )
+    registry = ModelRegistry(**registry_kwargs)
+    system = VehicleAnalysisSystem(registry=registry, **system_kwargs)
+    unknown = set(args.degrade_order.split(",")) - system.pipeline.stages.keys()
+    if args.realtime and args.mode == "video" and unknown:
+        parser.error(f"invalid --degrade-order stage(s): {', '.join(sorted(unknown))}; "
+                     f"expected some of {', '.join(system.pipeline.stages)}")
+    system.profiler.configure_export(
+        metrics_path=args.metrics,
+        metrics_format=args.metrics_format,
+        metrics_interval=args.metrics_interval,
+        trace_path=args.trace
+    )
+    if args.preload:
+        system.preload_models()
+    print(f"⏱️ Cold start: {time.perf_counter() - start:.2f} sec")
+
+    # batch сам відкриває звіти у своїй теці, щоб уміти продовжувати перерваний запуск; сервер віддає звіти клієнтам
+    report_sink = None
+    if args.reports and args.mode not in ("batch", "serve"):
+        # в індексі спостережень кадри одного відео позначаються шляхом до нього як камерою
+        report_sink = open_report_sink(args.reports, default_stream_id=path if args.mode in ("image", "video") else None)
+    try:
+        run(args, path, system, system_kwargs, registry_kwargs, report_sink, sampler)
+    finally:
+        if report_sink:
+            report_sink.close()
+            print(f"✅ Saved {report_sink.records_written} report record(s) to {args.reports}")
+        if system.result_cache is not None:
+            system.result_cache.close()
+
 
+def run(args, path, system, system_kwargs, registry_kwargs, report_sink, sampler):
     if args.mode == "image":
-        img = cv2.imread(args.path)
+        img = cv2.imread(path)
         if img is None:
-            print(f"❌ Failed to load image: {args.path}")
+            print(f"❌ Failed to load image: {path}")
             return
 
         reports = system.analyze_image(img)
+        system.profiler.flush()
+        if report_sink:
+            report_sink.write_frame(0, reports)
         for report in reports:
             img = ReportVisualizer.draw_report(img, report)
 
@@ -45,12 +198,102 @@ def main():
     elif args.mode == "video":
         output_path = args.output if args.output else "output.mp4"
         processor = VideoProcessor(system)
-        processor.process_video(
+        if args.segments:
+            segmented = SegmentedVideoProcessor(system_kwargs, registry_kwargs,
+                                                workers=args.workers, torch_threads=args.torch_threads)
+            segmented.process_video(
+                path,
+                # output_path=output_path,
+                max_frames=args.max_frames,
+                collect_reports=False,
+                report_sink=report_sink
+            )
+        elif args.shared_memory:
+            # трекінг, кеш номерів і детектор руху у воркерах вимикаються: кадри розходяться між процесами
+            shared = SharedMemoryVideoProcessor(system_kwargs, registry_kwargs, workers=args.workers,
+                                                torch_threads=args.torch_threads, ring_slots=args.ring_slots,
+                                                transport=args.frame_transport)
+            shared.process_video(
+                path,
+                # output_path=output_path,
+                max_frames=args.max_frames,
+                report_sink=report_sink
+            )
+        elif args.realtime:
+            processor.process_video_realtime(
+                path,
+                # output_path=output_path,
+                max_frames=args.max_frames,
+                budget=args.latency_budget / 1000 if args.latency_budget else None,
+                degrade_order=args.degrade_order.split(","),
+                report_sink=report_sink
+            )
+        elif args.pipelined:
+            processor.process_video_pipelined(
+                path,
+                # output_path=output_path,
+                max_frames=args.max_frames,
+                queue_size=args.queue_size,
+                report_sink=report_sink,
+                sampler=sampler if sampler.active else None
+            )
+        elif sampler.active:
+            processor.process_video_sampled(
+                path,
+                sampler,
+                # output_path=output_path,
+                report_sink=report_sink
+            )
+        else:
+            processor.process_video(
+                path,
+                # output_path=output_path,
+                max_frames=args.max_frames,
+                report_sink=report_sink
+            )
+        print(f"✅ Video processed and saved to {output_path}")
+
+    elif args.mode == "batch":
+        processor = BatchImageProcessor(
+            system,
+            batch_images=args.batch_images,
+            decode_workers=args.decode_workers,
+            prefetch=args.prefetch,
+            max_side=args.max_side,
+            save_annotated=not args.no_annotated
+        )
+        sources = BatchImageProcessor.collect_images(args.path)
+        if not sources:
+            print("❌ No images found")
+            return
+        processor.process(sources, args.output or "batch_output", reports_path=args.reports, resume=not args.no_resume)
+
+    elif args.mode == "serve":
+        # запити незалежні, тож трекінг, кеш номерів і детектор руху вимкнені
+        if not args.preload:
+            system.preload_models()
+        server = InferenceServer(
+            system,
+            max_batch_images=args.batch_images,
+            max_wait=args.max_wait_ms / 1000,
+            max_queue=args.max_queue,
+            decode_workers=args.decode_workers
+        )
+        server.run(args.host, args.port, args.unix_socket)
+        system.write_average_times()
+
+    elif args.mode == "streams":
+        processor = MultiStreamProcessor(system, max_batch_frames=args.max_batch_frames)
+        processor.process_streams(
             args.path,
-            # output_path=output_path,
-            max_frames=args.max_frames
+            output_dir=args.output,
+            realtime=args.realtime,
+            queue_size=args.queue_size,
+            max_frames=args.max_frames,
+            report_sink=report_sink
         )
-        print(f"✅ Video processed and saved to {output_path}")
+        if args.output:
+            print(f"✅ Streams processed and saved to {args.output}")
 
 if __name__ == "__main__":
     main()
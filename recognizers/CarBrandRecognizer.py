@@ -1,23 +1,41 @@
-import torch
 import numpy as np
-from typing import List
+from typing import List, Optional
 from .DetectionResult import DetectionResult
+from .ModelRegistry import ModelRegistry
 
 class CarBrandRecognizer:
-    def __init__(self, yolo_weights_path: str, yolo_conf=0.5, yolo_iou=0.5):
-        self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=yolo_weights_path)
-        self.model.conf = yolo_conf
-        self.model.iou = yolo_iou
+    def __init__(self, yolo_weights_path: str, yolo_conf=0.5, yolo_iou=0.5, registry: Optional[ModelRegistry] = None):
+        self.weights_path = yolo_weights_path
+        self.yolo_conf = yolo_conf
+        self.yolo_iou = yolo_iou
+        self.registry = registry or ModelRegistry.default()
+        self._model = None
 
         self.class_names = [
             'BMW', 'Honda', 'Hyundai', 'Mazda', 'MercedesBenz',
             'Perodua', 'Proton', 'Toyota', 'Volkswagen'
         ]
 
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.registry.load_yolo(self.weights_path, self.yolo_conf, self.yolo_iou)
+        return self._model
+
+    def load(self):
+        return self.model
+
     def detect_brands(self, image: np.ndarray) -> List[DetectionResult]:
         results = self.model(image)
-        boxes = results.xyxy[0].cpu().numpy()
+        return self._to_detections(results.xyxy[0].cpu().numpy())
+
+    def detect_brands_batch(self, images: List[np.ndarray]) -> List[List[DetectionResult]]:
+        if not images:
+            return []
+        results = self.model(list(images))
+        return [self._to_detections(xyxy.cpu().numpy()) for xyxy in results.xyxy]
 
+    def _to_detections(self, boxes: np.ndarray) -> List[DetectionResult]:
         detected = []
         for x1, y1, x2, y2, conf, cls in boxes:
             x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
@@ -25,4 +43,4 @@ class CarBrandRecognizer:
             detection = DetectionResult(class_name, conf, (x1, y1, x2, y2))
             detected.append(detection)
 
-        return detected
\ No newline at end of file
+        return detected
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from enum import Enum
+from typing import List, Optional
 
 class ColorName(Enum):
     RED = "Red"
@@ -28,6 +29,7 @@ class ColorRecognizer:
             ColorName.WHITE:  [(np.array([0, 0, 200]), np.array([180, 50, 255]))],
             ColorName.GRAY:   [(np.array([0, 0, 51]), np.array([180, 50, 199]))]
         }
+        self._build_lookup_tables()
 
     def crop_center(self, image: np.ndarray) -> np.ndarray:
         h, w = image.shape[:2]
@@ -37,17 +39,43 @@ class ColorRecognizer:
         y1 = (h - new_h) // 2
         return image[y1:y1 + new_h, x1:x1 + new_w]
 
-    def _get_body_mask(self, car_crop: np.ndarray) -> np.ndarray:
-        hsv = cv2.cvtColor(car_crop, cv2.COLOR_BGR2HSV)
-        mask_total = np.zeros(hsv.shape[:2], dtype=np.uint8)
-
+    def _build_lookup_tables(self):
+        # кожен HSV-діапазон — паралелепіпед, тож належність пікселя до всіх діапазонів
+        # кодується бітовою маскою: lut_h[h] & lut_s[s] & lut_v[v]
+        self._colors = list(self.hsv_ranges.keys())
+        ranges = [(ci, lower, upper)
+                  for ci, color in enumerate(self._colors)
+                  for lower, upper in self.hsv_ranges[color]]
+        code_dtype = np.uint16 if len(ranges) <= 16 else np.uint32
+
+        values = np.arange(256)
+        self._channel_luts = np.zeros((3, 256), dtype=code_dtype)
+        for bit, (_, lower, upper) in enumerate(ranges):
+            for channel in range(3):
+                inside = (values >= lower[channel]) & (values <= upper[channel])
+                self._channel_luts[channel, inside] |= code_dtype(1 << bit)
+
+        # код -> кількість діапазонів кожного кольору, що містять піксель (як у покольоровому підрахунку)
+        codes = np.arange(1 << len(ranges))
+        self._n_codes = len(codes)
+        self._code_color_counts = np.zeros((self._n_codes, len(self._colors)), dtype=np.int64)
+        self._body_bits = 0
         exclude = {ColorName.BLACK, ColorName.GRAY}
-        for color, ranges in self.hsv_ranges.items():
-            if color in exclude:
-                continue
-            for lower, upper in ranges:
-                mask = cv2.inRange(hsv, lower, upper)
-                mask_total = cv2.bitwise_or(mask_total, mask)
+        for bit, (ci, _, _) in enumerate(ranges):
+            self._code_color_counts[:, ci] += (codes >> bit) & 1
+            if self._colors[ci] not in exclude:
+                self._body_bits |= 1 << bit
+
+    def _color_codes(self, hsv: np.ndarray) -> np.ndarray:
+        luts = self._channel_luts
+        return luts[0][hsv[..., 0]] & luts[1][hsv[..., 1]] & luts[2][hsv[..., 2]]
+
+    def _counts_from_codes(self, codes: np.ndarray) -> dict:
+        counts = np.bincount(codes.ravel(), minlength=self._n_codes) @ self._code_color_counts
+        return {color: int(count) for color, count in zip(self._colors, counts)}
+
+    def _get_body_mask(self, codes: np.ndarray) -> np.ndarray:
+        mask_total = np.where(codes & self._body_bits, 255, 0).astype(np.uint8)
 
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
         morph = cv2.morphologyEx(mask_total, cv2.MORPH_CLOSE, kernel, iterations=2)
@@ -61,21 +89,42 @@ class ColorRecognizer:
         return mask_final
 
     def _count_color_pixels(self, pixels: np.ndarray) -> dict:
-        color_counts = {}
-        for color, ranges in self.hsv_ranges.items():
-            count = 0
-            for lower, upper in ranges:
-                in_range = np.all((pixels >= lower) & (pixels <= upper), axis=1)
-                count += np.count_nonzero(in_range)
-            color_counts[color] = count
-        return color_counts
+        return self._counts_from_codes(self._color_codes(pixels))
 
     def recognize_color(self, car_crop: np.ndarray) -> ColorName:
         cropped = self.crop_center(car_crop)
         hsv = cv2.cvtColor(cropped, cv2.COLOR_BGR2HSV)
-        flat_pixels = hsv.reshape(-1, 3)
-
-        color_counts = self._count_color_pixels(flat_pixels)
+        codes = self._color_codes(hsv)
+        return self._decide_color(codes, self._counts_from_codes(codes))
+
+    def recognize_colors(self, car_crops: List[np.ndarray]) -> List[Optional[ColorName]]:
+        codes_per_crop = []
+        for car_crop in car_crops:
+            cropped = self.crop_center(car_crop)
+            if cropped.size == 0:
+                codes_per_crop.append(None)
+                continue
+            hsv = cv2.cvtColor(cropped, cv2.COLOR_BGR2HSV)
+            codes_per_crop.append(self._color_codes(hsv))
+
+        valid = [i for i, codes in enumerate(codes_per_crop) if codes is not None]
+        if not valid:
+            return [None] * len(car_crops)
+
+        # один bincount на весь кадр: код зсувається на індекс кропу
+        offsets = np.concatenate([
+            codes_per_crop[i].ravel().astype(np.int64) + k * self._n_codes for k, i in enumerate(valid)
+        ])
+        counts = np.bincount(offsets, minlength=len(valid) * self._n_codes)
+        counts = counts.reshape(len(valid), self._n_codes) @ self._code_color_counts
+
+        colors: List[Optional[ColorName]] = [None] * len(car_crops)
+        for k, i in enumerate(valid):
+            color_counts = {color: int(count) for color, count in zip(self._colors, counts[k])}
+            colors[i] = self._decide_color(codes_per_crop[i], color_counts)
+        return colors
+
+    def _decide_color(self, codes: np.ndarray, color_counts: dict) -> ColorName:
         black = color_counts.get(ColorName.BLACK, 0)
         gray = color_counts.get(ColorName.GRAY, 0)
         others = sum(v for k, v in color_counts.items() if k not in [ColorName.BLACK, ColorName.GRAY])
@@ -85,13 +134,13 @@ class ColorRecognizer:
         if gray > 0 and gray >= 10 * others:
             return ColorName.GRAY
 
-        mask = self._get_body_mask(cropped)
-        masked_pixels = hsv[mask == 255]
+        mask = self._get_body_mask(codes)
+        masked_codes = codes[mask == 255]
 
-        if masked_pixels.size == 0:
+        if masked_codes.size == 0:
             return ColorName.UNKNOWN
 
-        masked_counts = self._count_color_pixels(masked_pixels)
+        masked_counts = self._counts_from_codes(masked_codes)
         sorted_colors = sorted(masked_counts.items(), key=lambda x: x[1], reverse=True)
         dominant_color, dominant_area = sorted_colors[0]
         total = sum(masked_counts.values())
@@ -104,4 +153,4 @@ class ColorRecognizer:
             if second_area >= dominant_area * 0.2:
                 return second_color
 
-        return dominant_color
\ No newline at end of file
+        return dominant_color
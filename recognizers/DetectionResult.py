@@ -1,7 +1,9 @@
 class DetectionResult:
+    __slots__ = ("class_name", "confidence", "box")
+
     def __init__(self, class_name: str, confidence: float, box: tuple[int, int, int, int]):
         self.class_name = class_name
-        self.confidence = confidence
+        self.confidence = float(confidence)
         self.box = box  # (x1, y1, x2, y2)
 
     def __repr__(self):
@@ -12,4 +14,4 @@ class DetectionResult:
             "class_name": self.class_name,
             "confidence": self.confidence,
             "box": self.box
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,264 @@
+import os
+import time
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Sequence
+
+BACKENDS = ("pytorch", "torchscript", "onnx", "onnx-int8", "onnx-int8-static")
+
+# розширення експортованих файлів відносно best.pt
+EXPORT_SUFFIXES = {
+    "torchscript": ".torchscript",
+    "onnx": ".onnx",
+    "onnx-int8": ".int8.onnx",
+    "onnx-int8-static": ".int8-static.onnx",
+}
+
+
+class _ArrayTensor:
+    # той самий інтерфейс, що й у тензора AutoShape: .cpu().numpy()
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self._array
+
+
+class ExportedDetections:
+    def __init__(self, boxes: List[np.ndarray]):
+        self.xyxy = [_ArrayTensor(b) for b in boxes]
+
+
+class ExportedYoloModel:
+    # замінник AutoShape для експортованих моделей: letterbox -> runtime -> NMS -> координати вхідного зображення
+    def __init__(self, forward: Callable[[np.ndarray], np.ndarray], img_size: int = 640, stride: int = 32,
+                 dynamic_batch: bool = True, conf: float = 0.25, iou: float = 0.45, max_det: int = 1000):
+        self.forward = forward
+        self.img_size = img_size
+        self.stride = stride
+        self.dynamic_batch = dynamic_batch
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+    def __call__(self, images):
+        images = images if isinstance(images, list) else [images]
+        if not images:
+            return ExportedDetections([])
+
+        batch, transforms = [], []
+        for image in images:
+            tensor, transform = letterbox(image, self.img_size)
+            batch.append(tensor)
+            transforms.append(transform)
+        batch = np.stack(batch)
+
+        if self.dynamic_batch:
+            predictions = self.forward(batch)
+        else:
+            predictions = np.concatenate([self.forward(batch[i:i + 1]) for i in range(len(batch))])
+
+        boxes = []
+        for prediction, image, (gain, pad_x, pad_y) in zip(predictions, images, transforms):
+            det = non_max_suppression(prediction, self.conf, self.iou, self.max_det)
+            det[:, [0, 2]] = ((det[:, [0, 2]] - pad_x) / gain).clip(0, image.shape[1])
+            det[:, [1, 3]] = ((det[:, [1, 3]] - pad_y) / gain).clip(0, image.shape[0])
+            boxes.append(det)
+        return ExportedDetections(boxes)
+
+
+def letterbox(image: np.ndarray, size: int = 640):
+    # як у AutoShape: масив подається в мережу у тому ж порядку каналів, у якому прийшов
+    h, w = image.shape[:2]
+    gain = min(size / h, size / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (w, h) else image
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = resized
+    tensor = canvas.transpose(2, 0, 1).astype(np.float32) / 255.0
+    return tensor, (gain, left, top)
+
+
+def non_max_suppression(prediction: np.ndarray, conf: float, iou: float, max_det: int = 1000) -> np.ndarray:
+    # prediction: N x (cx, cy, w, h, obj, cls...) -> M x (x1, y1, x2, y2, conf, cls)
+    prediction = prediction[prediction[:, 4] > conf]
+    if not len(prediction):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    scores = prediction[:, 5:] * prediction[:, 4:5]
+    classes = scores.argmax(1)
+    scores = scores[np.arange(len(scores)), classes]
+    keep = scores > conf
+    prediction, classes, scores = prediction[keep], classes[keep], scores[keep]
+    if not len(prediction):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    boxes = np.empty((len(prediction), 4), dtype=np.float32)
+    boxes[:, :2] = prediction[:, :2] - prediction[:, 2:4] / 2
+    boxes[:, 2:] = prediction[:, :2] + prediction[:, 2:4] / 2
+
+    # NMS окремо для кожного класу: зсуваємо рамки різних класів, щоб вони не перетиналися
+    offset = classes[:, None].astype(np.float32) * 7680
+    shifted = boxes + offset
+    widths = shifted[:, 2:] - shifted[:, :2]
+    keep = cv2.dnn.NMSBoxes(np.hstack([shifted[:, :2], widths]).tolist(), scores.tolist(), conf, iou)
+    keep = np.array(keep, dtype=int).reshape(-1)[:max_det]
+    return np.hstack([boxes[keep], scores[keep, None], classes[keep, None]]).astype(np.float32)
+
+
+def export_path(weights_path: str, backend: str, export_dir: Optional[str] = None) -> str:
+    stem = os.path.splitext(weights_path)[0]
+    if export_dir:
+        # кілька моделей мають однакову назву best.pt — розрізняємо за батьківськими теками
+        stem = os.path.join(export_dir, stem.strip(os.sep).replace(os.sep, "_"))
+    return stem + EXPORT_SUFFIXES[backend]
+
+
+def export_yolo(autoshape_model, backend: str, output_path: str, img_size: int = 640,
+                calibration_images: Optional[Sequence[np.ndarray]] = None) -> str:
+    import torch
+
+    net = _detection_model(autoshape_model)
+    net.float().eval()
+    for module in net.modules():
+        if type(module).__name__ == "Detect":
+            module.inplace = False
+            module.dynamic = True
+            module.export = True
+
+    dummy = torch.zeros(1, 3, img_size, img_size)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+
+    if backend == "torchscript":
+        with torch.no_grad():
+            torch.jit.trace(net, dummy, strict=False).save(tmp_path)
+    else:
+        onnx_path = tmp_path if backend == "onnx" else output_path + ".fp32.tmp"
+        torch.onnx.export(net, dummy, onnx_path, opset_version=12, do_constant_folding=True,
+                          input_names=["images"], output_names=["output0"],
+                          dynamic_axes={"images": {0: "batch"}, "output0": {0: "batch"}})
+        if backend == "onnx-int8":
+            _quantize_dynamic(onnx_path, tmp_path)
+        elif backend == "onnx-int8-static":
+            _quantize_static(onnx_path, tmp_path, calibration_images, img_size)
+        if onnx_path != tmp_path:
+            os.remove(onnx_path)
+
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _detection_model(autoshape_model):
+    net = getattr(autoshape_model, "model", autoshape_model)
+    # hub 'custom' загортає мережу ще й у DetectMultiBackend
+    if type(net).__name__ == "DetectMultiBackend":
+        net = net.model
+    return net
+
+
+def _quantize_dynamic(input_path: str, output_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+
+
+def _quantize_static(input_path: str, output_path: str, calibration_images: Optional[Sequence[np.ndarray]],
+                     img_size: int):
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_static)
+
+    if not calibration_images:
+        raise ValueError("Статична INT8-квантизація потребує калібрувальних зображень")
+
+    class _FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._batches = iter([{"images": letterbox(image, img_size)[0][None]} for image in calibration_images])
+
+        def get_next(self):
+            return next(self._batches, None)
+
+    quantize_static(input_path, output_path, _FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+                    calibrate_method=CalibrationMethod.MinMax)
+
+
+def load_exported_yolo(path: str, backend: str, img_size: int = 640, threads: Optional[int] = None):
+    if backend == "torchscript":
+        import torch
+
+        module = torch.jit.load(path, map_location="cpu").eval()
+
+        def forward(batch: np.ndarray) -> np.ndarray:
+            with torch.no_grad():
+                output = module(torch.from_numpy(batch))
+            return (output[0] if isinstance(output, (list, tuple)) else output).numpy()
+
+        return ExportedYoloModel(forward, img_size)
+
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    input_meta = session.get_inputs()[0]
+
+    def forward(batch: np.ndarray) -> np.ndarray:
+        return session.run(None, {input_meta.name: batch})[0]
+
+    return ExportedYoloModel(forward, img_size, dynamic_batch=not isinstance(input_meta.shape[0], int))
+
+
+def compare_detections(reference: List[np.ndarray], candidate: List[np.ndarray], match_iou: float = 0.5) -> dict:
+    # жадібне зіставлення рамок одного класу; рахує, наскільки кандидат відтворює результати PyTorch
+    matched, ious, conf_deltas = 0, [], []
+    ref_total = sum(len(r) for r in reference)
+    cand_total = sum(len(c) for c in candidate)
+    for ref, cand in zip(reference, candidate):
+        used = set()
+        for r in ref[np.argsort(-ref[:, 4])] if len(ref) else []:
+            best, best_iou = None, match_iou
+            for j, c in enumerate(cand):
+                if j in used or int(c[5]) != int(r[5]):
+                    continue
+                value = _box_iou(r[:4], c[:4])
+                if value >= best_iou:
+                    best, best_iou = j, value
+            if best is not None:
+                used.add(best)
+                matched += 1
+                ious.append(best_iou)
+                conf_deltas.append(abs(float(cand[best][4]) - float(r[4])))
+
+    return {
+        "images": len(reference),
+        "reference_boxes": ref_total,
+        "candidate_boxes": cand_total,
+        "matched": matched,
+        "recall": matched / ref_total if ref_total else 1.0,
+        "precision": matched / cand_total if cand_total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "mean_conf_delta": float(np.mean(conf_deltas)) if conf_deltas else 0.0,
+    }
+
+
+def timed_detections(model, images: Sequence[np.ndarray]):
+    start = time.perf_counter()
+    boxes = [model(image).xyxy[0].cpu().numpy() for image in images]
+    return boxes, (time.perf_counter() - start) / max(len(images), 1)
+
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Sequence
+from .InferenceBackends import (BACKENDS, compare_detections, export_path, export_yolo, load_exported_yolo,
+                                timed_detections)
+
+
+class ModelRegistry:
+    _default: Optional["ModelRegistry"] = None
+
+    def __init__(self, yolov5_repo: Optional[str] = None, ocr_model_dir: Optional[str] = None, offline: bool = False,
+                 backend: str = "pytorch", model_backends: Optional[dict] = None, export_dir: Optional[str] = None,
+                 calibration_images: Optional[Sequence[str]] = None, img_size: int = 640,
+                 inference_threads: Optional[int] = None):
+        self.yolov5_repo = yolov5_repo or os.environ.get("YOLOV5_REPO")
+        self.ocr_model_dir = ocr_model_dir or os.environ.get("EASYOCR_MODULE_PATH")
+        self.offline = offline
+
+        # бекенд інференсу: спільний за замовчуванням і окремо для кожного файлу ваг
+        self.backend = backend
+        self.model_backends = {os.path.abspath(path): b for path, b in (model_backends or {}).items()}
+        for name in [backend, *self.model_backends.values()]:
+            if name not in BACKENDS:
+                raise ValueError(f"Невідомий бекенд інференсу: {name}. Доступні: {', '.join(BACKENDS)}")
+        self.export_dir = export_dir
+        self.calibration_images = list(calibration_images or [])
+        self.img_size = img_size
+        self.inference_threads = inference_threads
+
+        self._models = {}
+        self._locks = defaultdict(threading.Lock)
+        self._registry_lock = threading.Lock()
+        # перше завантаження імпортує код yolov5 у sys.modules — його не паралелимо
+        self._hub_lock = threading.Lock()
+        self._hub_ready = False
+
+        self.load_times = {}
+
+    @classmethod
+    def default(cls) -> "ModelRegistry":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def set_default(cls, registry: "ModelRegistry"):
+        cls._default = registry
+
+    def backend_for(self, weights_path: str) -> str:
+        return self.model_backends.get(os.path.abspath(weights_path), self.backend)
+
+    def load_yolo(self, weights_path: str, conf: float, iou: float):
+        key = f"yolo:{self.backend_for(weights_path)}:{os.path.abspath(weights_path)}:{conf}:{iou}"
+        return self._get(key, lambda: self._load_yolo(weights_path, conf, iou))
+
+    def load_ocr_reader(self, langs: list, recog_network: str = 'english_g2'):
+        key = f"easyocr:{','.join(langs)}:{recog_network}"
+        return self._get(key, lambda: self._load_ocr_reader(langs, recog_network))
+
+    def preload(self, loaders: Iterable[Callable], max_workers: Optional[int] = None) -> float:
+        loaders = list(loaders)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers or max(len(loaders), 1)) as pool:
+            for future in [pool.submit(loader) for loader in loaders]:
+                future.result()
+        return time.perf_counter() - start
+
+    def export(self, weights_path: str, backend: str, force: bool = False) -> str:
+        path = export_path(weights_path, backend, self.export_dir)
+        with self._registry_lock:
+            lock = self._locks[f"export:{path}"]
+        with lock:
+            stale = not os.path.isfile(path) or os.path.getmtime(path) < os.path.getmtime(weights_path)
+            if force or stale:
+                print(f"📦 Експорт {weights_path} -> {path} ({backend})")
+                calibration = self._calibration_frames() if backend == "onnx-int8-static" else None
+                export_yolo(self._load_pytorch_yolo(weights_path, 0.25, 0.45), backend, path, self.img_size,
+                            calibration)
+        return path
+
+    def prepare_backends(self, weights_paths: Iterable[str]):
+        # експортуємо заздалегідь, щоб процеси-воркери не робили це одночасно
+        for weights_path in weights_paths:
+            backend = self.backend_for(weights_path)
+            if backend != "pytorch":
+                self.export(weights_path, backend)
+
+    def validate_backend(self, weights_path: str, backend: str, images: Sequence, conf: float = 0.25,
+                         iou: float = 0.45, match_iou: float = 0.5) -> dict:
+        reference = self._load_pytorch_yolo(weights_path, conf, iou)
+        candidate = self._load_exported_yolo(weights_path, conf, iou, backend)
+        timed_detections(candidate, images[:1])  # прогрів
+        ref_boxes, ref_latency = timed_detections(reference, images)
+        cand_boxes, cand_latency = timed_detections(candidate, images)
+
+        result = compare_detections(ref_boxes, cand_boxes, match_iou)
+        result.update({
+            "backend": backend,
+            "reference_latency": ref_latency,
+            "candidate_latency": cand_latency,
+            "speedup": ref_latency / cand_latency if cand_latency else 0.0,
+        })
+        return result
+
+    def _get(self, key: str, load: Callable):
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._registry_lock:
+            lock = self._locks[key]
+        with lock:
+            if key not in self._models:
+                start = time.perf_counter()
+                self._models[key] = load()
+                self.load_times[key] = time.perf_counter() - start
+        return self._models[key]
+
+    def _load_yolo(self, weights_path: str, conf: float, iou: float):
+        backend = self.backend_for(weights_path)
+        if backend == "pytorch":
+            return self._load_pytorch_yolo(weights_path, conf, iou)
+        return self._load_exported_yolo(weights_path, conf, iou, backend)
+
+    def _load_exported_yolo(self, weights_path: str, conf: float, iou: float, backend: str):
+        model = load_exported_yolo(self.export(weights_path, backend), backend, self.img_size, self.inference_threads)
+        model.conf = conf
+        model.iou = iou
+        return model
+
+    def _calibration_frames(self) -> List:
+        import cv2
+
+        frames = [cv2.imread(p) if isinstance(p, str) else p for p in self.calibration_images]
+        return [f for f in frames if f is not None]
+
+    def _load_pytorch_yolo(self, weights_path: str, conf: float, iou: float):
+        import torch
+
+        if not os.path.isfile(weights_path):
+            raise FileNotFoundError(f"Не знайдено ваги моделі: {weights_path}")
+
+        repo = self._find_yolov5_repo()
+        if repo is not None:
+            load = lambda: torch.hub.load(repo, 'custom', path=weights_path, source='local', verbose=False)
+        elif self.offline:
+            raise FileNotFoundError(
+                "Не знайдено локальний репозиторій yolov5: вкажіть yolov5_repo або YOLOV5_REPO")
+        else:
+            load = lambda: torch.hub.load('ultralytics/yolov5', 'custom', path=weights_path)
+
+        if self._hub_ready:
+            model = load()
+        else:
+            with self._hub_lock:
+                model = load()
+                self._hub_ready = True
+
+        model.conf = conf
+        model.iou = iou
+        return model
+
+    def _find_yolov5_repo(self) -> Optional[str]:
+        if self.yolov5_repo:
+            return self.yolov5_repo
+
+        import torch
+        cached = os.path.join(torch.hub.get_dir(), 'ultralytics_yolov5_master')
+        return cached if os.path.isfile(os.path.join(cached, 'hubconf.py')) else None
+
+    def _load_ocr_reader(self, langs: list, recog_network: str):
+        import easyocr
+
+        kwargs = {}
+        if self.ocr_model_dir:
+            kwargs["model_storage_directory"] = self.ocr_model_dir
+        return easyocr.Reader(
+            lang_list=langs,
+            recog_network=recog_network,
+            download_enabled=not self.offline,
+            verbose=False,
+            **kwargs
+        )
@@ -1,24 +1,50 @@
-import torch
-import easyocr
 import numpy as np
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from .DetectionResult import DetectionResult
+from .ModelRegistry import ModelRegistry
 
 class PlateRecognizer:
-    def __init__(self, yolo_weights_path: str, ocr_langs=None, yolo_conf=0.5, yolo_iou=0.5):
-        self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=yolo_weights_path)
-        self.model.conf = yolo_conf
-        self.model.iou = yolo_iou
-        self.reader = easyocr.Reader(
-            lang_list=ocr_langs or ['en'],
-            recog_network='english_g2',
-            verbose=False
-        )
+    def __init__(self, yolo_weights_path: str, ocr_langs=None, yolo_conf=0.5, yolo_iou=0.5,
+                 ocr_input_size: Tuple[int, int] = (256, 64), registry: Optional[ModelRegistry] = None):
+        self.weights_path = yolo_weights_path
+        self.yolo_conf = yolo_conf
+        self.yolo_iou = yolo_iou
+        self.ocr_langs = ocr_langs or ['en']
+        self.registry = registry or ModelRegistry.default()
+        self._model = None
+        self._reader = None
+        # readtext_batched потребує однакового розміру всіх зображень у батчі; той самий розмір і для батча з одного
+        self.ocr_input_size = ocr_input_size
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.registry.load_yolo(self.weights_path, self.yolo_conf, self.yolo_iou)
+        return self._model
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = self.registry.load_ocr_reader(self.ocr_langs)
+        return self._reader
+
+    def load(self):
+        return self.model
+
+    def load_reader(self):
+        return self.reader
 
     def detect_plate(self, image: np.ndarray) -> Optional[DetectionResult]:
         results = self.model(image)
-        boxes = results.xyxy[0].cpu().numpy()
+        return self._to_detection(results.xyxy[0].cpu().numpy())
 
+    def detect_plates_batch(self, images: List[np.ndarray]) -> List[Optional[DetectionResult]]:
+        if not images:
+            return []
+        results = self.model(list(images))
+        return [self._to_detection(xyxy.cpu().numpy()) for xyxy in results.xyxy]
+
+    def _to_detection(self, boxes: np.ndarray) -> Optional[DetectionResult]:
         if len(boxes) == 0:
             return None
 
@@ -27,8 +53,21 @@ class PlateRecognizer:
         return DetectionResult("plate", conf, (x1, y1, x2, y2))
 
     def recognize_text(self, plate_image: np.ndarray) -> Tuple[Optional[str], float]:
-        ocr_result = self.reader.readtext(plate_image)
+        return self.recognize_texts([plate_image])[0]
+
+    def recognize_texts(self, plate_images: List[np.ndarray]) -> List[Tuple[Optional[str], float]]:
+        if not plate_images:
+            return []
+
+        # навіть один номер іде тим самим шляхом і розміром: текст залежить лише від кропу, а не від сусідів у батчі
+        width, height = self.ocr_input_size
+        ocr_results = self.reader.readtext_batched(
+            list(plate_images), n_width=width, n_height=height, batch_size=len(plate_images))
+        return [self._to_text(ocr_result) for ocr_result in ocr_results]
+
+    @staticmethod
+    def _to_text(ocr_result) -> Tuple[Optional[str], float]:
         if not ocr_result:
             return None, 0.0
         _, text, conf = ocr_result[0]
-        return text.upper(), conf
\ No newline at end of file
+        return text.upper(), conf
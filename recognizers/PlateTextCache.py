@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+
+class PlateTextVoter:
+    def __init__(self, window: Optional[int] = None):
+        self.reads: List[Tuple[str, float]] = []
+        # голосують лише останні window прочитань: номер, що став читабельним пізніше, не перекривається старими
+        self.window = window
+
+    def add(self, text: Optional[str], confidence: float):
+        if text:
+            self.reads.append((text, float(confidence)))
+            if self.window and len(self.reads) > self.window:
+                del self.reads[0]
+
+    def result(self) -> Tuple[Optional[str], float]:
+        if not self.reads:
+            return None, 0.0
+
+        # голосуємо лише серед прочитань найпоширенішої (за сумарною впевненістю) довжини
+        by_length = defaultdict(list)
+        for text, conf in self.reads:
+            by_length[len(text)].append((text, conf))
+        group = max(by_length.values(), key=lambda reads: sum(conf for _, conf in reads))
+
+        chars = []
+        position_confidences = []
+        for position in range(len(group[0][0])):
+            scores = defaultdict(float)
+            for text, conf in group:
+                scores[text[position]] += conf
+            char, score = max(scores.items(), key=lambda x: x[1])
+            chars.append(char)
+            position_confidences.append(score / len(group))
+
+        # прочитання іншої довжини знижують впевненість пропорційно своїй кількості
+        agreement = len(group) / len(self.reads)
+        return "".join(chars), float(np.mean(position_confidences)) * agreement
+
+
+class PlateCacheEntry:
+    def __init__(self, box: Tuple[int, int, int, int], appearance: int, frame_index: int,
+                 window: Optional[int] = None):
+        self.box = box
+        self.appearance = appearance
+        self.last_seen = frame_index
+        self.last_read = frame_index
+        self.voter = PlateTextVoter(window)
+        self.attempts = 0
+        self.text: Optional[str] = None
+        self.confidence = 0.0
+
+    def add_read(self, text: Optional[str], confidence: float, frame_index: int):
+        self.attempts += 1
+        self.last_read = frame_index
+        self.voter.add(text, confidence)
+        self.text, self.confidence = self.voter.result()
+
+
+class PlateTextCache:
+    def __init__(self, confident_threshold: float = 0.7, max_reads: int = 5, retry_interval: int = 10,
+                 iou_threshold: float = 0.5, max_hash_distance: int = 10, max_age: int = 30):
+        self.confident_threshold = confident_threshold
+        # після max_reads невпевнених прочитань номер читається вже не щокадру, а раз на retry_interval кадрів
+        self.max_reads = max_reads
+        self.retry_interval = retry_interval
+        self.iou_threshold = iou_threshold
+        self.max_hash_distance = max_hash_distance
+        self.max_age = max_age
+        self.entries: List[PlateCacheEntry] = []
+        self.frame_index = 0
+
+    def reset(self):
+        self.entries = []
+        self.frame_index = 0
+
+    def next_frame(self):
+        self.frame_index += 1
+        self.entries = [e for e in self.entries if self.frame_index - e.last_seen <= self.max_age]
+
+    def lookup(self, box: Tuple[int, int, int, int], plate_image: np.ndarray) -> PlateCacheEntry:
+        appearance = self.appearance_hash(plate_image)
+        best, best_iou = None, self.iou_threshold
+        for entry in self.entries:
+            iou = self._iou(entry.box, box)
+            if iou >= best_iou and bin(entry.appearance ^ appearance).count("1") <= self.max_hash_distance:
+                best, best_iou = entry, iou
+
+        if best is None:
+            best = PlateCacheEntry(box, appearance, self.frame_index, self.max_reads)
+            self.entries.append(best)
+        best.box = box
+        best.appearance = appearance
+        best.last_seen = self.frame_index
+        return best
+
+    def is_confident(self, entry: PlateCacheEntry) -> bool:
+        return entry.text is not None and entry.confidence >= self.confident_threshold
+
+    def needs_read(self, entry: PlateCacheEntry) -> bool:
+        # усталюється лише впевнене прочитання; нечитабельний номер не заморожується, а перечитується з відступом
+        if self.is_confident(entry):
+            return False
+        if entry.attempts < self.max_reads:
+            return True
+        return self.frame_index - entry.last_read >= self.retry_interval
+
+    def add_read(self, entry: PlateCacheEntry, text: Optional[str], confidence: float):
+        entry.add_read(text, confidence, self.frame_index)
+
+    @staticmethod
+    def appearance_hash(plate_image: np.ndarray) -> int:
+        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY) if plate_image.ndim == 3 else plate_image
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).ravel()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    @staticmethod
+    def _iou(a, b) -> float:
+        x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+        x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+        inter = max(0, x2 - x1) * max(0, y2 - y1)
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
@@ -0,0 +1,89 @@
+import argparse
+import sys
+import time
+from SightingIndex import SightingIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the plate and vehicle sighting index")
+    parser.add_argument("index", help="Sighting index database (.db), e.g. written by main.py --reports sightings.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    search = sub.add_parser("search", help="Find sightings of a plate, tolerating OCR confusions (O/0, B/8, ...) and typos")
+    search.add_argument("plate", help="Plate text to look up")
+    search.add_argument("--max-distance", type=int, help="Allowed edits after confusion-aware normalisation", default=1)
+    search.add_argument("--start", type=float, help="Only sightings at or after this timestamp", default=None)
+    search.add_argument("--end", type=float, help="Only sightings at or before this timestamp", default=None)
+    search.add_argument("--stream", help="Only sightings from this stream / camera", default=None)
+    search.add_argument("--gap", type=float, help="Seconds between sightings that start a new visit", default=2.0)
+    search.add_argument("--limit", type=int, help="Max sightings to read", default=10000)
+    search.add_argument("--raw", action="store_true", help="Print every sighting instead of grouping them into visits")
+
+    between = sub.add_parser("range", help="List sightings in a time range")
+    between.add_argument("--start", type=float, help="Start timestamp", default=None)
+    between.add_argument("--end", type=float, help="End timestamp", default=None)
+    between.add_argument("--stream", help="Only this stream / camera", default=None)
+    between.add_argument("--color", help="Only vehicles of this colour", default=None)
+    between.add_argument("--brand", help="Only vehicles of this brand", default=None)
+    between.add_argument("--with-plate", action="store_true", help="Only sightings with a read plate")
+    between.add_argument("--limit", type=int, help="Max sightings to print", default=100)
+
+    ingest = sub.add_parser("ingest", help="Add JSONL reports from earlier runs to the index")
+    ingest.add_argument("reports", nargs="+", help="JSONL report files (main.py --reports out.jsonl)")
+
+    sub.add_parser("stats", help="Show index size and coverage")
+
+    args = parser.parse_args()
+    index = SightingIndex(args.index)
+    try:
+        if args.command == "search":
+            started = time.perf_counter()
+            sightings = index.search(args.plate, args.max_distance, args.start, args.end, args.stream, args.limit)
+            elapsed = time.perf_counter() - started
+            if not sightings:
+                print(f"❌ Номер {args.plate} не знайдено ({elapsed * 1000:.1f} ms)")
+                sys.exit(1)
+            if args.raw:
+                for s in sightings:
+                    print_sighting(s)
+            else:
+                visits = SightingIndex.visits(sightings, args.gap)
+                for v in visits:
+                    print(f"🚗 {v['plate_number']:<12} {v['stream_id'] or '-'}  {format_time(v['first_seen'])} – "
+                          f"{format_time(v['last_seen'])}  спостережень: {v['sightings']}  відстань: {v['distance']}  "
+                          f"{v['color'] or '-'} / {v['brand'] or '-'}")
+                print(f"✅ Проїздів: {len(visits)}, спостережень: {len(sightings)} ({elapsed * 1000:.1f} ms)")
+        elif args.command == "range":
+            sightings = index.sightings_between(args.start, args.end, args.stream, args.color, args.brand,
+                                                args.with_plate, args.limit)
+            for s in sightings:
+                print_sighting(s)
+            print(f"✅ Спостережень: {len(sightings)}")
+        elif args.command == "ingest":
+            for path in args.reports:
+                started = time.perf_counter()
+                count = index.ingest_jsonl(path)
+                print(f"📥 {path}: {count} спостережень за {time.perf_counter() - started:.2f} sec")
+        else:
+            stats = index.stats()
+            print(f"📊 Спостережень: {stats['sightings']} (з номером: {stats['with_plate']}), "
+                  f"різних номерів: {stats['plates']}, камер: {stats['streams']}")
+            print(f"⏱️ Час: {format_time(stats['first_seen'])} – {format_time(stats['last_seen'])}, "
+                  f"розмір: {stats['size_bytes'] / 2 ** 20:.1f} MB")
+    finally:
+        index.close()
+
+
+def format_time(timestamp) -> str:
+    return "-" if timestamp is None else f"{timestamp:.2f}s"
+
+
+def print_sighting(s: dict):
+    distance = f"  відстань: {s['distance']}" if "distance" in s else ""
+    print(f"  {format_time(s['timestamp']):>10}  кадр {s['frame_index']}  {s['stream_id'] or '-'}  "
+          f"{s['plate_number'] or '-':<12} {s['vehicle_class'] or '-'}  {s['color'] or '-'} / {s['brand'] or '-'}  "
+          f"пошкодження: {', '.join(s['damages']) if s['damages'] else '-'}{distance}")
+
+
+if __name__ == "__main__":
+    main()
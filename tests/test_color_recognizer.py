@@ -0,0 +1,138 @@
+import cv2
+import numpy as np
+import pytest
+from recognizers.ColorRecognizer import ColorName, ColorRecognizer
+
+
+class RangeLoopColorRecognizer(ColorRecognizer):
+    # початкова реалізація: cv2.inRange / np.all по кожному діапазону окремо
+    def _range_body_mask(self, hsv: np.ndarray) -> np.ndarray:
+        mask_total = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        for color, ranges in self.hsv_ranges.items():
+            if color in {ColorName.BLACK, ColorName.GRAY}:
+                continue
+            for lower, upper in ranges:
+                mask_total = cv2.bitwise_or(mask_total, cv2.inRange(hsv, lower, upper))
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        morph = cv2.morphologyEx(mask_total, cv2.MORPH_CLOSE, kernel, iterations=2)
+        contours, _ = cv2.findContours(morph, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        mask_final = np.zeros_like(mask_total)
+        if contours:
+            cv2.drawContours(mask_final, [max(contours, key=cv2.contourArea)], -1, 255, -1)
+        return mask_final
+
+    def range_counts(self, pixels: np.ndarray) -> dict:
+        color_counts = {}
+        for color, ranges in self.hsv_ranges.items():
+            count = 0
+            for lower, upper in ranges:
+                count += np.count_nonzero(np.all((pixels >= lower) & (pixels <= upper), axis=1))
+            color_counts[color] = count
+        return color_counts
+
+    def recognize_color(self, car_crop: np.ndarray) -> ColorName:
+        hsv = cv2.cvtColor(self.crop_center(car_crop), cv2.COLOR_BGR2HSV)
+        color_counts = self.range_counts(hsv.reshape(-1, 3))
+        black = color_counts.get(ColorName.BLACK, 0)
+        gray = color_counts.get(ColorName.GRAY, 0)
+        others = sum(v for k, v in color_counts.items() if k not in [ColorName.BLACK, ColorName.GRAY])
+        if black > 0 and black >= 10 * others:
+            return ColorName.BLACK
+        if gray > 0 and gray >= 10 * others:
+            return ColorName.GRAY
+
+        masked_pixels = hsv[self._range_body_mask(hsv) == 255]
+        if masked_pixels.size == 0:
+            return ColorName.UNKNOWN
+        masked_counts = self.range_counts(masked_pixels)
+        sorted_colors = sorted(masked_counts.items(), key=lambda x: x[1], reverse=True)
+        dominant_color, dominant_area = sorted_colors[0]
+        total = sum(masked_counts.values())
+        if total == 0 or dominant_area / total < 0.1:
+            return ColorName.UNKNOWN
+        if len(sorted_colors) > 1:
+            second_color, second_area = sorted_colors[1]
+            if second_area >= dominant_area * 0.2:
+                return second_color
+        return dominant_color
+
+
+def _edge_values(recognizer: ColorRecognizer, channel: int) -> np.ndarray:
+    # межі всіх діапазонів та їхні сусіди з обох боків
+    values = set()
+    for ranges in recognizer.hsv_ranges.values():
+        for lower, upper in ranges:
+            for bound in (int(lower[channel]), int(upper[channel])):
+                values.update(v for v in (bound - 1, bound, bound + 1) if 0 <= v <= 255)
+    return np.array(sorted(values), dtype=np.uint8)
+
+
+def _random_crops(rng: np.random.Generator, count: int) -> list:
+    crops = []
+    for i in range(count):
+        h, w = rng.integers(8, 96, size=2)
+        if i % 3 == 0:
+            # шум
+            crop = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        else:
+            # однотонний «кузов» з шумом і фоном — щоб спрацьовували всі гілки вибору кольору
+            crop = np.full((h, w, 3), rng.integers(0, 256, size=3), dtype=np.uint8)
+            crop[:h // 4] = rng.integers(0, 256, size=3)
+            noise = rng.integers(-20, 21, size=crop.shape)
+            crop = np.clip(crop.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        crops.append(crop)
+    return crops
+
+
+def _edge_crops(recognizer: ColorRecognizer, rng: np.random.Generator, count: int) -> list:
+    hue, sat, val = (_edge_values(recognizer, c) for c in range(3))
+    hue = hue[hue <= 180]
+    crops = []
+    for _ in range(count):
+        h, w = rng.integers(8, 64, size=2)
+        hsv = np.stack([rng.choice(hue, (h, w)), rng.choice(sat, (h, w)), rng.choice(val, (h, w))], axis=-1)
+        crops.append(cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR))
+    return crops
+
+
+@pytest.fixture(scope="module")
+def recognizers():
+    return ColorRecognizer(), RangeLoopColorRecognizer()
+
+
+def test_lut_counts_match_range_loop_on_edge_pixels(recognizers):
+    lut, reference = recognizers
+    hue, sat, val = (_edge_values(lut, c) for c in range(3))
+    pixels = np.stack(np.meshgrid(hue, sat, val, indexing="ij"), axis=-1).reshape(-1, 3)
+    for pixel in pixels:
+        assert lut._count_color_pixels(pixel[None]) == reference.range_counts(pixel[None]), pixel
+    assert lut._count_color_pixels(pixels) == reference.range_counts(pixels)
+
+
+def test_lut_counts_match_range_loop_on_random_pixels(recognizers):
+    lut, reference = recognizers
+    pixels = np.random.default_rng(0).integers(0, 256, size=(20000, 3), dtype=np.uint8)
+    pixels[:, 0] %= 181
+    assert lut._count_color_pixels(pixels) == reference.range_counts(pixels)
+
+
+@pytest.mark.parametrize("kind", ["random", "edge"])
+def test_recognize_color_matches_range_loop(recognizers, kind):
+    lut, reference = recognizers
+    rng = np.random.default_rng(1)
+    crops = _random_crops(rng, 500) if kind == "random" else _edge_crops(lut, rng, 500)
+    for i, crop in enumerate(crops):
+        assert lut.recognize_color(crop) == reference.recognize_color(crop), i
+
+
+@pytest.mark.parametrize("kind", ["random", "edge"])
+def test_recognize_colors_batch_matches_range_loop(recognizers, kind):
+    lut, reference = recognizers
+    rng = np.random.default_rng(2)
+    crops = _random_crops(rng, 300) if kind == "random" else _edge_crops(lut, rng, 300)
+    # порожній кроп у батчі дає None і не зсуває решту
+    crops.insert(7, np.zeros((0, 0, 3), dtype=np.uint8))
+    expected = [None if crop.size == 0 else reference.recognize_color(crop) for crop in crops]
+    for start in range(0, len(crops), 16):
+        assert lut.recognize_colors(crops[start:start + 16]) == expected[start:start + 16]
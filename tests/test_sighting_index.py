@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from SightingIndex import SightingIndex, plate_key
+
+ALPHABET = list("ABCEHKMOPTXIZSGD0123456789")
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _noisy(rng: np.random.Generator, plate: str) -> str:
+    # часткове прочитання та випадкові правки, як у реального OCR
+    chars = list(plate)
+    if rng.random() < 0.3:
+        cut = int(rng.integers(1, 4))
+        chars = chars[cut:] if rng.random() < 0.5 else chars[:-cut]
+    for _ in range(int(rng.integers(0, 3))):
+        op, pos = rng.integers(3), int(rng.integers(len(chars) + 1))
+        if op == 0 and pos < len(chars):
+            chars[pos] = rng.choice(ALPHABET)
+        elif op == 1:
+            chars.insert(pos, rng.choice(ALPHABET))
+        elif chars and pos < len(chars):
+            del chars[pos]
+    return "".join(chars) or plate
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    plates = sorted({"".join(rng.choice(ALPHABET, int(rng.integers(4, 9)))) for _ in range(1500)})
+    index = SightingIndex(str(tmp_path_factory.mktemp("sightings") / "sightings.db"))
+    index.add_records({"frame_index": i, "timestamp": i / 25.0, "stream_id": f"camera-{i % 3}",
+                       "plate_number": plate} for i, plate in enumerate(plates))
+    yield index, plates, rng
+    index.close()
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_find_plates_matches_brute_force_scan(index, max_distance):
+    index, plates, rng = index
+    keys = {plate_key(p) for p in plates}
+    for _ in range(120):
+        query = _noisy(rng, plates[int(rng.integers(len(plates)))])
+        key = plate_key(query)
+        expected = {k for k in keys if levenshtein(key, k) <= max_distance}
+        found = index.find_plates(query, max_distance, limit=len(keys))
+        assert {m["plate_key"] for m in found} == expected, query
+        assert all(m["distance"] == levenshtein(key, m["plate_key"]) for m in found), query
+
+
+def test_short_query_without_shared_trigrams(index):
+    index, plates, _ = index
+    # 9871B -> 98718 не має жодної спільної триграми з 937108, але відстань між ними 2
+    index.add_records([{"frame_index": 0, "timestamp": 0.0, "plate_number": "937108"}])
+    assert "937108" in {m["plate_key"] for m in index.find_plates("9871B", max_distance=2, limit=10000)}
+
+
+def test_search_tolerates_ocr_confusions(index):
+    index, _, _ = index
+    index.add_records([{"frame_index": 7, "timestamp": 1.5, "stream_id": "gate", "plate_number": "AB1234CO"}])
+    sightings = index.search("A81234C0", max_distance=0, stream_id="gate")
+    assert [(s["plate_number"], s["distance"]) for s in sightings] == [("AB1234CO", 0)]
+    assert index.search("A81234C0", max_distance=0, stream_id="gate", start=2.0) == []